@@ -0,0 +1,478 @@
+"""
+Asyncio support, built on aiohttp.
+
+AsyncConnection speaks the same configuration as Connection and hands back
+fully read requests.Response objects, so resources reuse their path
+building, formats and response handling unchanged.
+"""
+from __future__ import absolute_import
+
+import aiohttp
+import asyncio
+import requests
+import weakref
+
+from activerest.caches import CacheEntry, cache_key, is_cacheable
+from activerest.coalescing import follow
+from activerest.connections import Connection
+from activerest.instrumentation import RequestEvent
+from activerest.resources import CONNECTION_ATTRIBUTES, Resource
+from functools import partial
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from timeit import default_timer
+
+
+# Failures to send a request, including connection resets, bodies cut short
+# and timeouts.
+RETRYABLE_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError,
+                    asyncio.TimeoutError)
+
+# Client sessions are bound to an event loop, so shared sessions are kept
+# per loop and keyed by site and pool settings like the sync transport.
+_shared_sessions = weakref.WeakKeyDictionary()
+
+
+class AsyncConnection(Connection):
+    _session_loop = None
+    _session_stats = None
+
+    @property
+    def session(self):
+        """Pooled aiohttp session for the running event loop."""
+        loop = asyncio.get_event_loop()
+
+        if self._session is None \
+                or self._session.closed \
+                or self._session_loop is not loop:
+            if self.share_pool:
+                key = (self._site.scheme,
+                       self._site.host,
+                       self._site.port,
+                       self._pool_connections,
+                       self._pool_maxsize)
+                sessions = _shared_sessions.setdefault(loop, {})
+                if key not in sessions or sessions[key][0].closed:
+                    sessions[key] = self.build_session()
+                (self._session, self._session_stats) = sessions[key]
+            else:
+                (self._session, self._session_stats) = self.build_session()
+            self._session_loop = loop
+
+        return self._session
+
+    def build_session(self):
+        stats = {
+            'connections': 0,
+            'requests': 0,
+        }
+
+        async def on_request_start(session, context, params):
+            stats['requests'] += 1
+
+        async def on_connection_create_end(session, context, params):
+            stats['connections'] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+
+        connector = aiohttp.TCPConnector(limit=self._pool_connections * self._pool_maxsize,
+                                         limit_per_host=self._pool_maxsize)
+
+        session = aiohttp.ClientSession(connector=connector,
+                                        trace_configs=[trace_config])
+        return (session, stats)
+
+    def pool_stats(self):
+        """Connection reuse counters for the session behind this connection."""
+        stats = {
+            'pools': 0,
+            'connections': 0,
+            'requests': 0,
+        }
+
+        if self._session_stats is not None:
+            stats['pools'] = 1
+            stats.update(self._session_stats)
+
+        stats['reused'] = stats['requests'] - stats['connections']
+        return stats
+
+    async def close(self):
+        """Close the session used by this connection."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _request(self, method, path, template=None, resource_class=None, defer=False, **kwargs):
+        (url, kwargs) = self._prepare_request(method, path, **kwargs)
+        url = str(url)
+        options = self._session_options(url, kwargs)
+
+        if not self.is_instrumented():
+            return await self._send(method, url, options)
+
+        event = RequestEvent(self, method, url, template, resource_class)
+        self.emit('before_request', event)
+        start = default_timer()
+
+        try:
+            (response, connect) = await self._send(method, url, options, timed=True)
+        except Exception as error:
+            event.timings['connect'] = default_timer() - start
+            event.finish(error)
+            raise
+
+        event.received(response, default_timer() - start, connect=connect - start)
+        response.event = event
+
+        if not defer:
+            event.finish()
+
+        return response
+
+    async def _send(self, method, url, options, timed=False):
+        if method == 'GET' and self.coalescer is not None:
+            key = cache_key('GET',
+                            url,
+                            options.get('params'),
+                            options['headers'].get('Accept'),
+                            self.username)
+            (response, connect) = await coalesce(self.coalescer, key,
+                                                 lambda: self._send_uncoalesced(method, url, options))
+        else:
+            (response, connect) = await self._send_uncoalesced(method, url, options)
+
+        return (response, connect) if timed else response
+
+    async def _send_uncoalesced(self, method, url, options):
+        cache = self.cache
+
+        if cache is None:
+            return await self._send_retried(method, url, options)
+
+        if method != 'GET':
+            (response, connect) = await self._send_retried(method, url, options)
+            if response.status_code < 400:
+                cache.invalidate(url)
+            return (response, connect)
+
+        key = cache_key('GET',
+                        url,
+                        options.get('params'),
+                        options['headers'].get('Accept'),
+                        self.username)
+
+        entry = cache.get(key)
+
+        if entry is not None:
+            if entry.is_fresh(cache.clock()):
+                cache.count('hits')
+                return (entry.response(), default_timer())
+            options['headers'].update(entry.validator_headers())
+
+        (response, connect) = await self._send_retried('GET', url, options)
+
+        if entry is not None and response.status_code == requests.codes.not_modified:
+            entry.revalidated(response.headers, cache.clock())
+            cache.set(key, entry)
+            cache.count('revalidations')
+            return (entry.response(), connect)
+
+        cache.count('misses')
+
+        if is_cacheable(response):
+            entry = CacheEntry.from_response(response, cache.clock())
+            cache.set(key, entry)
+            response.cache_entry = entry
+
+        return (response, connect)
+
+    async def _send_retried(self, method, url, options):
+        """Send a request through the retry policy and circuit breaker."""
+        retry = self.retry
+        breaker = self.circuit_breaker
+
+        if retry is not None:
+            retry.started()
+
+        attempt = 0
+
+        while True:
+            if breaker is not None:
+                breaker.before_request(self._base_url)
+
+            try:
+                (response, connect) = await self._limited_request(method, url, options)
+            except RETRYABLE_ERRORS as error:
+                if breaker is not None:
+                    breaker.record(self._base_url, error=error)
+                delay = retry.next_delay(method, attempt, error=error) if retry else None
+                if delay is None:
+                    raise
+            except Exception as error:
+                if breaker is not None:
+                    breaker.record(self._base_url, error=error)
+                raise
+            except BaseException:
+                # Cancelled, which says nothing about the site.
+                if breaker is not None:
+                    breaker.release(self._base_url)
+                raise
+            else:
+                if breaker is not None:
+                    breaker.record(self._base_url, response.status_code)
+                delay = retry.next_delay(method, attempt, response=response) if retry else None
+                if delay is None:
+                    return (response, connect)
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _limited_request(self, method, url, options):
+        limiter = self.rate_limiter
+
+        if limiter is None:
+            return await self._session_request(method, url, options)
+
+        ticket = await acquire(limiter, (self._base_url, self.username))
+
+        try:
+            (response, connect) = await self._session_request(method, url, options)
+        except BaseException:
+            limiter.release(ticket)
+            raise
+
+        limiter.release(ticket, response)
+        return (response, connect)
+
+    async def _session_request(self, method, url, options):
+        async with self.session.request(method, url, **options) as client_response:
+            connect = default_timer()
+            content = await client_response.read()
+
+        return (self._build_response(client_response, content), connect)
+
+    def _session_options(self, url, kwargs):
+        options = {
+            'headers': kwargs['headers'],
+        }
+
+        params = kwargs.get('params')
+        if params:
+            options['params'] = dict((key, str(value)) for (key, value) in params.items()
+                                     if value is not None)
+
+        for name in ['data', 'json']:
+            if kwargs.get(name) is not None:
+                options[name] = kwargs[name]
+
+        auth = kwargs.get('auth')
+        if isinstance(auth, requests.auth.HTTPDigestAuth):
+            raise ValueError('digest auth is not supported by AsyncConnection')
+        if auth is not None:
+            options['auth'] = aiohttp.BasicAuth(auth.username, auth.password)
+
+        if 'timeout' in kwargs:
+            (open_timeout, read_timeout) = kwargs['timeout']
+            options['timeout'] = aiohttp.ClientTimeout(sock_connect=open_timeout,
+                                                       sock_read=read_timeout)
+
+        if 'proxies' in kwargs:
+            proxy = kwargs['proxies'].get(self._site.scheme)
+            if proxy:
+                options['proxy'] = proxy
+
+        return options
+
+    def _build_response(self, client_response, content):
+        response = requests.Response()
+        response.status_code = client_response.status
+        response.reason = client_response.reason
+        response.url = str(client_response.url)
+        response.headers = CaseInsensitiveDict(client_response.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = content
+
+        request = requests.PreparedRequest()
+        request.method = client_response.method
+        request.url = str(client_response.request_info.url)
+        request.headers = CaseInsensitiveDict(client_response.request_info.headers)
+        response.request = request
+
+        return response
+
+
+async def coalesce(coalescer, key, function):
+    """Await function for key, or the request already in flight in this loop."""
+    loop = asyncio.get_event_loop()
+    key = (id(loop), key)
+    (future, leader) = coalescer.join(key, loop.create_future)
+
+    if not leader:
+        (response, connect) = await asyncio.shield(future)
+        return (follow(response), connect)
+
+    try:
+        (response, connect) = await function()
+    except Exception as error:
+        future.set_exception(error)
+        # Mark the exception retrieved, there may be no one else waiting.
+        future.exception()
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    finally:
+        coalescer.leave(key)
+
+    future.set_result((response, connect))
+    return (response, connect)
+
+
+async def acquire(limiter, key):
+    """Await a slot of a RateLimiter for a request to key, returning its ticket.
+
+    Waiting tasks are woken from whichever thread or loop releases a slot.
+    """
+    loop = asyncio.get_event_loop()
+
+    while True:
+        waiter = loop.create_future()
+        (ticket, wait) = limiter.reserve(key, partial(_notify, loop, waiter))
+
+        if ticket is not None:
+            return ticket
+
+        if wait is None:
+            await waiter
+        else:
+            await asyncio.sleep(wait)
+
+
+def _notify(loop, waiter):
+    try:
+        loop.call_soon_threadsafe(_wake, waiter)
+    except RuntimeError:
+        # The loop was closed, and no one is waiting any more.
+        pass
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+async def close_sessions():
+    """Close every shared session bound to the running event loop."""
+    loop = asyncio.get_event_loop()
+    sessions = _shared_sessions.pop(loop, {})
+    for (session, stats) in sessions.values():
+        if not session.closed:
+            await session.close()
+
+
+class AsyncResource(Resource):
+    """Resource with awaitable counterparts of the API methods.
+
+    Each method is prefixed with an ``a``, so ``await Todo.afind(1)`` is the
+    asyncio version of ``Todo.find(1)``.
+    """
+    async_connection_class = AsyncConnection
+
+    @classmethod
+    def async_connection(cls, refresh=False):
+        """Async connection configured like the resource's connection."""
+        connection = cls.connection()
+        (source, async_connection) = cls.__dict__.get('_async_connection', (None, None))
+
+        if async_connection is None or source is not connection or refresh:
+            async_connection = cls.async_connection_class(connection.site, connection.format)
+            for attr in CONNECTION_ATTRIBUTES:
+                value = getattr(connection, attr, None)
+                if value is not None:
+                    setattr(async_connection, attr, value)
+            async_connection.default_header = connection.default_header
+            type.__setattr__(cls, '_async_connection', (connection, async_connection))
+
+        return async_connection
+
+    @classmethod
+    async def aall(cls):
+        """Return all resources from the API."""
+        return await cls.afind()
+
+    @classmethod
+    async def adelete(cls, identifier, params=None):
+        """Delete a single resource by identifier."""
+        path = cls.element_path(identifier, **(params or {}))
+        response = await cls.async_connection().delete(path, template=cls._element_template,
+                                                       resource_class=cls)
+        return cls._deleted(identifier, response)
+
+    @classmethod
+    async def aexists(cls, identifier, params=None):
+        """Check if a single resource exists by identifier."""
+        path = cls.element_path(identifier, **(params or {}))
+        response = await cls.async_connection().head(path, template=cls._element_template,
+                                                     resource_class=cls)
+        return response.status_code == requests.codes.ok
+
+    @classmethod
+    async def afind(cls, identifier=None, params=None):
+        """Find resources by ID or by query options."""
+        loaded = cls._find_loaded(identifier, params)
+        if loaded is not None:
+            return loaded
+
+        (template, path, params) = cls._find_request(identifier, params)
+        response = await cls.async_connection().get(path, params=params, template=template,
+                                                    resource_class=cls, defer=True)
+        return cls._find_response(identifier, response)
+
+    @classmethod
+    async def afind_many(cls, identifiers, params=None, max_workers=None):
+        """Find many resources by ID concurrently, see Resource.find_many."""
+        if max_workers is None:
+            max_workers = cls.async_connection().pool_maxsize
+
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def find(identifier):
+            async with semaphore:
+                return await cls.afind(identifier, params)
+
+        return await asyncio.gather(*[find(identifier) for identifier in identifiers],
+                                    return_exceptions=True)
+
+    async def asave(self):
+        """Save the resource by calling the API."""
+        request = self._save_request()
+
+        if request is None:
+            return True
+
+        (method, template, path, data) = request
+        response = await getattr(self.async_connection(), method)(path, data=data, template=template,
+                                                                  resource_class=type(self),
+                                                                  defer=True)
+        return self._save_response(response)
+
+    async def adestroy(self):
+        """Delete the resource by calling the API."""
+        if self.is_persisted() and await self.adelete(self.id, self._prefix_options()):
+            self._destroyed()
+            return True
+
+        return False
+
+    async def aupdate_attribute(self, name, value):
+        """Update a single attribute and save the resource."""
+        setattr(self, name, value)
+        return await self.asave()
+
+    async def aupdate_attributes(self, attributes):
+        """Update a dictionary of attributes and save the resource."""
+        self.load(attributes)
+        return await self.asave()
@@ -0,0 +1,362 @@
+"""
+Response caches for Connection.
+
+A cache stores GET responses with their validators. While an entry is fresh
+according to Cache-Control: max-age it is served without touching the
+network; once stale it is revalidated with If-None-Match/If-Modified-Since
+and a 304 response is served from the cache.
+
+ResponseCache keeps entries in memory, for one process. SQLiteCache keeps
+them compressed in an SQLite database on disk, shared by every process
+that opens the same directory and kept across restarts.
+"""
+from __future__ import absolute_import
+
+from future.standard_library import install_aliases
+
+install_aliases()
+
+import json
+import os
+import re
+import requests
+import sqlite3
+import threading
+import time
+import zlib
+
+from collections import OrderedDict
+from requests.structures import CaseInsensitiveDict
+from urllib.parse import urlencode
+
+
+MAX_AGE_PATTERN = re.compile(r'max-age\s*=\s*"?(\d+)"?', re.IGNORECASE)
+
+
+class CacheEntry(object):
+    def __init__(self, status_code, headers, content, url, encoding=None, expires=0):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.url = url
+        self.encoding = encoding
+        self.expires = expires
+        # Decoded payload, memoized by Resource so cache hits skip decoding,
+        # and the same decoded as a collection, see decode_response.
+        self.decoded = None
+        self.decoded_collection = None
+
+    @classmethod
+    def from_response(cls, response, now):
+        entry = cls(response.status_code,
+                    response.headers,
+                    response.content,
+                    response.url,
+                    response.encoding)
+        entry.expires = cache_expires(entry.headers, now)
+        return entry
+
+    @property
+    def etag(self):
+        return self.headers.get('ETag')
+
+    @property
+    def last_modified(self):
+        return self.headers.get('Last-Modified')
+
+    def is_fresh(self, now):
+        return now < self.expires
+
+    def revalidated(self, headers, now):
+        """Update the entry from the headers of a 304 response."""
+        for name in ['Cache-Control', 'Date', 'ETag', 'Expires', 'Last-Modified']:
+            if name in headers:
+                self.headers[name] = headers[name]
+        self.expires = cache_expires(self.headers, now)
+
+    def validator_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def response(self):
+        """A response built from the entry."""
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = self.url
+        response.encoding = self.encoding
+        response._content = self.content
+        response.cache_entry = self
+        response.from_cache = True
+        return response
+
+
+def cache_key(method, url, params=None, accept=None, username=None):
+    """Key of a request, made of its method, URL, params, Accept header and user."""
+    query = urlencode(sorted((params or {}).items()), doseq=True)
+    return '%s %s?%s %s %s' % (method, url, query, accept or '', username or '')
+
+def cache_control(headers):
+    return [directive.strip().lower()
+            for directive in headers.get('Cache-Control', '').split(',')]
+
+def is_cacheable(response):
+    if response.status_code != requests.codes.ok:
+        return False
+
+    directives = cache_control(response.headers)
+
+    if 'no-store' in directives:
+        return False
+
+    return bool(response.headers.get('ETag')
+                or response.headers.get('Last-Modified')
+                or cache_expires(response.headers, 1) > 1)
+
+def cache_expires(headers, now):
+    """Time until which a response can be served without revalidation."""
+    directives = cache_control(headers)
+
+    if 'no-cache' in directives:
+        return 0
+
+    match = MAX_AGE_PATTERN.search(headers.get('Cache-Control', ''))
+
+    if match:
+        return now + int(match.group(1))
+
+    return 0
+
+
+class ResponseCache(object):
+    """In-memory LRU cache of responses, bounded by number of entries."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.clock = time.time
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, url):
+        """Drop every entry for url, whatever its params."""
+        prefix = 'GET %s?' % url
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+        }
+
+
+class SQLiteCache(object):
+    """Cache of responses in an SQLite database under directory.
+
+    Bodies are stored compressed with zlib. Several threads and processes
+    can share the database: each thread opens its own connection, and the
+    database is in WAL mode so readers never wait for a writer.
+
+    Entries older than ttl seconds are dropped, whatever their freshness.
+    Past max_entries entries or max_bytes bytes of stored bodies, the least
+    recently used entries are evicted. Hit counters are per process.
+    """
+
+    # Seconds between updates of an entry's last access time, which would
+    # otherwise make every hit a write.
+    access_resolution = 60
+
+    def __init__(self, directory, max_entries=None, max_bytes=None, ttl=None,
+                 compress_level=6, timeout=10.0, filename='responses.sqlite'):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # Created meanwhile by another process.
+            if not os.path.isdir(directory):
+                raise
+
+        self.path = os.path.join(directory, filename)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.compress_level = compress_level
+        self.timeout = timeout
+        self.clock = time.time
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._database().execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def _database(self):
+        """Connection to the database for the current thread and process."""
+        database = getattr(self._local, 'database', None)
+
+        # A connection inherited across a fork must not be used.
+        if database is not None and self._local.pid == os.getpid():
+            return database
+
+        database = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        database.execute('PRAGMA journal_mode=WAL')
+        database.execute('PRAGMA synchronous=NORMAL')
+        database.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY,'
+            ' status_code INTEGER NOT NULL,'
+            ' headers TEXT NOT NULL,'
+            ' content BLOB NOT NULL,'
+            ' url TEXT,'
+            ' encoding TEXT,'
+            ' expires REAL NOT NULL,'
+            ' stored REAL NOT NULL,'
+            ' accessed REAL NOT NULL,'
+            ' size INTEGER NOT NULL)')
+        database.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+        self._local.database = database
+        self._local.pid = os.getpid()
+        return database
+
+    def get(self, key):
+        database = self._database()
+        now = self.clock()
+
+        row = database.execute(
+            'SELECT status_code, headers, content, url, encoding, expires, stored, accessed'
+            ' FROM responses WHERE key = ?', (key,)).fetchone()
+
+        if row is None:
+            return None
+
+        (status_code, headers, content, url, encoding, expires, stored, accessed) = row
+
+        if self.ttl is not None and stored + self.ttl <= now:
+            database.execute('DELETE FROM responses WHERE key = ? AND stored = ?', (key, stored))
+            return None
+
+        if accessed + self.access_resolution <= now:
+            database.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+
+        return CacheEntry(status_code, json.loads(headers), zlib.decompress(content),
+                          url, encoding, expires)
+
+    def set(self, key, entry):
+        now = self.clock()
+        content = zlib.compress(entry.content or b'', self.compress_level)
+        database = self._database()
+
+        database.execute('BEGIN IMMEDIATE')
+
+        try:
+            database.execute(
+                'INSERT OR REPLACE INTO responses'
+                ' (key, status_code, headers, content, url, encoding, expires, stored, accessed, size)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, entry.status_code, json.dumps(dict(entry.headers)), sqlite3.Binary(content),
+                 entry.url, entry.encoding, entry.expires, now, now, len(content)))
+            self._evict(database, now)
+            database.execute('COMMIT')
+        except Exception:
+            database.execute('ROLLBACK')
+            raise
+
+    def _evict(self, database, now):
+        if self.ttl is not None:
+            database.execute('DELETE FROM responses WHERE stored <= ?', (now - self.ttl,))
+
+        if self.max_entries is None and self.max_bytes is None:
+            return
+
+        (entries, size) = database.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+
+        evicted = []
+
+        for (key, entry_size) in database.execute(
+                'SELECT key, size FROM responses ORDER BY accessed, stored'):
+            if ((self.max_entries is None or entries <= self.max_entries)
+                    and (self.max_bytes is None or size <= self.max_bytes)):
+                break
+            evicted.append((key,))
+            entries -= 1
+            size -= entry_size
+
+        database.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    def delete(self, key):
+        self._database().execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def invalidate(self, url):
+        """Drop every entry for url, whatever its params."""
+        prefix = 'GET %s?' % url
+        # Keys starting with prefix sort between it and the prefix ending in
+        # the character after '?'.
+        self._database().execute('DELETE FROM responses WHERE key >= ? AND key < ?',
+                                 (prefix, prefix[:-1] + '@'))
+
+    def clear(self):
+        self._database().execute('DELETE FROM responses')
+
+    def close(self):
+        """Close the current thread's connection to the database."""
+        database = getattr(self._local, 'database', None)
+        if database is not None:
+            database.close()
+            self._local.database = None
+
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        (entries, size) = self._database().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {
+            'entries': entries,
+            'bytes': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+        }
@@ -0,0 +1,128 @@
+"""
+Single-flight coalescing of identical concurrent GET requests.
+
+While a GET is in flight, identical GETs, ie with the same URL, params,
+Accept header and user, wait for it instead of sending their own request.
+They each get a response of their own sharing its content, and the body is
+decoded only once for all of them. Each is handed its own copy of the
+decoded payload, so resources built from one response can be changed
+without changing the others. A request nobody joined pays for no copy.
+"""
+from __future__ import absolute_import
+
+import threading
+
+from activerest.caches import CacheEntry
+from activerest.formats import decode_response
+
+
+# Guards giving a response its shared entry, as followers may race for it.
+_shareable_lock = threading.Lock()
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class RequestCoalescer(object):
+    """Requests in flight by key, with counters of how many were collapsed.
+
+    A coalescer can be shared by connections, and serves both Connection
+    and AsyncConnection; async requests are only coalesced with requests in
+    the same event loop.
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.collapsed = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._calls)
+
+    def join(self, key, factory):
+        """The call in flight for key, and whether it was started with factory."""
+        with self._lock:
+            call = self._calls.get(key)
+
+            if call is not None:
+                self.collapsed += 1
+                if isinstance(call, _Call):
+                    call.followers += 1
+                return (call, False)
+
+            call = self._calls[key] = factory()
+            self.leaders += 1
+            return (call, True)
+
+    def leave(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def do(self, key, function, format=None):
+        """Call function for key, or wait for the call already in flight.
+
+        If other calls are waiting, the leader decodes a successful response
+        with format before handing it over, so they all copy one payload.
+        """
+        (call, leader) = self.join(key, _Call)
+
+        if leader:
+            try:
+                call.result = function()
+                if call.followers and format is not None:
+                    predecode(shareable(call.result), format)
+            except Exception as error:
+                call.error = error
+                raise
+            finally:
+                self.leave(key)
+                call.done.set()
+
+            return call.result
+
+        call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+
+        return follow(call.result)
+
+    def stats(self):
+        return {
+            'in_flight': len(self._calls),
+            'leaders': self.leaders,
+            'collapsed': self.collapsed,
+        }
+
+
+def shareable(response):
+    """Make response shareable, giving it an entry that memoizes its decoded payload."""
+    with _shareable_lock:
+        if getattr(response, 'cache_entry', None) is None:
+            response.cache_entry = CacheEntry.from_response(response, 0)
+    return response
+
+
+def predecode(response, format):
+    entry = response.cache_entry
+
+    if entry.decoded is None and response.status_code == 200 and response.content:
+        try:
+            entry.decoded = decode_response(format, response)
+        except Exception:
+            # Left for each request to fail decoding on its own.
+            pass
+
+
+def follow(response):
+    """A response of its own for a request coalesced into response."""
+    followed = shareable(response).cache_entry.response()
+    followed.from_cache = getattr(response, 'from_cache', False)
+    followed.coalesced = True
+    return followed
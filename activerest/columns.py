@@ -0,0 +1,132 @@
+"""
+Columnar results for Resource.find_columns.
+
+A ColumnBuilder turns decoded rows straight into one column of values per
+attribute, without building resources. Columns are NumPy arrays when NumPy
+is installed and their values are numbers or booleans, or have a declared
+dtype, and lists otherwise.
+
+Rows are converted in chunks, so a streamed or paginated collection only
+holds one chunk of rows at a time besides its columns.
+"""
+from __future__ import absolute_import
+
+from collections import OrderedDict
+from itertools import chain
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Array kinds kept for inferred columns: booleans, integers and floats.
+NUMERIC_KINDS = frozenset('biuf')
+
+
+class ColumnBuilder(object):
+    """Values of each field of the rows added to it, by field name.
+
+    Without fields, the fields are the keys found in the rows, in the order
+    they first appear, and rows missing a field have None for it. dtypes
+    maps field names to the NumPy dtype of their arrays, and needs NumPy.
+    """
+
+    def __init__(self, fields=None, dtypes=None, chunk_size=10000):
+        if dtypes and numpy is None:
+            raise ImportError('numpy is required for dtypes')
+
+        self.dtypes = dict(dtypes or {})
+        self.chunk_size = chunk_size
+        self.count = 0
+        self._infer_fields = fields is None
+        self._chunks = OrderedDict((name, []) for name in fields or [])
+        self._lists = set()
+        self._rows = []
+
+    def __len__(self):
+        return self.count + len(self._rows)
+
+    @property
+    def fields(self):
+        return list(self._chunks)
+
+    def append(self, row):
+        self._rows.append(row)
+
+        if len(self._rows) >= self.chunk_size:
+            self.flush()
+
+    def extend(self, rows):
+        self.flush()
+
+        for start in range(0, len(rows), self.chunk_size):
+            self._add(rows[start:start + self.chunk_size])
+
+    def flush(self):
+        """Convert the rows appended so far into their columns."""
+        if self._rows:
+            rows = self._rows
+            self._rows = []
+            self._add(rows)
+
+    def columns(self):
+        """The columns of every row added, by field name."""
+        self.flush()
+        return OrderedDict((name, self._join(name, chunks))
+                           for (name, chunks) in self._chunks.items())
+
+    def _add(self, rows):
+        if not rows:
+            return
+
+        if self._infer_fields and not set().union(*rows).issubset(self._chunks):
+            for row in rows:
+                for name in row:
+                    if name not in self._chunks:
+                        self._add_field(name)
+
+        for (name, chunks) in self._chunks.items():
+            chunks.append(self._convert(name, [row.get(name) for row in rows]))
+
+        self.count += len(rows)
+
+    def _add_field(self, name):
+        self._chunks[name] = []
+
+        if self.count:
+            # Rows added before the field was seen are missing it.
+            self._chunks[name].append(self._convert(name, [None] * self.count))
+
+    def _convert(self, name, values):
+        if numpy is None:
+            return values
+
+        if name in self.dtypes:
+            return numpy.asarray(values, dtype=self.dtypes[name])
+
+        if name in self._lists:
+            return values
+
+        try:
+            array = numpy.asarray(values)
+        except (TypeError, ValueError):
+            array = None
+
+        if array is None or array.ndim != 1 or array.dtype.kind not in NUMERIC_KINDS:
+            self._lists.add(name)
+            return values
+
+        return array
+
+    def _join(self, name, chunks):
+        if name in self.dtypes:
+            if not chunks:
+                return numpy.empty(0, dtype=self.dtypes[name])
+            return numpy.concatenate(chunks)
+
+        if numpy is None or name in self._lists or not chunks:
+            return list(chain.from_iterable(
+                chunk.tolist() if hasattr(chunk, 'tolist') else chunk for chunk in chunks))
+
+        return numpy.concatenate(chunks)
@@ -1,7 +1,37 @@
+"""
+HTTP connections to a REST site.
+
+A Connection is safe to share between threads, as resource classes do.
+Requests go through a requests.Session, which is not thread-safe, so each
+connection has a session of its own in every thread, which keeps no
+cookies. Only the HTTPAdapter is shared, per connection or, with
+share_pool, per site and pool settings; its urllib3 connection pools are
+thread-safe. Keep-alive connections are therefore pooled across threads
+and connections, and pool_maxsize bounds how many stay open to a host.
+
+Configure connections, and resource classes, before sharing them between
+threads: changing a setting while requests are in flight is not atomic.
+"""
+from __future__ import absolute_import
+
+from future.standard_library import install_aliases
+
+install_aliases()
+
 import activerest.formats.json_format
 import requests
+import six
+import threading
+import zlib
 
+from activerest.caches import CacheEntry, cache_key, is_cacheable
+from activerest.instrumentation import HOOKS, RequestEvent
+from activerest.retries import RETRYABLE_ERRORS
 from furl import furl
+from http.cookiejar import CookiePolicy
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE, HTTPAdapter
+from timeit import default_timer
+from urllib.parse import quote
 
 
 HTTP_FORMAT_HEADER_NAMES = {
@@ -13,6 +43,38 @@ HTTP_FORMAT_HEADER_NAMES = {
     'HEAD': 'Accept',
 }
 
+# Characters left as they are when quoting request paths.
+PATH_SAFE_CHARACTERS = "/:@!$&'()*+,;=-._~%"
+
+class NoCookiesPolicy(CookiePolicy):
+    """Refuses every cookie, so sessions never carry one between requests.
+
+    Sessions are shared by connections with different credentials, and
+    cookies set in a response to one must not be sent by another.
+    """
+    netscape = True
+    rfc2965 = False
+    hide_cookie2 = False
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+    def domain_return_ok(self, domain, request):
+        return False
+
+    def path_return_ok(self, path, request):
+        return False
+
+
+# Adapters shared between connections to the same site with the same pool
+# settings, so every resource class pointing at a site reuses one pool.
+_shared_adapters = {}
+_shared_adapters_lock = threading.Lock()
+
+
 class Connection(object):
     _site = None
     _format = None
@@ -29,11 +91,37 @@ class Connection(object):
 
     proxies = None
 
-    requests = []
+    cache = None
+    coalescer = None
+
+    _pool_connections = DEFAULT_POOLSIZE
+    _pool_maxsize = DEFAULT_POOLSIZE
+    _pool_block = DEFAULT_POOLBLOCK
+
+    keep_alive = True
+    share_pool = True
+
+    # Request bodies of at least this many bytes are sent gzipped. Responses
+    # are negotiated compressed regardless, as both requests and aiohttp send
+    # Accept-Encoding: gzip, deflate and decompress transparently.
+    compress_threshold = None
+    compress_level = 6
+
+    _adapter = None
+    _session = None
+
+    request_log = None
+
+    retry = None
+    circuit_breaker = None
+    rate_limiter = None
 
     def __init__(self, site, format=activerest.formats.json_format):
         self.site = site
         self.format = format
+        self.hooks = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
 
     @property
     def site(self):
@@ -42,11 +130,15 @@ class Connection(object):
     @site.setter
     def site(self, site):
 
-        if isinstance(self._site, furl):
+        if isinstance(site, furl):
             self._site = site
         else:
             self._site = furl(site)
 
+        self._base_url = furl().set(scheme=self._site.scheme,
+                                    host=self._site.host,
+                                    port=self._site.port).url
+
         if self._site.username:
             self.username = self._site.username
 
@@ -97,6 +189,163 @@ class Connection(object):
         else:
             raise ValueError('read_timeout must be an instance of float or int')
 
+    @property
+    def pool_connections(self):
+        return self._pool_connections
+
+    @pool_connections.setter
+    def pool_connections(self, pool_connections):
+        if isinstance(pool_connections, int) and pool_connections > 0:
+            self._pool_connections = pool_connections
+            self._reset_pool()
+        else:
+            raise ValueError('pool_connections must be a positive int')
+
+    @property
+    def pool_maxsize(self):
+        return self._pool_maxsize
+
+    @pool_maxsize.setter
+    def pool_maxsize(self, pool_maxsize):
+        if isinstance(pool_maxsize, int) and pool_maxsize > 0:
+            self._pool_maxsize = pool_maxsize
+            self._reset_pool()
+        else:
+            raise ValueError('pool_maxsize must be a positive int')
+
+    @property
+    def pool_block(self):
+        return self._pool_block
+
+    @pool_block.setter
+    def pool_block(self, pool_block):
+        if isinstance(pool_block, bool):
+            self._pool_block = pool_block
+            self._reset_pool()
+        else:
+            raise ValueError('pool_block must be an instance of bool')
+
+    @property
+    def hooks(self):
+        return self._hooks
+
+    @hooks.setter
+    def hooks(self, hooks):
+        unknown = set(hooks) - set(HOOKS)
+        if unknown:
+            raise ValueError('hook must be one of %s' % ', '.join(HOOKS))
+        # The callback lists are kept, so connections given the same hooks
+        # share registrations.
+        self._hooks = dict((name, hooks[name] if name in hooks else []) for name in HOOKS)
+
+    @property
+    def adapter(self):
+        """Transport adapter holding the keep-alive pools, shared by every thread."""
+        adapter = self._adapter
+
+        if adapter is None:
+            if self.share_pool:
+                key = (self._site.scheme,
+                       self._site.host,
+                       self._site.port,
+                       self._pool_connections,
+                       self._pool_maxsize,
+                       self._pool_block)
+                with _shared_adapters_lock:
+                    if key not in _shared_adapters:
+                        _shared_adapters[key] = self.build_adapter()
+                    adapter = _shared_adapters[key]
+            else:
+                with self._lock:
+                    if self._adapter is None:
+                        self._adapter = self.build_adapter()
+                    adapter = self._adapter
+
+            self._adapter = adapter
+
+        return adapter
+
+    @property
+    def session(self):
+        """Session of the connection in the current thread, sending requests through the adapter."""
+        adapter = self.adapter
+        session = getattr(self._local, 'session', None)
+
+        if session is None or session.get_adapter('http://') is not adapter:
+            session = self._local.session = self.build_session(adapter)
+
+        return session
+
+    def build_adapter(self):
+        return HTTPAdapter(pool_connections=self._pool_connections,
+                           pool_maxsize=self._pool_maxsize,
+                           pool_block=self._pool_block)
+
+    def build_session(self, adapter=None):
+        if adapter is None:
+            adapter = self.build_adapter()
+        session = requests.Session()
+        session.cookies.set_policy(NoCookiesPolicy())
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _reset_pool(self):
+        self._adapter = None
+        self._session = None
+
+    def pool_stats(self):
+        """Connection reuse counters for the pools behind this connection.
+
+        The counters are kept per pool, so connections sharing a pool report
+        the same numbers.
+        """
+        stats = {
+            'pools': 0,
+            'connections': 0,
+            'requests': 0,
+        }
+
+        pools = self.adapter.poolmanager.pools
+
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats['pools'] += 1
+            stats['connections'] += pool.num_connections
+            stats['requests'] += pool.num_requests
+
+        stats['reused'] = stats['requests'] - stats['connections']
+        return stats
+
+    def on(self, hook, callback):
+        """Register a callback, called with a RequestEvent, for a hook.
+
+        before_request callbacks are called before sending each request.
+        after_response callbacks are called once the response has been
+        handled, and on_error callbacks when sending or handling it failed.
+        """
+        if hook not in HOOKS:
+            raise ValueError('hook must be one of %s' % ', '.join(HOOKS))
+        self._hooks[hook].append(callback)
+        return callback
+
+    def off(self, hook, callback):
+        """Unregister a callback from a hook."""
+        self._hooks[hook].remove(callback)
+
+    def emit(self, hook, event):
+        for callback in list(self._hooks[hook]):
+            callback(event)
+
+        if hook != 'before_request' and self.request_log is not None:
+            self.request_log.record(event)
+
+    def is_instrumented(self):
+        """Are requests turned into events, ie is there a hook or request log."""
+        return self.request_log is not None or any(self._hooks.values())
+
     def get(self, path, **kwargs):
         return self._request('GET', path, **kwargs)
 
@@ -115,7 +364,158 @@ class Connection(object):
     def head(self, path, **kwargs):
         return self._request('HEAD', path, **kwargs)
 
-    def _request(self, method, path, **kwargs):
+    def _request(self, method, path, template=None, resource_class=None, defer=False, **kwargs):
+        """Send a request, instrumented if the connection is.
+
+        template and resource_class describe the request in its event. With
+        defer=True the event is left for the caller to finish once it has
+        decoded the response, see activerest.instrumentation.complete.
+        """
+        (url, kwargs) = self._prepare_request(method, path, **kwargs)
+
+        if not self.is_instrumented():
+            return self._send(method, url, kwargs)
+
+        event = RequestEvent(self, method, url, template, resource_class)
+        self.emit('before_request', event)
+        start = default_timer()
+
+        try:
+            response = self._send(method, url, kwargs)
+        except Exception as error:
+            event.timings['connect'] = default_timer() - start
+            event.finish(error)
+            raise
+
+        event.received(response, default_timer() - start, stream=kwargs.get('stream', False))
+        response.event = event
+
+        if not defer:
+            event.finish()
+
+        return response
+
+    def _send(self, method, url, kwargs):
+        if method == 'GET' and self.coalescer is not None and not kwargs.get('stream'):
+            key = cache_key('GET',
+                            str(url),
+                            kwargs.get('params'),
+                            kwargs['headers'].get('Accept'),
+                            self.username)
+            return self.coalescer.do(key,
+                                     lambda: self._send_uncoalesced(method, url, kwargs),
+                                     self.format)
+
+        return self._send_uncoalesced(method, url, kwargs)
+
+    def _send_uncoalesced(self, method, url, kwargs):
+        if self.cache is not None and not kwargs.get('stream'):
+            if method == 'GET':
+                return self._cached_request(url, kwargs)
+
+            response = self._session_request(method, url, kwargs)
+            if response.status_code < 400:
+                self.cache.invalidate(str(url))
+            return response
+
+        return self._session_request(method, url, kwargs)
+
+    def _cached_request(self, url, kwargs):
+        cache = self.cache
+        key = cache_key('GET',
+                        str(url),
+                        kwargs.get('params'),
+                        kwargs['headers'].get('Accept'),
+                        self.username)
+
+        entry = cache.get(key)
+
+        if entry is not None:
+            if entry.is_fresh(cache.clock()):
+                cache.count('hits')
+                return entry.response()
+            kwargs['headers'].update(entry.validator_headers())
+
+        response = self._session_request('GET', url, kwargs)
+
+        if entry is not None and response.status_code == requests.codes.not_modified:
+            entry.revalidated(response.headers, cache.clock())
+            cache.set(key, entry)
+            cache.count('revalidations')
+            return entry.response()
+
+        cache.count('misses')
+
+        if is_cacheable(response):
+            entry = CacheEntry.from_response(response, cache.clock())
+            cache.set(key, entry)
+            response.cache_entry = entry
+
+        return response
+
+    def _session_request(self, method, url, kwargs):
+        """Send a request with the session, through the retry policy and circuit breaker."""
+        retry = self.retry
+        breaker = self.circuit_breaker
+
+        if retry is None and breaker is None:
+            return self._limited_request(method, url, kwargs)
+
+        if retry is not None:
+            retry.started()
+
+        attempt = 0
+
+        while True:
+            if breaker is not None:
+                breaker.before_request(self._base_url)
+
+            try:
+                response = self._limited_request(method, url, kwargs)
+            except RETRYABLE_ERRORS as error:
+                if breaker is not None:
+                    breaker.record(self._base_url, error=error)
+                delay = retry.next_delay(method, attempt, error=error) if retry else None
+                if delay is None:
+                    raise
+            except Exception as error:
+                if breaker is not None:
+                    breaker.record(self._base_url, error=error)
+                raise
+            except BaseException:
+                if breaker is not None:
+                    breaker.release(self._base_url)
+                raise
+            else:
+                if breaker is not None:
+                    breaker.record(self._base_url, response.status_code)
+                delay = retry.next_delay(method, attempt, response=response) if retry else None
+                if delay is None:
+                    return response
+                response.close()
+
+            retry.sleep(delay)
+            attempt += 1
+
+    def _limited_request(self, method, url, kwargs):
+        """Send a request with the session once the rate limiter allows it."""
+        limiter = self.rate_limiter
+
+        if limiter is None:
+            return self.session.request(method, url, **kwargs)
+
+        ticket = limiter.acquire((self._base_url, self.username))
+
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except BaseException:
+            limiter.release(ticket)
+            raise
+
+        limiter.release(ticket, response)
+        return response
+
+    def _prepare_request(self, method, path, **kwargs):
         kwargs['headers'] = self.build_request_headers(kwargs.get('headers', {}), method)
 
         if self.username and self.password:
@@ -146,13 +546,30 @@ class Connection(object):
         if open_timeout or read_timeout:
             kwargs['timeout'] = (open_timeout, read_timeout)
 
-        url = furl().set(scheme=self._site.scheme,
-                         host=self._site.host,
-                         port=self._site.port,
-                         path=path)
+        if self.compress_threshold is not None and kwargs.get('data') is not None:
+            self._compress_body(kwargs)
 
-        response = requests.request(method, url, **kwargs)
-        return response
+        return (self.build_url(path), kwargs)
+
+    def _compress_body(self, kwargs):
+        data = kwargs['data']
+
+        if not isinstance(data, (six.binary_type, six.text_type)) \
+                or len(data) < self.compress_threshold:
+            return
+
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+
+        # wbits of 16 + MAX_WBITS writes a gzip header and trailer.
+        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        kwargs['data'] = compressor.compress(data) + compressor.flush()
+        kwargs['headers']['Content-Encoding'] = 'gzip'
+
+    def build_url(self, path):
+        """URL for a request path on the site, which may include a query string."""
+        (path, separator, query) = path.partition('?')
+        return self._base_url + quote(path, safe=PATH_SAFE_CHARACTERS) + separator + query
 
     @property
     def default_header(self):
@@ -169,6 +586,8 @@ class Connection(object):
         result = {}
         result.update(self.default_header)
         result.update(self.http_format_header(method))
+        if not self.keep_alive:
+            result['Connection'] = 'close'
         result.update(headers)
         return result
 
@@ -1,6 +1,49 @@
+import codecs
+
+
 def remove_root(data):
     if isinstance(data, dict) and len(data) == 1:
         first_value = list(data.values())[0]
         if isinstance(first_value, (dict, list)):
             return first_value
     return data
+
+
+def copy_payload(data):
+    """Copy of a decoded payload, sharing only its immutable values.
+
+    Much cheaper than copy.deepcopy, as payloads hold nothing but dicts and
+    lists of scalars.
+    """
+    if isinstance(data, list):
+        return [copy_payload(value) for value in data]
+    if isinstance(data, dict):
+        copied = type(data)()
+        for (key, value) in data.items():
+            copied[key] = copy_payload(value)
+        return copied
+    return data
+
+def decode_response(format, response, collection=False):
+    """Decode the body of response, straight from its bytes if the format can.
+
+    With collection, the body is decoded with the format's decode_collection
+    where it has one, for formats that wrap each row of a collection.
+    """
+    decode = format.decode
+    if collection:
+        decode = getattr(format, 'decode_collection', decode)
+
+    if getattr(format, 'binary', False):
+        return decode(response.content)
+    if getattr(format, 'decode_bytes', False) and _is_utf8(response.encoding):
+        return decode(response.content)
+    return decode(response.text)
+
+def _is_utf8(encoding):
+    if encoding is None:
+        return True
+    try:
+        return codecs.lookup(encoding).name == 'utf-8'
+    except LookupError:
+        return False
@@ -1,8 +1,146 @@
+"""
+JSON format.
+
+Documents are encoded and decoded with the fastest JSON library installed,
+orjson or ujson, falling back to the standard library's json. A resource can
+pick a library with its format, eg format = json_format.backend('json').
+"""
+import codecs
 import json
+import re
 
 from activerest.formats import remove_root
 
 
+_decoder = json.JSONDecoder()
+
+WHITESPACE = ' \t\n\r'
+
+# What may be left of a number cut short at the end of the buffer.
+NUMBER_TAIL = re.compile(r'[-+.eE0-9]*\Z')
+
+# Backends by name, in order of preference.
+BACKENDS = ['orjson', 'ujson', 'json']
+
+# Integers of 20 digits or more may not fit in 64 bits, which orjson and
+# ujson decode as floats or fail on. Documents are checked for them with
+# every digit translated to 0, which is much faster than a regex.
+LONG_NUMBER = b'0' * 20
+DIGITS_TO_ZERO = bytes.maketrans(b'123456789', b'000000000')
+
+# decode accepts the bytes of a UTF-8 body, so responses need not be
+# decoded to text first.
+decode_bytes = True
+
+
+class JsonBackend(object):
+    """The JSON format using a given JSON library, see backend.
+
+    Libraries limited to 64-bit integers hand documents they would get
+    wrong over to the standard library's json, so every backend decodes and
+    encodes the same values, unless made with exact_integers=False.
+    """
+
+    decode_bytes = True
+
+    def __init__(self, name, loads, dumps, int64_only=False, exact_integers=True):
+        self.name = name
+        self._loads = loads
+        self._dumps = dumps
+        self._int64_only = int64_only and exact_integers
+
+    def __repr__(self):
+        return 'JsonBackend(%r)' % self.name
+
+    def extension(self):
+        return extension()
+
+    def mime_type(self):
+        return mime_type()
+
+    def encode(self, data, **kwargs):
+        if kwargs:
+            return _encode(data, **kwargs)
+
+        if not self._int64_only:
+            return self._dumps(data)
+
+        try:
+            return self._dumps(data)
+        except (OverflowError, TypeError):
+            # Integers past 64 bits, or a type json may yet refuse too.
+            return _encode(data)
+
+    def decode(self, text):
+        if self._int64_only and _has_long_number(text):
+            return remove_root(json.loads(text))
+        return remove_root(self._loads(text))
+
+    def iterdecode(self, chunks, encoding=None):
+        return iterdecode(chunks, encoding)
+
+
+def _encode(data, **kwargs):
+    encode_kwargs = {
+        'separators': (',', ':'),
+    }
+    encode_kwargs.update(kwargs)
+    return json.dumps(data, **encode_kwargs)
+
+def _has_long_number(text):
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    return LONG_NUMBER in text.translate(DIGITS_TO_ZERO)
+
+def _load_backend(name, exact_integers):
+    if name == 'json':
+        return JsonBackend(name, json.loads, _encode)
+
+    if name == 'orjson':
+        import orjson
+        return JsonBackend(name, orjson.loads,
+                           lambda data: orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8'),
+                           int64_only=True, exact_integers=exact_integers)
+
+    if name == 'ujson':
+        import ujson
+        return JsonBackend(name, ujson.loads,
+                           lambda data: ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False),
+                           int64_only=True, exact_integers=exact_integers)
+
+    raise ValueError('backend must be one of %s' % ', '.join(BACKENDS))
+
+_backends = {}
+
+def backend(name=None, exact_integers=True):
+    """The JSON format using the named library, or the fastest one installed.
+
+    orjson and ujson only handle 64-bit integers, and documents with longer
+    ones are decoded and encoded with json instead. Pass
+    exact_integers=False to skip that check, for documents known not to
+    have them; longer integers then decode as floats or fail.
+
+    Raises ImportError if the named library is not installed.
+    """
+    if name is None:
+        name = _default.name
+
+    key = (name, exact_integers)
+    if key not in _backends:
+        _backends[key] = _load_backend(name, exact_integers)
+
+    return _backends[key]
+
+def _default_backend():
+    for name in BACKENDS:
+        try:
+            return backend(name)
+        except ImportError:
+            pass
+
+_default = _default_backend()
+
+
 def extension():
     return 'json'
 
@@ -10,11 +148,165 @@ def mime_type():
     return 'application/json'
 
 def encode(data, **kwargs):
-    encode_kwargs = {
-        'indent': 4,
-    }
-    encode_kwargs.update(kwargs)
-    return json.dumps(data, **encode_kwargs)
+    return _default.encode(data, **kwargs)
 
 def decode(text):
-    return remove_root(json.loads(text))
+    return _default.decode(text)
+
+def iterdecode(chunks, encoding=None):
+    """Decode a JSON document incrementally from an iterable of chunks.
+
+    Yields the elements of a top-level array, or of an array wrapped in a
+    single root key, as soon as each one is complete. Any other document is
+    decoded whole and yielded as with decode.
+    """
+    reader = _ChunkReader(chunks, encoding or 'utf-8')
+
+    char = reader.peek()
+
+    if char == '[':
+        reader.advance()
+        reader.keep = False
+        for value in _iterarray(reader):
+            yield value
+        reader.expect_end()
+        return
+
+    if char == '{':
+        reader.advance()
+        if reader.peek() == '"':
+            key = reader.value()
+            reader.expect(':')
+            if reader.peek() == '[':
+                reader.advance()
+                reader.keep = False
+                for value in _iterarray(reader):
+                    yield value
+                if reader.peek() != '}':
+                    raise ValueError('expected a single root key around %r' % key)
+                reader.advance()
+                reader.expect_end()
+                return
+        reader.rewind()
+
+    data = decode(reader.rest())
+    if isinstance(data, list):
+        for value in data:
+            yield value
+    else:
+        yield data
+
+def _iterarray(reader):
+    if reader.peek() == ']':
+        reader.advance()
+        return
+
+    while True:
+        yield reader.value()
+
+        char = reader.peek()
+        reader.advance()
+
+        if char == ']':
+            return
+        if char != ',':
+            raise ValueError('expected , or ] at position %d' % reader.offset)
+
+
+class _ChunkReader(object):
+    def __init__(self, chunks, encoding):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.buffer = ''
+        self.pos = 0
+        self.consumed = 0
+        self.eof = False
+        # The buffer is kept whole until the document shape is known, so
+        # that decoding can start over from the beginning.
+        self.keep = True
+
+    @property
+    def offset(self):
+        return self.consumed + self.pos
+
+    def read(self, size=1):
+        """Append at least size characters to the buffer, unless at EOF."""
+        if self.pos and not self.keep:
+            self.consumed += self.pos
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+
+        added = 0
+
+        while added < size and not self.eof:
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                self.eof = True
+                text = self.decoder.decode(b'', True)
+            else:
+                if isinstance(chunk, bytes):
+                    text = self.decoder.decode(chunk)
+                else:
+                    text = chunk
+            self.buffer += text
+            added += len(text)
+
+        return added
+
+    def peek(self):
+        """Next non-whitespace character, or an empty string at EOF."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read():
+                return ''
+
+    def advance(self):
+        self.pos += 1
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('expected %s at position %d' % (char, self.offset))
+        self.advance()
+
+    def expect_end(self):
+        if self.peek() != '':
+            raise ValueError('extra data at position %d' % self.offset)
+
+    def rewind(self):
+        self.pos = 0
+
+    def rest(self):
+        while self.read(len(self.buffer) or 1):
+            pass
+        text = self.buffer
+        self.buffer = ''
+        self.pos = 0
+        return text
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+
+        while True:
+            try:
+                (value, end) = _decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+                self.read(len(self.buffer) - self.pos)
+                continue
+
+            # A number at the end of the buffer may continue in the next chunk,
+            # including after a tail that only makes sense as part of it, eg
+            # the '.' of '2.' or the 'e' of '1e'.
+            if not self.eof and isinstance(value, (int, float)) and not isinstance(value, bool) \
+                    and NUMBER_TAIL.match(self.buffer, end):
+                self.read()
+                continue
+
+            self.pos = end
+            return value
@@ -0,0 +1,99 @@
+"""
+MessagePack format, a binary encoding of the same data as JSON.
+
+Bodies are encoded to and decoded from bytes without building a str. Needs
+the msgpack package, installed with the msgpack extra.
+"""
+import msgpack
+
+from activerest.formats import remove_root
+
+
+class TruncatedError(ValueError):
+    pass
+
+
+# Bodies are bytes, decoded from response.content whatever the charset.
+binary = True
+
+
+def extension():
+    return 'msgpack'
+
+def mime_type():
+    return 'application/msgpack'
+
+def encode(data, **kwargs):
+    encode_kwargs = {
+        'use_bin_type': True,
+    }
+    encode_kwargs.update(kwargs)
+    return msgpack.packb(data, **encode_kwargs)
+
+def decode(data):
+    return remove_root(msgpack.unpackb(data, raw=False))
+
+def iterdecode(chunks, encoding=None):
+    """Decode a MessagePack document incrementally from an iterable of chunks.
+
+    Yields the elements of a top-level array, or of an array wrapped in a
+    single root key, as soon as each one is complete. Any other document is
+    decoded whole and yielded as with decode.
+    """
+    unpacker = msgpack.Unpacker(raw=False)
+    chunks = iter(chunks)
+
+    def read(operation):
+        while True:
+            try:
+                return operation()
+            except msgpack.OutOfData:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    raise TruncatedError('truncated MessagePack document')
+                unpacker.feed(chunk)
+
+    def array_header():
+        # Raises ValueError, without consuming anything, if the next
+        # value is not an array.
+        try:
+            return read(unpacker.read_array_header)
+        except TruncatedError:
+            raise
+        except ValueError:
+            return None
+
+    length = array_header()
+
+    if length is None:
+        try:
+            size = read(unpacker.read_map_header)
+        except TruncatedError:
+            raise
+        except ValueError:
+            yield read(unpacker.unpack)
+            return
+
+        data = {}
+
+        if size == 1:
+            key = read(unpacker.unpack)
+            length = array_header()
+            if length is None:
+                data[key] = read(unpacker.unpack)
+        else:
+            for _ in range(size):
+                key = read(unpacker.unpack)
+                data[key] = read(unpacker.unpack)
+
+        if length is None:
+            data = remove_root(data)
+            if isinstance(data, list):
+                for value in data:
+                    yield value
+            else:
+                yield data
+            return
+
+    for _ in range(length):
+        yield read(unpacker.unpack)
@@ -1,6 +1,14 @@
+import itertools
 import xmltodict
 
 from activerest.formats import remove_root
+from collections import deque
+from xml.parsers import expat
+
+
+# Documents need a single root element, so resources wrap what they encode
+# in one named after the element or collection.
+include_root = True
 
 
 def extension():
@@ -12,10 +20,62 @@ def mime_type():
 def encode(data, **kwargs):
     encode_kwargs = {
         'full_document': False,
-        'pretty': True,
+        'pretty': False,
     }
     encode_kwargs.update(kwargs)
     return xmltodict.unparse(data, **encode_kwargs)
 
 def decode(text):
     return remove_root(xmltodict.parse(text))
+
+def decode_collection(text):
+    """Decode an XML collection, the child elements of the document element.
+
+    <todos><todo>...</todo></todos> decodes to the list of todos, however
+    many there are, as iterdecode yields them.
+    """
+    return list(iterdecode([text]))
+
+def iterdecode(chunks, encoding=None):
+    """Decode an XML document incrementally from an iterable of chunks.
+
+    The document element is treated as the root and stripped, and each of
+    its child elements is yielded as soon as its end tag has been parsed.
+    """
+    items = deque()
+
+    def collect(path, item):
+        items.append(item)
+        return True
+
+    handler = xmltodict._DictSAXHandler(item_depth=2, item_callback=collect)
+
+    chunks = iter(chunks)
+    first = next(chunks, b'')
+
+    # Text is encoded as UTF-8 here, which must win over any encoding the
+    # document declares. Only bytes are parsed as declared, or as encoding.
+    if not isinstance(first, bytes):
+        encoding = 'utf-8'
+
+    parser = expat.ParserCreate(encoding)
+    parser.ordered_attributes = True
+    parser.buffer_text = True
+    parser.StartElementHandler = handler.startElement
+    parser.EndElementHandler = handler.endElement
+    parser.CharacterDataHandler = handler.characters
+    parser.EntityDeclHandler = _forbid_entities
+
+    for chunk in itertools.chain([first], chunks):
+        if not isinstance(chunk, bytes):
+            chunk = chunk.encode('utf-8')
+        parser.Parse(chunk, False)
+        while items:
+            yield items.popleft()
+
+    parser.Parse(b'', True)
+    while items:
+        yield items.popleft()
+
+def _forbid_entities(*args, **kwargs):
+    raise ValueError('entities are disabled')
@@ -0,0 +1,110 @@
+"""
+Identity map that deduplicates resources loaded within a unit of work.
+
+Inside a ``with IdentityMap():`` block every resource loaded from the API is
+registered under its class and primary key. Loading the same record again
+merges the new attributes into the registered instance and returns it, and
+``find(identifier)`` returns a registered instance without a request.
+
+Maps are entered per context, so each asyncio task and each thread has its
+own, and tasks started inside a block share its map. Resource methods that
+fan out to a thread pool, eg find_many, carry the map over to their workers
+with propagate.
+"""
+from __future__ import absolute_import
+
+import threading
+
+try:
+    from contextvars import ContextVar
+except ImportError:
+    ContextVar = None
+
+
+if ContextVar is not None:
+    _stack = ContextVar('activerest_identity_maps', default=())
+
+    def _get_stack():
+        return _stack.get()
+
+    def _set_stack(stack):
+        _stack.set(stack)
+else:
+    _local = threading.local()
+
+    def _get_stack():
+        return getattr(_local, 'stack', ())
+
+    def _set_stack(stack):
+        _local.stack = stack
+
+
+def propagate(function):
+    """Wrap function to run with the identity maps entered where it was wrapped."""
+    stack = _get_stack()
+
+    def run(*args, **kwargs):
+        saved = _get_stack()
+        _set_stack(stack)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _set_stack(saved)
+
+    return run
+
+
+class IdentityMap(object):
+    """Resources loaded within a block, by class and primary key.
+
+    A map may be shared by several threads, see propagate.
+    """
+
+    def __init__(self):
+        self._resources = {}
+
+    def __enter__(self):
+        _set_stack(_get_stack() + (self,))
+        return self
+
+    def __exit__(self, *args):
+        stack = list(_get_stack())
+        stack.remove(self)
+        _set_stack(tuple(stack))
+
+    def __len__(self):
+        return len(self._resources)
+
+    def __contains__(self, resource):
+        return self.get(type(resource), resource.id) is resource
+
+    @staticmethod
+    def stack():
+        """Identity maps entered in this context, innermost last."""
+        return _get_stack()
+
+    @classmethod
+    def current(cls):
+        """The innermost identity map entered in this context, if any."""
+        stack = _get_stack()
+        return stack[-1] if stack else None
+
+    def get(self, cls, identifier):
+        return self._resources.get((cls, str(identifier)))
+
+    def add(self, resource):
+        self._resources[(type(resource), str(resource.id))] = resource
+
+    def register(self, resource):
+        """Add resource unless its record is registered already, returning the registered one."""
+        return self._resources.setdefault((type(resource), str(resource.id)), resource)
+
+    def remove(self, resource):
+        self._resources.pop((type(resource), str(resource.id)), None)
+
+    def discard(self, cls, identifier):
+        """Remove the record of cls with identifier, if registered."""
+        self._resources.pop((cls, str(identifier)), None)
+
+    def clear(self):
+        self._resources.clear()
@@ -0,0 +1,338 @@
+"""
+Request instrumentation for Connection.
+
+Every request made through an instrumented connection, ie one with hooks
+registered or a request log set, is described by a RequestEvent. The
+connection passes it to the before_request hooks, then to the after_response
+hooks once the response has been decoded and hydrated into resources, or to
+the on_error hooks if that failed.
+
+A RequestLog keeps the most recent events in a ring buffer and aggregates
+counters and latency histograms per resource class, method and URL template.
+"""
+from __future__ import absolute_import
+
+import threading
+import time
+
+from bisect import bisect_left
+from collections import deque
+from timeit import default_timer
+
+
+HOOKS = ['before_request', 'after_response', 'on_error']
+
+TIMINGS = ['connect', 'transfer', 'decode', 'hydrate']
+
+# Upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+
+class RequestEvent(object):
+    """A request made by a connection and what it cost.
+
+    Timings are in seconds. connect runs from sending the request until the
+    response headers arrived, so it includes connection setup and the time
+    the server took; transfer is reading the body. decode and hydrate are
+    spent turning the body into data and the data into resources.
+    """
+
+    def __init__(self, connection, method, url, template=None, resource_class=None):
+        self.connection = connection
+        self.method = method
+        self.url = url
+        self.template = template
+        self.resource_class = resource_class
+        self.status_code = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.from_cache = False
+        self.timings = dict((name, 0.0) for name in TIMINGS)
+        self.error = None
+        self.started = time.time()
+        self.finished = False
+
+    def __repr__(self):
+        return 'RequestEvent(%s %s, status_code=%r, duration=%.6f)' % (
+            self.method, self.url, self.status_code, self.duration)
+
+    @property
+    def resource(self):
+        """Name of the resource class that made the request, if any."""
+        if self.resource_class is None:
+            return None
+        return self.resource_class.__name__
+
+    @property
+    def duration(self):
+        return sum(self.timings.values())
+
+    def received(self, response, elapsed, stream=False, connect=None):
+        """Record the response, returned elapsed seconds after sending the request.
+
+        The size of the body is taken from the Content-Length header, or
+        from the content if there is none and it has been read.
+        """
+        self.url = response.url or self.url
+        self.status_code = response.status_code
+        self.from_cache = getattr(response, 'from_cache', False)
+
+        if connect is None:
+            connect = response.elapsed.total_seconds() if response.elapsed else 0.0
+        connect = min(connect, elapsed)
+
+        self.timings['connect'] = connect
+        self.timings['transfer'] = elapsed - connect
+
+        request = response.request
+        if request is not None:
+            self.bytes_sent = int(request.headers.get('Content-Length') or 0)
+
+        # Content-Length counts the bytes on the wire, before decompression.
+        length = response.headers.get('Content-Length')
+
+        if length is not None:
+            self.bytes_received = int(length)
+        elif not stream:
+            self.bytes_received = len(response.content or b'')
+
+    def measure(self, timing):
+        """Context manager adding the time spent in its block to a timing."""
+        return _Measure(self, timing)
+
+    def finish(self, error=None):
+        """Hand the event to the connection's hooks and log, once."""
+        if self.finished:
+            return
+
+        self.finished = True
+        self.error = error
+
+        if error is None:
+            self.connection.emit('after_response', self)
+        else:
+            self.connection.emit('on_error', self)
+
+    def as_dict(self):
+        return {
+            'method': self.method,
+            'url': self.url,
+            'template': self.template,
+            'resource': self.resource,
+            'status_code': self.status_code,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'from_cache': self.from_cache,
+            'timings': dict(self.timings),
+            'duration': self.duration,
+            'error': repr(self.error) if self.error is not None else None,
+            'started': self.started,
+        }
+
+
+class _Measure(object):
+    def __init__(self, event, timing):
+        self.event = event
+        self.timing = timing
+
+    def __enter__(self):
+        self.start = default_timer()
+        return self.event
+
+    def __exit__(self, type, value, traceback):
+        self.event.timings[self.timing] += default_timer() - self.start
+
+
+class _Nothing(object):
+    def __enter__(self):
+        return None
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+
+_NOTHING = _Nothing()
+
+
+def measure(response, timing):
+    """Time a block into the event of response, if it has one."""
+    event = getattr(response, 'event', None)
+    if event is None:
+        return _NOTHING
+    return event.measure(timing)
+
+
+def measure_chunks(response, chunks):
+    """Time reading the chunks of a streamed body into the transfer timing.
+
+    The chunks are read while decoding, so their time is moved out of the
+    decode timing of the event.
+    """
+    event = getattr(response, 'event', None)
+
+    if event is None:
+        return chunks
+
+    return _measure_chunks(event, iter(chunks))
+
+
+def _measure_chunks(event, chunks):
+    while True:
+        start = default_timer()
+        chunk = next(chunks, None)
+        elapsed = default_timer() - start
+        event.timings['transfer'] += elapsed
+        event.timings['decode'] -= elapsed
+
+        if chunk is None:
+            return
+
+        yield chunk
+
+
+class complete(object):
+    """Context manager finishing the event of response when its block ends.
+
+    An exception raised in the block finishes the event as an error, except
+    for GeneratorExit, raised when a streaming consumer stops early.
+    """
+
+    def __init__(self, response):
+        self.event = getattr(response, 'event', None)
+
+    def __enter__(self):
+        return self.event
+
+    def __exit__(self, type, value, traceback):
+        if self.event is not None:
+            self.event.finish(None if isinstance(value, GeneratorExit) else value)
+
+
+class Histogram(object):
+    """Counts of latencies falling in each of a fixed set of buckets."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[min(bisect_left(self.buckets, value), len(self.buckets) - 1)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of values."""
+        if not self.count:
+            return None
+
+        rank = fraction * self.count
+        seen = 0
+
+        for (bound, count) in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.max)
+
+        return self.max
+
+    def as_dict(self):
+        return {
+            'buckets': dict(('le_%s' % bound, count)
+                            for (bound, count) in zip(self.buckets, self.counts)),
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+
+class EndpointStats(object):
+    """Counters and latency histogram of one endpoint."""
+
+    def __init__(self, resource, method, template):
+        self.resource = resource
+        self.method = method
+        self.template = template
+        self.requests = 0
+        self.errors = 0
+        self.from_cache = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.timings = dict((name, 0.0) for name in TIMINGS)
+        self.latency = Histogram()
+
+    def add(self, event):
+        self.requests += 1
+        if event.error is not None or (event.status_code or 0) >= 400:
+            self.errors += 1
+        if event.from_cache:
+            self.from_cache += 1
+        self.bytes_sent += event.bytes_sent
+        self.bytes_received += event.bytes_received
+        for (name, value) in event.timings.items():
+            self.timings[name] += value
+        self.latency.add(event.duration)
+
+    def as_dict(self):
+        return {
+            'resource': self.resource,
+            'method': self.method,
+            'template': self.template,
+            'requests': self.requests,
+            'errors': self.errors,
+            'from_cache': self.from_cache,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'timings': dict(self.timings),
+            'latency': self.latency.as_dict(),
+        }
+
+
+class RequestLog(object):
+    """Ring buffer of recent requests with aggregated stats per endpoint.
+
+    Endpoints are keyed by resource class name, method and URL template,
+    falling back to the URL for requests made without a template.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = deque(maxlen=max_entries)
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def record(self, event):
+        key = (event.resource, event.method, event.template or event.url)
+
+        with self._lock:
+            self._entries.append(event)
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = EndpointStats(*key)
+            stats.add(event)
+
+    def recent(self, count=None):
+        """The most recent events, oldest first."""
+        with self._lock:
+            entries = list(self._entries)
+        return entries if count is None else entries[-count:]
+
+    def stats(self):
+        """Stats per endpoint, slowest in total first."""
+        with self._lock:
+            endpoints = sorted(self._endpoints.values(), key=lambda stats: -stats.latency.total)
+            return [stats.as_dict() for stats in endpoints]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._endpoints.clear()
@@ -0,0 +1,113 @@
+"""
+Pagination strategies used by Resource.find_each and Resource.find_in_batches.
+
+A strategy builds the request for the first page, extracts the records from
+a decoded page and builds the request for the next page, returning None
+when there are no more pages. A strategy whose pages are bare collections
+sets collection, so formats that wrap each row, like XML, decode them as
+collections; the others get the page decoded as a document.
+"""
+from __future__ import absolute_import
+
+from furl import furl
+
+
+class PagePagination(object):
+    """Numbered pages, eg ?page=2&per_page=100.
+
+    Pages are requested until one comes back empty. Servers may cap the page
+    size below the batch size asked for, so a short page need not be the
+    last; with short_page_is_last, for servers known to honour per_page, a
+    page shorter than the batch size ends the collection one request early.
+    """
+
+    collection = True
+
+    def __init__(self, page_param='page', per_page_param='per_page', first_page=1,
+                 short_page_is_last=False):
+        self.page_param = page_param
+        self.per_page_param = per_page_param
+        self.first_page = first_page
+        self.short_page_is_last = short_page_is_last
+
+    def first_request(self, path, params, batch_size):
+        params = dict(params)
+        params[self.page_param] = self.first_page
+        if batch_size:
+            params[self.per_page_param] = batch_size
+        return (path, params)
+
+    def rows(self, data):
+        return data
+
+    def next_request(self, path, params, response, data, rows, batch_size):
+        if not rows:
+            return None
+        if self.short_page_is_last and batch_size and len(rows) < batch_size:
+            return None
+        params = dict(params)
+        params[self.page_param] += 1
+        return (path, params)
+
+
+class LinkPagination(object):
+    """Pages linked with a Link: <...>; rel="next" response header."""
+
+    collection = True
+
+    def __init__(self, per_page_param='per_page'):
+        self.per_page_param = per_page_param
+
+    def first_request(self, path, params, batch_size):
+        params = dict(params)
+        if batch_size:
+            params[self.per_page_param] = batch_size
+        return (path, params)
+
+    def rows(self, data):
+        return data
+
+    def next_request(self, path, params, response, data, rows, batch_size):
+        link = response.links.get('next')
+        if not link or not rows:
+            return None
+        url = furl(link['url'])
+        return (str(url.path), dict(url.args))
+
+
+class CursorPagination(object):
+    """Pages chained by a cursor field in the response body.
+
+    The records are read from records_field, and the cursor for the next
+    page from cursor_field, which is sent back as cursor_param.
+    """
+
+    collection = False
+
+    def __init__(self, cursor_field='next_cursor', cursor_param='cursor',
+                 records_field='data', per_page_param='per_page'):
+        self.cursor_field = cursor_field
+        self.cursor_param = cursor_param
+        self.records_field = records_field
+        self.per_page_param = per_page_param
+
+    def first_request(self, path, params, batch_size):
+        params = dict(params)
+        if batch_size:
+            params[self.per_page_param] = batch_size
+        return (path, params)
+
+    def rows(self, data):
+        if isinstance(data, dict):
+            return data.get(self.records_field) or []
+        return data
+
+    def next_request(self, path, params, response, data, rows, batch_size):
+        if not isinstance(data, dict) or not rows:
+            return None
+        cursor = data.get(self.cursor_field)
+        if not cursor:
+            return None
+        params = dict(params)
+        params[self.cursor_param] = cursor
+        return (path, params)
@@ -0,0 +1,206 @@
+"""
+Client-side rate limiting for Connection.
+
+A RateLimiter keeps the requests to each site and credential, ie each base
+URL and username, under a rate with a token bucket and under a number of
+requests in flight. A Retry-After in a throttled response holds back every
+request to that site and credential until it has passed.
+
+In adaptive mode the concurrency limit follows AIMD, additive increase and
+multiplicative decrease: it is cut by a factor when the server throttles a
+request with 429, or answers with Retry-After, and grows by one request for
+each round of successful ones, so it settles at the highest concurrency the
+server accepts.
+
+A limiter is shared by every connection given it, from any thread and, with
+AsyncConnection, any event loop.
+"""
+from __future__ import absolute_import
+
+import threading
+import time
+
+from activerest.retries import retry_after
+
+
+THROTTLE_STATUSES = frozenset([429])
+
+
+class Limit(object):
+    """State of the limits of one site and credential."""
+
+    def __init__(self, key, tokens, concurrency):
+        self.key = key
+        self.tokens = tokens
+        self.updated = None
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.decreased_at = 0.0
+        self.notify = []
+        self.requests = 0
+        self.throttled = 0
+        self.waits = 0
+
+    def as_dict(self):
+        return {
+            'site': self.key[0],
+            'username': self.key[1],
+            'tokens': self.tokens,
+            'concurrency': self.concurrency,
+            'in_flight': self.in_flight,
+            'paused_until': self.paused_until,
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'waits': self.waits,
+        }
+
+
+class RateLimiter(object):
+    """Token bucket and concurrency limits per site and credential.
+
+    rate is the sustained number of requests per second, with bursts of up
+    to burst requests, one second's worth by default; None leaves the rate
+    unlimited. max_concurrency bounds the requests in flight. With adaptive
+    the bound starts at initial_concurrency, max_concurrency by default, is
+    multiplied by backoff on throttling, and never drops below
+    min_concurrency. Retry-After waits are capped at max_retry_after.
+    """
+
+    def __init__(self,
+                 rate=None,
+                 burst=None,
+                 max_concurrency=None,
+                 adaptive=False,
+                 min_concurrency=1,
+                 initial_concurrency=None,
+                 backoff=0.5,
+                 throttle_statuses=THROTTLE_STATUSES,
+                 max_retry_after=60.0):
+        if adaptive and max_concurrency is None:
+            raise ValueError('adaptive rate limiting needs max_concurrency')
+
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, rate or 0)
+        self.max_concurrency = max_concurrency
+        self.adaptive = adaptive
+        self.min_concurrency = min_concurrency
+        self.initial_concurrency = initial_concurrency or max_concurrency
+        self.backoff = backoff
+        self.throttle_statuses = frozenset(throttle_statuses)
+        self.max_retry_after = max_retry_after
+        self.clock = time.time
+        self._limits = {}
+        self._condition = threading.Condition()
+
+    def _limit(self, key):
+        limit = self._limits.get(key)
+        if limit is None:
+            concurrency = self.initial_concurrency
+            limit = self._limits[key] = Limit(key, float(self.burst),
+                                              None if concurrency is None else float(concurrency))
+        return limit
+
+    def stats(self):
+        """State and counters of the limits of every site and credential, by key."""
+        with self._condition:
+            return dict((key, limit.as_dict()) for (key, limit) in self._limits.items())
+
+    def acquire(self, key):
+        """Wait until a request to key is allowed, returning its ticket.
+
+        Pass the ticket to release once the request has finished.
+        """
+        with self._condition:
+            while True:
+                (ticket, wait) = self.reserve(key)
+                if ticket is not None:
+                    return ticket
+                self._condition.wait(wait)
+
+    def reserve(self, key, notify=None):
+        """Take a slot for a request to key without waiting.
+
+        Returns the ticket of the request and None, or None and the seconds
+        to wait before trying again. That wait is None when the concurrency
+        limit is reached, and notify, if given, is called once a request to
+        key has finished.
+        """
+        with self._condition:
+            limit = self._limit(key)
+            now = self.clock()
+
+            if limit.paused_until > now:
+                return self._wait(limit, limit.paused_until - now)
+
+            if limit.concurrency is not None and limit.in_flight >= int(limit.concurrency):
+                if notify is not None:
+                    limit.notify.append(notify)
+                return self._wait(limit, None)
+
+            wait = self._take_token(limit, now)
+
+            if wait is not None:
+                return self._wait(limit, wait)
+
+            limit.in_flight += 1
+            return ((limit, now), None)
+
+    def _wait(self, limit, wait):
+        limit.waits += 1
+        return (None, wait)
+
+    def _take_token(self, limit, now):
+        """Seconds until a token is available, or None once one was taken."""
+        if self.rate is None:
+            return None
+
+        if limit.updated is not None:
+            limit.tokens = min(self.burst, limit.tokens + (now - limit.updated) * self.rate)
+        limit.updated = now
+
+        if limit.tokens < 1:
+            return (1 - limit.tokens) / self.rate
+
+        limit.tokens -= 1
+        return None
+
+    def release(self, ticket, response=None):
+        """Record that the request of ticket finished with response, or failed without one."""
+        (limit, started) = ticket
+
+        with self._condition:
+            now = self.clock()
+            limit.in_flight -= 1
+            limit.requests += 1
+
+            if response is not None:
+                self._record(limit, started, now, response)
+
+            notify = limit.notify
+            limit.notify = []
+            self._condition.notify_all()
+
+        for callback in notify:
+            callback()
+
+    def _record(self, limit, started, now, response):
+        status_code = response.status_code
+        delay = retry_after(response, now) if status_code >= 400 else None
+
+        if status_code not in self.throttle_statuses and delay is None:
+            if self.adaptive and status_code < 500:
+                limit.concurrency = min(self.max_concurrency,
+                                        limit.concurrency + 1.0 / limit.concurrency)
+            return
+
+        limit.throttled += 1
+
+        if delay is not None:
+            limit.paused_until = max(limit.paused_until, now + min(delay, self.max_retry_after))
+
+        # Requests sent before the last decrease saw the old limit, and
+        # their throttling is already accounted for.
+        if self.adaptive and started >= limit.decreased_at:
+            limit.concurrency = max(self.min_concurrency, limit.concurrency * self.backoff)
+            limit.decreased_at = now
@@ -9,21 +9,47 @@ from future.utils import viewitems
 install_aliases()
 
 import activerest.formats.json_format
+import copy
 import requests
 import inflection
+import threading
+import types
 
+from activerest.columns import ColumnBuilder
 from activerest.connections import Connection
+from activerest.formats import copy_payload, decode_response
+from activerest.identity_map import IdentityMap, propagate
+from activerest.instrumentation import complete, measure, measure_chunks
+from activerest.pagination import PagePagination
+from concurrent.futures import ThreadPoolExecutor
 from furl import furl
-from six import with_metaclass
-from urllib.parse import urlencode
+from six import integer_types, with_metaclass
+from string import Formatter
+from urllib.parse import quote, urlencode
 
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
 CONNECTION_ATTRIBUTES = [
     'auth_type',
+    'cache',
+    'circuit_breaker',
+    'coalescer',
+    'compress_level',
+    'compress_threshold',
+    'hooks',
+    'keep_alive',
     'open_timeout',
     'password',
+    'pool_block',
+    'pool_connections',
+    'pool_maxsize',
     'proxies',
+    'rate_limiter',
     'read_timeout',
+    'request_log',
+    'retry',
+    'share_pool',
     'timeout',
     'username',
 ]
@@ -32,11 +58,28 @@ META_ATTRIBUTES = {
     'auth_type': {
         'reset_connection': True,
     },
+    'cache': {
+        'reset_connection': True,
+    },
+    'bulk_path': {
+    },
+    'circuit_breaker': {
+        'reset_connection': True,
+    },
+    'coalescer': {
+        'reset_connection': True,
+    },
     'collection_name': {
         'default': lambda cls: inflection.pluralize(cls.element_name)
     },
     'collection_parser': {
     },
+    'compress_level': {
+        'reset_connection': True,
+    },
+    'compress_threshold': {
+        'reset_connection': True,
+    },
     'connection_class': {
         'reset_connection': True,
         'default': lambda cls: Connection
@@ -47,71 +90,211 @@ META_ATTRIBUTES = {
     'format': {
         'default': lambda cls: activerest.formats.json_format
     },
+    'hooks': {
+        'reset_connection': True,
+    },
+    'include_root': {
+        'default': lambda cls: getattr(cls.format, 'include_root', False),
+    },
     'include_format_in_path': {
         'default': lambda cls: False,
     },
+    'keep_alive': {
+        'reset_connection': True,
+    },
     'open_timeout': {
         'reset_connection': True,
     },
+    'pagination': {
+        'default': lambda cls: PagePagination()
+    },
+    'partial_updates': {
+        'default': lambda cls: False,
+    },
     'password': {
         'reset_connection': True,
     },
+    'pool_block': {
+        'reset_connection': True,
+    },
+    'pool_connections': {
+        'reset_connection': True,
+    },
+    'pool_maxsize': {
+        'reset_connection': True,
+    },
+    'prefix': {
+        'default': lambda cls: '/',
+    },
     'proxies': {
         'reset_connection': True,
     },
+    'rate_limiter': {
+        'reset_connection': True,
+    },
     'read_timeout': {
         'reset_connection': True,
     },
+    'request_log': {
+        'reset_connection': True,
+    },
+    'retry': {
+        'reset_connection': True,
+    },
+    'share_pool': {
+        'reset_connection': True,
+    },
     'timeout': {
         'reset_connection': True,
     },
+    'track_changes': {
+        'default': lambda cls: bool(cls._explicit_attributes.get('partial_updates')),
+    },
     'username': {
         'reset_connection': True,
     },
 }
 
+# Marks attributes missing from a slotted resource.
+MISSING = object()
+
+# Guards the configuration of resource classes and their connections, so a
+# class builds one connection however many threads ask for it at once.
+_configuration_lock = threading.RLock()
+
+
+def _path_segment(value):
+    """value escaped to fill in one segment of a path, eg an id or prefix option."""
+    if isinstance(value, integer_types):
+        return str(value)
+    return quote(str(value), safe='')
+
+
+def _snapshot_value(value):
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+
+class _SlotSetting(object):
+    """A schema field named like a setting, eg username.
+
+    Instances read and write the field in its slot, and the class reads the
+    setting, as the two share one name in the class __dict__.
+    """
+    __slots__ = ('slot', 'value')
+
+    def __init__(self, slot, value):
+        self.slot = slot
+        self.value = value
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self.value
+        return self.slot.__get__(instance, owner)
+
+    def __set__(self, instance, value):
+        self.slot.__set__(instance, value)
+
+    def __delete__(self, instance):
+        self.slot.__delete__(instance)
+
 
 class MetaResource(type):
-    _attributes = {}
-    _connections = {}
+    """Resolves each class's configuration onto the class itself.
+
+    Every attribute in META_ATTRIBUTES is stored in the class __dict__,
+    either as set on the class or as its default, so reads are plain
+    attribute lookups. Settings are per class and are not inherited.
+    Setting one re-resolves the defaults that may depend on it.
+
+    Settings and the lazily built connection are updated under a lock, so
+    classes can be shared between threads.
+    """
+
+    def __new__(meta, name, bases, dct):
+        schema = dct.get('schema')
+        if schema is not None:
+            dct['schema'] = tuple(schema)
+            if '__slots__' not in dct:
+                dct['__slots__'] = dct['schema'] + ('_persisted', '_original')
+
+            # Settings named like a slot would clash with it, and are set
+            # once the class is built, see _configure.
+            dct['_slotted_settings'] = dict((attr, dct.pop(attr)) for attr in dct['__slots__']
+                                            if attr in META_ATTRIBUTES and attr in dct)
+        return super(MetaResource, meta).__new__(meta, name, bases, dct)
 
     def __init__(cls, name, bases, dct):
         super(MetaResource, cls).__init__(name, bases, dct)
-        for attr in META_ATTRIBUTES:
-            if attr in dct:
-                value = dct[attr]
-                setattr(cls, attr, value)
-
-    def __getattribute__(cls, attr):
-        if attr in META_ATTRIBUTES:
-            cls_id = id(cls)
-            if cls_id not in cls._attributes:
-                cls._attributes[cls_id] = {}
-            attributes = cls._attributes[cls_id]
-            if attr not in attributes:
-                default = META_ATTRIBUTES[attr].get('default', lambda cls: None)
-                setattr(cls, attr, default(cls))
-            return attributes[attr]
-        return super(MetaResource, cls).__getattribute__(attr)
+        explicit = dict((attr, dct[attr]) for attr in META_ATTRIBUTES if attr in dct)
+        explicit.update(dct.get('_slotted_settings', {}))
+        type.__setattr__(cls, '_explicit_attributes', explicit)
+        type.__setattr__(cls, '_connection', None)
+        cls._configure()
 
     def __setattr__(cls, attr, value):
         if attr in META_ATTRIBUTES:
-            cls_id = id(cls)
-            if cls_id not in cls._connections \
-                    or META_ATTRIBUTES[attr].get('reset_connection', False):
-                cls._connections[cls_id] = None
-            if cls_id not in cls._attributes:
-                cls._attributes[cls_id] = {}
-            attributes = cls._attributes[cls_id]
-            attributes[attr] = value
-
-            if attr == 'format' and cls.site:
-                cls.connection().format = value
+            with _configuration_lock:
+                cls._explicit_attributes[attr] = value
+                cls._configure()
+
+                if META_ATTRIBUTES[attr].get('reset_connection', False):
+                    type.__setattr__(cls, '_connection', None)
+
+                if attr == 'format' and getattr(cls, 'site', None):
+                    cls.connection().format = value
         else:
             super(MetaResource, cls).__setattr__(attr, value)
 
+    def _configure(cls):
+        explicit = cls._explicit_attributes
+
+        # element_name goes first, as the collection_name default uses it.
+        for attr in sorted(META_ATTRIBUTES, key=lambda attr: attr != 'element_name'):
+            if attr in explicit:
+                value = explicit[attr]
+            else:
+                default = META_ATTRIBUTES[attr].get('default', lambda cls: None)
+                value = default(cls)
+
+            # A schema field of the same name keeps working on instances.
+            slot = next((klass.__dict__[attr] for klass in cls.__mro__ if attr in klass.__dict__), None)
+            if isinstance(slot, _SlotSetting):
+                slot = slot.slot
+            if isinstance(slot, types.MemberDescriptorType):
+                value = _SlotSetting(slot, value)
+
+            type.__setattr__(cls, attr, value)
+
+        cls._compile_paths()
+
+    def _compile_paths(cls):
+        """Compile the path templates, eg /projects/{project_id}/todos/{0}.json."""
+        prefix = cls.prefix
+        if not prefix.endswith('/'):
+            prefix += '/'
+
+        extension = cls.format_extension()
+        parameters = tuple(name for (_, name, _, _) in Formatter().parse(prefix) if name)
+
+        type.__setattr__(cls, '_prefix_parameters', parameters)
+        type.__setattr__(cls, '_collection_template', prefix + cls.collection_name + extension)
+        type.__setattr__(cls, '_element_template', prefix + cls.collection_name + '/{0}' + extension)
+
 
 class Resource(with_metaclass(MetaResource, object)):
+    """A REST resource.
+
+    Attributes are kept in the instance __dict__ by default. Declaring a
+    schema, a sequence of attribute names, stores them in slots instead,
+    which makes instances much smaller. Attributes outside the schema are
+    then ignored when loading.
+    """
+    __slots__ = ()
+
+    schema = None
+
     def __init__(self, _meta=None, **attributes):
         cls = type(self)
 
@@ -121,51 +304,119 @@ class Resource(with_metaclass(MetaResource, object)):
         if not isinstance(cls.site, furl):
             cls.site = furl(cls.site)
 
-        self.__dict__.update(attributes)
+        if cls.schema is None:
+            self.__dict__.update(attributes)
+        else:
+            self.load(attributes)
 
-        self._meta = {
-            'persisted': False,
-        }
+        self._persisted = bool(_meta and _meta.get('persisted'))
+        self._original = None
 
-        if _meta is not None:
-            self._meta.update(_meta)
+        if self._persisted:
+            self._snapshot()
 
     def __repr__(self):
         parts = []
 
-        for (key, value) in viewitems(self.__dict__):
-            if key[0] != '_':
-                parts.append('%s=%s' % (key, repr(value)))
+        for (key, value) in viewitems(self.attributes):
+            parts.append('%s=%s' % (key, repr(value)))
 
         return '%s(%s)' % (type(self).__name__, ', '.join(parts))
 
     @property
     def attributes(self):
         """Attributes on the resource."""
-        return dict((key, value) for (key, value) in viewitems(self.__dict__) if key[0] != '_')
+        schema = type(self).schema
+
+        if schema is None:
+            return dict((key, value) for (key, value) in viewitems(self.__dict__) if key[0] != '_')
+
+        attributes = {}
+
+        for key in schema:
+            value = getattr(self, key, MISSING)
+            if value is not MISSING:
+                attributes[key] = value
+
+        return attributes
 
     @property
     def id(self):
         """Get the id attribute of the resource."""
+        if type(self).schema is not None:
+            return getattr(self, self.primary_key())
         return self.__dict__[self.primary_key()]
 
     @id.setter
     def id(self, id):
         """Set the id attribute of the resource."""
-        self.__dict__[self.primary_key()] = id
+        if type(self).schema is not None:
+            setattr(self, self.primary_key(), id)
+        else:
+            self.__dict__[self.primary_key()] = id
 
     def is_new(self):
         """Is the resource new, ie unsaved."""
-        return not self._meta['persisted']
+        return not self._persisted
 
     def is_persisted(self):
         """Is the resource persisted, ie saved."""
-        return self._meta['persisted']
+        return self._persisted
+
+    def changed(self):
+        """Names of the attributes changed since the resource was loaded.
+
+        Only classes with track_changes, on by default with partial_updates,
+        keep a copy of what was loaded. Without it every attribute of a
+        resource counts as changed, as for a new one.
+        """
+        original = self._original_attributes()
+        return sorted(key for (key, value) in viewitems(self.attributes)
+                      if key not in original or original[key] != value)
+
+    def changes(self):
+        """Changed attributes, mapped to their (original, current) values."""
+        original = self._original_attributes()
+        return dict((key, (original.get(key), getattr(self, key))) for key in self.changed())
+
+    def is_changed(self):
+        """Has any attribute changed since the resource was loaded."""
+        return bool(self.changed())
+
+    def _snapshot(self):
+        cls = type(self)
+
+        # Copying every loaded resource is only worth it to track changes.
+        if not cls.track_changes:
+            self._original = None
+            return
+
+        schema = cls.schema
+
+        if schema is None:
+            self._original = dict((key, _snapshot_value(value))
+                                  for (key, value) in viewitems(self.attributes))
+        else:
+            # Values in schema order, to keep slotted instances free of dicts.
+            self._original = tuple(_snapshot_value(getattr(self, key, MISSING))
+                                   for key in schema)
+
+    def _original_attributes(self):
+        if self._original is None:
+            return {}
+
+        if isinstance(self._original, dict):
+            return self._original
+
+        return dict((key, value) for (key, value) in zip(type(self).schema, self._original)
+                    if value is not MISSING)
 
     def load(self, attributes):
         """Set the attributes on the resource."""
+        schema = type(self).schema
+
         for (key, value) in viewitems(attributes):
-            if key[0] != '_':
+            if key[0] != '_' and (schema is None or key in schema):
                 setattr(self, key, value)
 
     def update_attribute(self, name, value):
@@ -179,44 +430,230 @@ class Resource(with_metaclass(MetaResource, object)):
         return self.save()
 
     def save(self):
-        """Save the resource by calling the API."""
-        data = self._transform_params(self.attributes)
+        """Save the resource by calling the API.
 
-        if self.is_new():
-            path = self.collection_path()
-            response = self.connection().post(path, data=data)
-        else:
-            path = self.element_path(self.id)
-            response = self.connection().put(path, data=data)
+        With partial_updates enabled, a persisted resource only sends its
+        changed attributes with PATCH, and nothing at all when unchanged.
+        """
+        request = self._save_request()
 
-        if response.status_code in [requests.codes.ok, requests.codes.created]:
-            self._meta['persisted'] = True
-            self.load(response.json())
+        if request is None:
             return True
 
-        return False
+        (method, template, path, data) = request
+        response = getattr(self.connection(), method)(path, data=data, template=template,
+                                                      resource_class=type(self), defer=True)
+        return self._save_response(response)
+
+    def _save_request(self):
+        cls = type(self)
+
+        if self.is_new():
+            path = self.collection_path(**self._prefix_options())
+            return ('post', cls._collection_template, path, cls._encode_element(self.attributes))
+
+        if type(self).partial_updates:
+            changed = self.changed()
+
+            if not changed:
+                return None
+
+            data = dict((key, getattr(self, key)) for key in changed)
+            path = self.element_path(self.id, **self._prefix_options())
+            return ('patch', cls._element_template, path, cls._encode_element(data))
+
+        path = self.element_path(self.id, **self._prefix_options())
+        return ('put', cls._element_template, path, cls._encode_element(self.attributes))
+
+    def _prefix_options(self):
+        """Values of the prefix parameters, taken from the attributes."""
+        return dict((name, getattr(self, name)) for name in self._prefix_parameters
+                    if hasattr(self, name))
+
+    def _save_response(self, response):
+        with complete(response):
+            if response.status_code in [requests.codes.ok, requests.codes.created]:
+                data = type(self)._decode_response(response) if response.content else None
+                with measure(response, 'hydrate'):
+                    self._saved(data)
+                return True
+
+            return False
+
+    def _saved(self, attributes=None):
+        self._persisted = True
+        if attributes:
+            self.load(attributes)
+        self._snapshot()
+
+        identity_map = IdentityMap.current()
+        if identity_map is not None:
+            identity_map.add(self)
 
     def destroy(self):
         """Delete the resource by calling the API."""
-        if self.is_persisted() and self.delete(self.id):
-            self._meta['persisted'] = False
+        if self.is_persisted() and self.delete(self.id, self._prefix_options()):
+            self._destroyed()
             return True
 
         return False
 
+    def _destroyed(self):
+        self._persisted = False
+
+        identity_map = IdentityMap.current()
+        if identity_map is not None:
+            identity_map.remove(self)
+
+    @classmethod
+    def save_all(cls, resources, max_workers=None, batch_size=1000):
+        """Save many resources, returning the result of each in order.
+
+        If the class declares a bulk_path, new resources are created in
+        batches of batch_size by POSTing an array of their attributes to it,
+        and the attributes returned for each, in the same order, are loaded
+        back onto it. Other resources are saved individually, with at most
+        max_workers requests in flight. A failed save holds the exception
+        raised for that resource instead of failing the whole batch.
+        """
+        resources = list(resources)
+        results = [None] * len(resources)
+        pending = list(range(len(resources)))
+
+        if cls.bulk_path is not None:
+            batches = {}
+
+            for index in pending:
+                resource = resources[index]
+                if resource.is_new():
+                    key = tuple(sorted(viewitems(resource._prefix_options())))
+                    batches.setdefault(key, []).append(index)
+
+            for (key, indexes) in viewitems(batches):
+                for start in range(0, len(indexes), batch_size):
+                    batch = indexes[start:start + batch_size]
+                    cls._bulk_create(dict(key), [resources[index] for index in batch],
+                                     batch, results)
+
+            pending = [index for index in pending if results[index] is None]
+
+        saved = cls._map_concurrently(lambda resource: resource.save(),
+                                      [resources[index] for index in pending],
+                                      max_workers)
+
+        for (index, result) in zip(pending, saved):
+            results[index] = result
+
+        identity_map = IdentityMap.current()
+        if identity_map is not None:
+            for (resource, result) in zip(resources, results):
+                if result is True:
+                    identity_map.add(resource)
+
+        return results
+
+    @classmethod
+    def _bulk_create(cls, prefix_options, resources, indexes, results):
+        path = cls.bulk_path.format(**prefix_options)
+        data = cls._encode_collection([resource.attributes for resource in resources])
+
+        try:
+            response = cls.connection().post(path, data=data, template=cls.bulk_path,
+                                             resource_class=cls, defer=True)
+
+            with complete(response):
+                if response.status_code not in [requests.codes.ok, requests.codes.created]:
+                    saved = [False] * len(resources)
+                else:
+                    rows = cls._decode_response(response, collection=True) if response.content else None
+
+                    if rows is not None and len(rows) != len(resources):
+                        raise ValueError('bulk response has %d rows for %d resources'
+                                         % (len(rows), len(resources)))
+
+                    with measure(response, 'hydrate'):
+                        for (position, resource) in enumerate(resources):
+                            resource._saved(rows[position] if rows else None)
+
+                    saved = [True] * len(resources)
+        except Exception as error:
+            saved = [error] * len(resources)
+
+        for (index, result) in zip(indexes, saved):
+            results[index] = result
+
+    @classmethod
+    def destroy_all(cls, resources, params=None, max_workers=None):
+        """Delete many resources, given as instances or identifiers.
+
+        Results are in order, True for each deleted resource, with at most
+        max_workers requests in flight. Deleted instances are marked as no
+        longer persisted. A failed delete holds the exception raised for
+        that resource instead of failing the whole batch.
+        """
+        def destroy(resource):
+            if isinstance(resource, Resource):
+                return resource.destroy()
+            return cls.delete(resource, params)
+
+        resources = list(resources)
+        results = cls._map_concurrently(destroy, resources, max_workers)
+
+        identity_map = IdentityMap.current()
+        if identity_map is not None:
+            for (resource, result) in zip(resources, results):
+                if result is not True:
+                    continue
+                if isinstance(resource, Resource):
+                    identity_map.remove(resource)
+                else:
+                    identity_map.discard(cls, resource)
+
+        return results
+
+    @classmethod
+    def _map_concurrently(cls, function, items, max_workers=None):
+        """Call function on each item in a thread pool, keeping exceptions in place.
+
+        The workers share the caller's identity map.
+        """
+        if not items:
+            return []
+
+        if max_workers is None:
+            max_workers = cls.connection().pool_maxsize
+
+        function = propagate(function)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            futures = [executor.submit(function, item) for item in items]
+
+        results = []
+
+        for future in futures:
+            exception = future.exception()
+            results.append(future.result() if exception is None else exception)
+
+        return results
+
     @classmethod
     def connection(cls, refresh=False):
-        cls_id = id(cls)
-        if cls_id not in cls._connections \
-                or cls._connections[cls_id] is None \
-                or refresh:
-            connection = cls.connection_class(cls.site, cls.format)
-            for attr in CONNECTION_ATTRIBUTES:
-                value = getattr(cls, attr, None)
-                if value:
-                    setattr(connection, attr, value)
-            cls._connections[cls_id] = connection
-        return cls._connections[cls_id]
+        """Connection of the class, built on first use and shared by every thread."""
+        connection = cls.__dict__.get('_connection')
+
+        if connection is None or refresh:
+            with _configuration_lock:
+                connection = cls.__dict__.get('_connection')
+
+                if connection is None or refresh:
+                    connection = cls.connection_class(cls.site, cls.format)
+                    for attr in CONNECTION_ATTRIBUTES:
+                        value = getattr(cls, attr, None)
+                        if value is not None:
+                            setattr(connection, attr, value)
+                    type.__setattr__(cls, '_connection', connection)
+
+        return connection
 
     @classmethod
     def primary_key(cls):
@@ -229,47 +666,311 @@ class Resource(with_metaclass(MetaResource, object)):
         return cls.find()
 
     @classmethod
-    def delete(cls, identifier):
+    def delete(cls, identifier, params=None):
         """Delete a single resource by identifier."""
-        path = cls.element_path(identifier)
-        response = cls.connection().delete(path)
-        return response.status_code == requests.codes.ok
+        path = cls.element_path(identifier, **(params or {}))
+        response = cls.connection().delete(path, template=cls._element_template, resource_class=cls)
+        return cls._deleted(identifier, response)
+
+    @classmethod
+    def _deleted(cls, identifier, response):
+        """Whether the delete succeeded, forgetting the record if so."""
+        if response.status_code != requests.codes.ok:
+            return False
+
+        identity_map = IdentityMap.current()
+        if identity_map is not None:
+            identity_map.discard(cls, identifier)
+
+        return True
 
     @classmethod
-    def exists(cls, identifier):
+    def exists(cls, identifier, params=None):
         """Check if a single resource exists by identifier."""
-        path = cls.element_path(identifier)
-        response = cls.connection().head(path)
+        path = cls.element_path(identifier, **(params or {}))
+        response = cls.connection().head(path, template=cls._element_template, resource_class=cls)
         return response.status_code == requests.codes.ok
 
     @classmethod
-    def find(cls, identifier=None, params=None):
-        """Find resources by ID or by query options."""
-        if params is None:
-            params = {}
+    def find(cls, identifier=None, params=None, stream=False):
+        """Find resources by ID or by query options.
 
-        if identifier:
-            path = cls.element_path(identifier)
+        With stream=True a collection is returned as a generator that builds
+        each resource as soon as it has been decoded from the response body.
+        """
+        loaded = cls._find_loaded(identifier, params)
+        if loaded is not None:
+            return loaded
+
+        (template, path, params) = cls._find_request(identifier, params)
+        stream = stream and not identifier
+
+        response = cls.connection().get(path, params=params, stream=stream, template=template,
+                                        resource_class=cls, defer=True)
+
+        if stream:
+            return cls._find_stream_response(response)
+
+        return cls._find_response(identifier, response)
+
+    @classmethod
+    def find_many(cls, identifiers, params=None, max_workers=None):
+        """Find many resources by ID concurrently.
+
+        Results keep the order of the identifiers. Missing resources are
+        None, and a failed lookup holds the exception raised for that
+        identifier instead of failing the whole batch. At most max_workers
+        requests are in flight, defaulting to the connection's pool size.
+        """
+        def find(identifier):
+            return cls.find(identifier, params)
+
+        return cls._map_concurrently(find, list(identifiers), max_workers)
+
+    @classmethod
+    def find_each(cls, params=None, batch_size=100):
+        """Iterate over a paginated collection one resource at a time."""
+        for batch in cls.find_in_batches(params, batch_size):
+            for resource in batch:
+                yield resource
+
+    @classmethod
+    def find_in_batches(cls, params=None, batch_size=100):
+        """Iterate over a paginated collection one page of resources at a time.
+
+        Pages are requested with the class's pagination strategy, and the
+        next page is fetched in the background while the caller works on the
+        current one, so at most two pages are held in memory.
+        """
+        for rows in cls._iter_pages(params, batch_size):
+            yield [cls._instantiate(row) for row in rows]
+
+    @classmethod
+    def find_columns(cls, fields=None, params=None, dtypes=None, stream=False, batch_size=None):
+        """Find a collection as columns of attribute values, by attribute name.
+
+        No resources are built: the decoded rows go straight into NumPy
+        arrays where NumPy is installed and a column's dtype can be inferred
+        or is given in dtypes, and into lists otherwise. fields limits the
+        columns to those attributes. With stream=True the rows are converted
+        as they are decoded from the response body, and with a batch_size
+        the collection is fetched page by page, so either way only a chunk
+        of rows is held in memory besides the columns.
+        """
+        builder = ColumnBuilder(fields, dtypes)
+
+        if batch_size:
+            for rows in cls._iter_pages(params, batch_size):
+                builder.extend(rows)
+            return builder.columns()
+
+        (template, path, params) = cls._find_request(None, params)
+        response = cls.connection().get(path, params=params, stream=stream, template=template,
+                                        resource_class=cls, defer=True)
+
+        try:
+            with complete(response):
+                if response.status_code != requests.codes.ok:
+                    response.raise_for_status()
+                elif stream:
+                    cls._stream_columns(response, builder)
+                else:
+                    rows = cls._decode_response(response, collection=True)
+                    with measure(response, 'hydrate'):
+                        builder.extend(rows)
+        finally:
+            if stream:
+                response.close()
+
+        return builder.columns()
+
+    @classmethod
+    def _stream_columns(cls, response, builder):
+        rows = cls._iterdecode_response(response)
+
+        while True:
+            with measure(response, 'decode'):
+                row = next(rows, MISSING)
+            if row is MISSING:
+                break
+            with measure(response, 'hydrate'):
+                builder.append(row)
+
+    @classmethod
+    def _iter_pages(cls, params, batch_size):
+        pagination = cls.pagination
+        connection = cls.connection()
+
+        def fetch(path, params):
+            response = connection.get(path, params=cls._transform_params(params),
+                                      template=cls._collection_template, resource_class=cls,
+                                      defer=True)
+
+            with complete(response):
+                if response.status_code != requests.codes.ok:
+                    response.raise_for_status()
+                    return (response, None, [])
+
+                collection = getattr(pagination, 'collection', False)
+                data = cls._decode_response(response, collection=collection)
+                return (response, data, pagination.rows(data))
+
+        (prefix_options, params) = cls._split_prefix_options(params or {})
+        request = pagination.first_request(cls.collection_path(**prefix_options), params, batch_size)
+        executor = ThreadPoolExecutor(max_workers=1)
+
+        try:
+            future = executor.submit(fetch, *request)
+
+            while future is not None:
+                (response, data, rows) = future.result()
+                request = pagination.next_request(request[0], request[1],
+                                                  response, data, rows, batch_size)
+                future = executor.submit(fetch, *request) if request else None
+
+                if rows:
+                    yield rows
+        finally:
+            executor.shutdown(wait=False)
+
+    @classmethod
+    def _find_loaded(cls, identifier, params):
+        identity_map = IdentityMap.current()
+
+        if identity_map is None or not identifier or params:
+            return None
+
+        return identity_map.get(cls, identifier)
+
+    @classmethod
+    def _instantiate(cls, attributes):
+        """Build a persisted resource, merging it into the current identity map."""
+        identity_map = IdentityMap.current()
+
+        if identity_map is None or cls.primary_key() not in attributes:
+            return cls(_meta={'persisted': True}, **attributes)
+
+        resource = identity_map.get(cls, attributes[cls.primary_key()])
+
+        if resource is None:
+            # Another thread may register the record first, see propagate.
+            resource = identity_map.register(cls(_meta={'persisted': True}, **attributes))
         else:
-            path = cls.collection_path()
+            resource._persisted = True
+            resource.load(attributes)
+            resource._snapshot()
 
-        params = cls._transform_params(params)
-        response = cls.connection().get(path, params=params)
+        return resource
+
+    @classmethod
+    def _find_request(cls, identifier, params):
+        (prefix_options, params) = cls._split_prefix_options(params or {})
 
         if identifier:
-            if response.status_code == requests.codes.not_found:
-                return None
+            template = cls._element_template
+            path = cls.element_path(identifier, **prefix_options)
+        else:
+            template = cls._collection_template
+            path = cls.collection_path(**prefix_options)
+
+        return (template, path, cls._transform_params(params))
+
+    @classmethod
+    def _find_response(cls, identifier, response):
+        with complete(response):
+            if identifier:
+                if response.status_code == requests.codes.not_found:
+                    return None
+                if response.status_code == requests.codes.ok:
+                    data = cls._decode_response(response)
+                    with measure(response, 'hydrate'):
+                        return cls._instantiate(data)
+
             if response.status_code == requests.codes.ok:
-                return cls(_meta={'persisted': True}, **cls._decode_response(response))
+                rows = cls._decode_response(response, collection=True)
+
+                with measure(response, 'hydrate'):
+                    if cls.collection_parser is not None:
+                        return cls.collection_parser(cls, rows)
 
-        if response.status_code == requests.codes.ok:
-            return [cls(_meta={'persisted': True}, **row) for row in cls._decode_response(response)]
+                    return [cls._instantiate(row) for row in rows]
 
-        response.raise_for_status()
+            response.raise_for_status()
 
     @classmethod
-    def _decode_response(cls, response):
-        return cls.format.decode(response.text)
+    def _find_stream_response(cls, response):
+        if response.status_code != requests.codes.ok:
+            try:
+                with complete(response):
+                    response.raise_for_status()
+            finally:
+                response.close()
+            return iter([])
+
+        return cls._iter_stream(response)
+
+    @classmethod
+    def _iter_stream(cls, response):
+        rows = cls._iterdecode_response(response)
+
+        try:
+            with complete(response):
+                while True:
+                    with measure(response, 'decode'):
+                        row = next(rows, MISSING)
+                    if row is MISSING:
+                        break
+                    with measure(response, 'hydrate'):
+                        resource = cls._instantiate(row)
+                    yield resource
+        finally:
+            response.close()
+
+    @classmethod
+    def _iterdecode_response(cls, response):
+        iterdecode = getattr(cls.format, 'iterdecode', None)
+
+        if iterdecode is None:
+            return iter(cls._decode_response(response, collection=True))
+
+        return iterdecode(measure_chunks(response, response.iter_content(STREAM_CHUNK_SIZE)),
+                          encoding=response.encoding)
+
+    @classmethod
+    def _decode_response(cls, response, collection=False):
+        entry = getattr(response, 'cache_entry', None)
+
+        with measure(response, 'decode'):
+            if entry is None:
+                return decode_response(cls.format, response, collection)
+
+            memo = 'decoded'
+            if collection and hasattr(cls.format, 'decode_collection'):
+                memo = 'decoded_collection'
+
+            decoded = getattr(entry, memo)
+
+            if decoded is None:
+                decoded = decode_response(cls.format, response, collection)
+                setattr(entry, memo, decoded)
+
+            # Resources keep the lists and dicts they are given, so each hit
+            # gets a copy they can change without changing later hits.
+            return copy_payload(decoded)
+
+    @classmethod
+    def _encode_element(cls, attributes):
+        """Request body for the attributes of a resource."""
+        if cls.include_root:
+            attributes = {cls.element_name: attributes}
+        return cls.format.encode(attributes)
+
+    @classmethod
+    def _encode_collection(cls, rows):
+        """Request body for the attributes of many resources."""
+        if cls.include_root:
+            rows = {cls.collection_name: {cls.element_name: rows}}
+        return cls.format.encode(rows)
 
     @classmethod
     def _transform_params(cls, params):
@@ -293,18 +994,46 @@ class Resource(with_metaclass(MetaResource, object)):
 
     @classmethod
     def collection_path(cls, **params):
-        """Path to the collection API endpoint."""
-        return '/%s%s%s' % (cls.collection_name,
-                            cls.format_extension(),
-                            cls.query_string(**params))
+        """Path to the collection API endpoint.
+
+        Params named in the prefix fill it in, the rest go in the query string.
+        """
+        if not params and not cls._prefix_parameters:
+            return cls._collection_template
+
+        (prefix_options, params) = cls._split_prefix_options(params)
+        path = cls._collection_template.format(**cls._path_options(prefix_options))
+        return path + cls.query_string(**params)
 
     @classmethod
     def element_path(cls, identifier, **params):
         """Path to the element API endpoint."""
-        return '/%s/%s%s%s' % (cls.collection_name,
-                               identifier,
-                               cls.format_extension(),
-                               cls.query_string(**params))
+        if not params and not cls._prefix_parameters:
+            return cls._element_template.format(_path_segment(identifier))
+
+        (prefix_options, params) = cls._split_prefix_options(params)
+        path = cls._element_template.format(_path_segment(identifier),
+                                            **cls._path_options(prefix_options))
+        return path + cls.query_string(**params)
+
+    @classmethod
+    def _split_prefix_options(cls, params):
+        if not cls._prefix_parameters:
+            return ({}, params)
+
+        params = dict(params)
+        prefix_options = {}
+
+        for name in cls._prefix_parameters:
+            if name not in params:
+                raise ValueError('missing prefix option %s' % name)
+            prefix_options[name] = params.pop(name)
+
+        return (prefix_options, params)
+
+    @classmethod
+    def _path_options(cls, prefix_options):
+        return dict((name, _path_segment(value)) for (name, value) in viewitems(prefix_options))
 
     @classmethod
     def format_extension(cls):
@@ -0,0 +1,103 @@
+"""
+Collection result types for Resource.find.
+
+Set one as a resource's collection_parser to use it instead of a list.
+"""
+from __future__ import absolute_import
+
+
+class LazyCollection(list):
+    """List of resources that builds each one on first access.
+
+    The decoded rows are kept as they are, and only rows that are indexed
+    or iterated become resources. column and columns read the raw rows
+    without building any resources.
+
+    It is a list, and supports every list operation. Those that reorder,
+    change or compare the items, or copy them into another list, build all
+    the remaining resources first. Code reading the list directly, like
+    json.dumps, sees the rows not built yet as they were decoded.
+    """
+
+    # Whether some rows are still to be built. Rows are dicts, and resources
+    # never are.
+    _lazy = False
+
+    def __init__(self, resource_class, rows):
+        super(LazyCollection, self).__init__(rows)
+        self.resource_class = resource_class
+        self._lazy = True
+
+    def _build(self, index):
+        item = list.__getitem__(self, index)
+
+        if isinstance(item, dict):
+            item = self.resource_class._instantiate(item)
+            list.__setitem__(self, index, item)
+
+        return item
+
+    def _materialize(self):
+        """Build every resource, leaving a plain list of them."""
+        if self._lazy:
+            for index in range(len(self)):
+                self._build(index)
+            self._lazy = False
+        return self
+
+    def __getitem__(self, index):
+        if not self._lazy:
+            return list.__getitem__(self, index)
+
+        if isinstance(index, slice):
+            return [self._build(position) for position in range(*index.indices(len(self)))]
+
+        return self._build(index)
+
+    def __iter__(self):
+        if not self._lazy:
+            return list.__iter__(self)
+        return (self._build(index) for index in range(len(self)))
+
+    def __reversed__(self):
+        return list.__reversed__(self._materialize())
+
+    def __radd__(self, other):
+        return _materialized(other) + list(self._materialize())
+
+    def __repr__(self):
+        return '%s(%s, %d rows)' % (type(self).__name__, self.resource_class.__name__, len(self))
+
+    def column(self, name, default=None):
+        """Values of one attribute across the rows."""
+        return [item.get(name, default) if isinstance(item, dict) else getattr(item, name, default)
+                for item in list.__iter__(self)]
+
+    def columns(self, *names):
+        """Values of several attributes across the rows, by attribute name."""
+        return dict((name, self.column(name)) for name in names)
+
+
+def _materialized(value):
+    return value._materialize() if isinstance(value, LazyCollection) else value
+
+
+def _building(name):
+    """The list method name, building every resource first."""
+    method = getattr(list, name)
+
+    def build_first(self, *args, **kwargs):
+        return method(self._materialize(), *(_materialized(arg) for arg in args), **kwargs)
+
+    build_first.__name__ = name
+    build_first.__doc__ = method.__doc__
+    return build_first
+
+
+for _name in ['__add__', '__contains__', '__delitem__', '__eq__', '__ge__', '__gt__', '__iadd__',
+              '__imul__', '__le__', '__lt__', '__mul__', '__ne__', '__rmul__', '__setitem__',
+              'append', 'clear', 'copy', 'count', 'extend', 'index', 'insert', 'pop', 'remove',
+              'reverse', 'sort']:
+    # clear and copy are missing from Python 2 lists.
+    if hasattr(list, _name):
+        setattr(LazyCollection, _name, _building(_name))
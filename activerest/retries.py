@@ -0,0 +1,299 @@
+"""
+Retries and circuit breaking for Connection.
+
+A RetryPolicy retries transient failures, ie connection errors, timeouts and
+statuses like 502 and 503, of idempotent requests with exponential backoff
+and full jitter, honoring Retry-After. Retries are drawn from a RetryBudget
+so that a struggling upstream sees at most a fraction of extra requests.
+
+A CircuitBreaker tracks failures per site. Once a site has failed too many
+times in a row its circuit opens and requests fail fast with CircuitOpenError
+until the recovery timeout has passed, when a probe request is let through
+half-open: it closes the circuit if it succeeds and reopens it if it fails.
+"""
+from __future__ import absolute_import
+
+import random
+import threading
+import time
+
+from email.utils import mktime_tz, parsedate_tz
+from requests.exceptions import ChunkedEncodingError, ConnectionError, RequestException, Timeout
+
+
+IDEMPOTENT_METHODS = frozenset(['DELETE', 'GET', 'HEAD', 'OPTIONS', 'PUT'])
+
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+
+# Failures to send a request, including connection resets, also while
+# reading the body.
+RETRYABLE_ERRORS = (ChunkedEncodingError, ConnectionError, Timeout)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RequestException):
+    """Raised instead of sending a request while the site's circuit is open."""
+
+    def __init__(self, site, retry_in):
+        self.site = site
+        self.retry_in = retry_in
+        super(CircuitOpenError, self).__init__('circuit open for %s, retry in %.1fs' % (site, retry_in))
+
+
+class RetryBudget(object):
+    """Limits retries to a ratio of requests, plus a reserve.
+
+    Every request deposits ratio tokens and every retry withdraws one, so
+    with the default ratio of 0.2 retries add at most 20% to the load once
+    the reserve is spent.
+    """
+
+    def __init__(self, ratio=0.2, reserve=10):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._tokens = float(reserve)
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self):
+        return self._tokens
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.reserve)
+
+    def withdraw(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy(object):
+    """When and after how long to retry a request.
+
+    Attempt n (from 0) is retried after a random delay of up to
+    backoff_factor * 2 ** n seconds, capped at max_backoff, unless the
+    response says how long to wait in Retry-After; a Retry-After longer
+    than max_retry_after is not waited for. Set budget=False to retry
+    without a budget.
+    """
+
+    def __init__(self,
+                 total=3,
+                 backoff_factor=0.1,
+                 max_backoff=10.0,
+                 jitter=True,
+                 methods=IDEMPOTENT_METHODS,
+                 statuses=RETRY_STATUSES,
+                 respect_retry_after=True,
+                 max_retry_after=60.0,
+                 budget=None):
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.methods = frozenset(method.upper() for method in methods)
+        self.statuses = frozenset(statuses)
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.budget = RetryBudget() if budget is None else budget
+        self.sleep = time.sleep
+        self.random = random.random
+        self.clock = time.time
+
+    def started(self):
+        """Record a request, depositing into the budget."""
+        if self.budget:
+            self.budget.deposit()
+
+    def next_delay(self, method, attempt, response=None, error=None):
+        """Seconds to wait before retrying, or None to give up.
+
+        Pass error for a transient failure to send the request, or the
+        response it got otherwise.
+        """
+        if attempt >= self.total or method.upper() not in self.methods:
+            return None
+
+        if error is None and response.status_code not in self.statuses:
+            return None
+
+        delay = None
+
+        if response is not None and self.respect_retry_after:
+            delay = self.retry_after(response)
+            if delay is not None and delay > self.max_retry_after:
+                return None
+
+        if delay is None:
+            delay = self.backoff(attempt)
+
+        if self.budget and not self.budget.withdraw():
+            return None
+
+        return delay
+
+    def backoff(self, attempt):
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        if self.jitter:
+            delay *= self.random()
+        return delay
+
+    def retry_after(self, response):
+        """Seconds to wait given by the Retry-After header of response."""
+        return retry_after(response, self.clock())
+
+
+def retry_after(response, now):
+    """Seconds from now to wait given by the Retry-After header of response, if any."""
+    value = response.headers.get('Retry-After')
+
+    if not value:
+        return None
+
+    value = value.strip()
+
+    if value.isdigit():
+        return float(value)
+
+    date = parsedate_tz(value)
+
+    if date is None:
+        return None
+
+    return max(0.0, mktime_tz(date) - now)
+
+
+class Circuit(object):
+    """State of the circuit of one site."""
+
+    def __init__(self, site):
+        self.site = site
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probes = 0
+        self.successes = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def as_dict(self):
+        return {
+            'site': self.site,
+            'state': self.state,
+            'failures': self.failures,
+            'opened_at': self.opened_at,
+            'successes': self.successes,
+            'total_failures': self.total_failures,
+            'rejected': self.rejected,
+            'opened': self.opened,
+        }
+
+
+class CircuitBreaker(object):
+    """Per-site circuit breaker, shared by every connection given it.
+
+    Errors raised sending a request and failure_statuses count as failures.
+    failure_threshold failures in a row open a site's circuit for
+    recovery_timeout seconds, after which up to half_open_max_calls probe
+    requests are let through.
+    """
+
+    def __init__(self,
+                 failure_threshold=5,
+                 recovery_timeout=30.0,
+                 half_open_max_calls=1,
+                 failure_statuses=frozenset(range(500, 600))):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.failure_statuses = frozenset(failure_statuses)
+        self.clock = time.time
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, site):
+        circuit = self._circuits.get(site)
+        if circuit is None:
+            circuit = self._circuits[site] = Circuit(site)
+        return circuit
+
+    def state(self, site):
+        """State of the circuit of site: closed, open or half_open."""
+        with self._lock:
+            circuit = self._circuits.get(site)
+            if circuit is None:
+                return CLOSED
+            if circuit.state == OPEN and self._retry_in(circuit) <= 0:
+                return HALF_OPEN
+            return circuit.state
+
+    def stats(self):
+        """State and counters of every circuit, by site."""
+        with self._lock:
+            return dict((site, circuit.as_dict()) for (site, circuit) in self._circuits.items())
+
+    def reset(self, site=None):
+        """Close the circuit of site, or of every site."""
+        with self._lock:
+            if site is None:
+                self._circuits.clear()
+            else:
+                self._circuits.pop(site, None)
+
+    def before_request(self, site):
+        """Let a request to site through, or raise CircuitOpenError."""
+        with self._lock:
+            circuit = self._circuit(site)
+
+            if circuit.state == OPEN:
+                retry_in = self._retry_in(circuit)
+                if retry_in > 0:
+                    circuit.rejected += 1
+                    raise CircuitOpenError(site, retry_in)
+                circuit.state = HALF_OPEN
+                circuit.probes = 0
+
+            if circuit.state == HALF_OPEN:
+                if circuit.probes >= self.half_open_max_calls:
+                    circuit.rejected += 1
+                    raise CircuitOpenError(site, 0)
+                circuit.probes += 1
+
+    def release(self, site):
+        """Give back the probe taken by a request to site that was abandoned."""
+        with self._lock:
+            circuit = self._circuits.get(site)
+            if circuit is not None and circuit.state == HALF_OPEN and circuit.probes:
+                circuit.probes -= 1
+
+    def record(self, site, status_code=None, error=None):
+        """Record the outcome of a request let through to site."""
+        failed = error is not None or status_code in self.failure_statuses
+
+        with self._lock:
+            circuit = self._circuit(site)
+
+            if not failed:
+                circuit.successes += 1
+                circuit.failures = 0
+                circuit.state = CLOSED
+                return
+
+            circuit.total_failures += 1
+            circuit.failures += 1
+
+            if circuit.state == HALF_OPEN or circuit.failures >= self.failure_threshold:
+                if circuit.state != OPEN:
+                    circuit.opened += 1
+                circuit.state = OPEN
+                circuit.opened_at = self.clock()
+
+    def _retry_in(self, circuit):
+        return circuit.opened_at + self.recovery_timeout - self.clock()
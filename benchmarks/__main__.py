@@ -0,0 +1,204 @@
+"""
+Benchmark suite for activerest against an in-process stub REST server.
+
+Measures throughput, latency percentiles and peak memory of the resource
+operations for each format and collection size, and writes the results as
+JSON so runs can be compared between versions:
+
+    python -m benchmarks --output before.json
+    python -m benchmarks --output after.json --compare before.json
+
+Peak memory is traced with tracemalloc over a single call and includes the
+stub server's allocations for that request.
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from activerest import Resource
+from activerest.formats import json_format, xml_format
+from benchmarks import (class_attributes, format_codecs, hydration, json_decode,
+                        memory_per_instance, request_construction)
+from benchmarks.server import StubServer, record
+
+
+FORMATS = {
+    'json': json_format,
+    'xml': xml_format,
+}
+
+try:
+    from activerest.formats import msgpack_format
+except ImportError:
+    pass
+else:
+    FORMATS['msgpack'] = msgpack_format
+
+
+def resource_class(site, format):
+    return type('Todo', (Resource,), {
+        'site': site,
+        'element_name': 'todo',
+        'format': FORMATS[format],
+    })
+
+
+def collection_operations(cls, size):
+    params = {'size': size}
+    return {
+        'find': lambda: cls.find(params=params),
+        'find_stream': lambda: list(cls.find(params=params, stream=True)),
+        'find_columns': lambda: cls.find_columns(params=params),
+        'find_columns_stream': lambda: cls.find_columns(params=params, stream=True),
+    }
+
+
+def element_operations(cls, fields):
+    todo = cls(_meta={'persisted': True}, **record(1, fields))
+
+    return {
+        'find_id': lambda: cls.find(1),
+        'save': todo.save,
+        'exists': lambda: cls.exists(1),
+        'destroy': lambda: cls(_meta={'persisted': True}, id=1).destroy(),
+    }
+
+
+def percentile(values, fraction):
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def measure(operation, iterations, warmup):
+    for _ in range(warmup):
+        operation()
+
+    latencies = []
+    started = time.perf_counter()
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - start)
+
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    operation()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+
+    return {
+        'iterations': iterations,
+        'throughput_per_second': round(iterations / elapsed, 2),
+        'latency_ms': dict((name, round(percentile(latencies, fraction) * 1000, 3))
+                           for (name, fraction) in [('p50', 0.5), ('p90', 0.9),
+                                                    ('p99', 0.99), ('max', 1.0)]),
+        'peak_memory_bytes': peak,
+    }
+
+
+def run(options):
+    results = []
+
+    with StubServer(latency=options.latency / 1000.0, fields=options.fields) as server:
+        for format in options.formats:
+            cls = resource_class(server.url, format)
+
+            for (name, operation) in sorted(element_operations(cls, options.fields).items()):
+                result = {'benchmark': 'operation', 'operation': name, 'format': format, 'size': 1}
+                result.update(measure(operation, options.iterations, options.warmup))
+                results.append(result)
+
+            for size in options.sizes:
+                iterations = max(3, min(options.iterations, options.iterations * 100 // size))
+                for (name, operation) in sorted(collection_operations(cls, size).items()):
+                    result = {'benchmark': 'operation', 'operation': name, 'format': format, 'size': size}
+                    result.update(measure(operation, iterations, options.warmup))
+                    results.append(result)
+
+    if options.micro:
+        results.extend(class_attributes.run(100000))
+        results.extend(request_construction.run(20000))
+        results.extend(memory_per_instance.run(20000))
+        results.extend(hydration.run(50000))
+        results.extend(json_decode.run(20))
+        results.extend(format_codecs.run(20))
+
+    return results
+
+
+def result_key(result):
+    return tuple(str(result.get(name)) for name in
+                 ['benchmark', 'operation', 'format', 'size', 'statement', 'storage', 'persisted',
+                  'backend', 'source', 'payload', 'track_changes'])
+
+
+def compare(previous, current):
+    """Print throughput and median latency changes against a previous run."""
+    previous = dict((result_key(result), result) for result in previous['results'])
+
+    print('%-20s %-5s %6s %12s %12s %8s %10s %10s' % (
+        'operation', 'fmt', 'size', 'before/s', 'after/s', 'change', 'p50 before', 'p50 after'),
+        file=sys.stderr)
+
+    for result in current['results']:
+        before = previous.get(result_key(result))
+        if result['benchmark'] != 'operation' or before is None:
+            continue
+        change = result['throughput_per_second'] / before['throughput_per_second'] - 1
+        print('%-20s %-5s %6d %12.1f %12.1f %+7.1f%% %10.3f %10.3f' % (
+            result['operation'], result['format'], result['size'],
+            before['throughput_per_second'], result['throughput_per_second'], change * 100,
+            before['latency_ms']['p50'], result['latency_ms']['p50']),
+            file=sys.stderr)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--formats', type=lambda value: value.split(','), default=['json', 'xml'],
+                        help='comma separated formats: json, xml, msgpack (default: json,xml)')
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=[10, 100, 1000], help='comma separated collection sizes')
+    parser.add_argument('--fields', type=int, default=10, help='fields per record')
+    parser.add_argument('--latency', type=float, default=0.0, help='server latency in milliseconds')
+    parser.add_argument('--iterations', type=int, default=200, help='calls per element operation')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed calls before measuring')
+    parser.add_argument('--micro', action='store_true', help='include the micro benchmarks')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='previous JSON results to compare against')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    options = parse_args(sys.argv[1:] if args is None else args)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'options': dict((name, value) for (name, value) in vars(options).items()
+                        if name not in ['output', 'compare']),
+        'results': run(options),
+    }
+
+    if options.output:
+        with open(options.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if options.compare:
+        with open(options.compare) as file:
+            compare(json.load(file), report)
+
+
+if __name__ == '__main__':
+    main()
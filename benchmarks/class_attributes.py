@@ -0,0 +1,45 @@
+"""
+Per-call overhead of class configuration reads, without network.
+
+Usage: python -m benchmarks.class_attributes [number]
+"""
+from __future__ import absolute_import, print_function
+
+import json
+import sys
+import timeit
+
+from activerest import Resource
+
+
+class Todo(Resource):
+    site = 'http://example.com'
+
+
+STATEMENTS = [
+    'Todo.collection_path()',
+    'Todo.element_path(1)',
+    'Todo.connection()',
+    'Todo.format',
+    'Todo.collection_name',
+]
+
+
+def run(number):
+    Todo.connection()
+    results = []
+
+    for statement in STATEMENTS:
+        best = min(timeit.repeat(statement, number=number, repeat=5, globals={'Todo': Todo}))
+        results.append({
+            'benchmark': 'class_attributes',
+            'statement': statement,
+            'number': number,
+            'microseconds_per_call': round(best / number * 1e6, 3),
+        })
+
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000), indent=2))
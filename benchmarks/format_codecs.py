@@ -0,0 +1,92 @@
+"""
+Encode and decode throughput of the formats on collection payloads.
+
+Decoding goes through decode_response, as resources do, so the text
+formats pay for building a str where they need one.
+
+Usage: python -m benchmarks.format_codecs [number]
+"""
+from __future__ import absolute_import, print_function
+
+import json
+import requests
+import sys
+import timeit
+
+from activerest.formats import decode_response, json_format
+from benchmarks.server import record
+
+
+SIZES = [100, 1000, 10000]
+
+
+def numeric_record(identifier, fields):
+    row = {'id': identifier}
+    for index in range(fields - 1):
+        row['field_%d' % index] = identifier * 0.5 + index if index % 2 else identifier * 1000 + index
+    return row
+
+
+PAYLOADS = {
+    'records': record,
+    'numeric': numeric_record,
+}
+
+
+def formats():
+    for name in json_format.BACKENDS:
+        try:
+            yield ('json_%s' % name, json_format.backend(name))
+        except ImportError:
+            pass
+
+    try:
+        from activerest.formats import msgpack_format
+    except ImportError:
+        pass
+    else:
+        yield ('msgpack', msgpack_format)
+
+
+def measure(function, repeat):
+    return min(timeit.repeat(function, number=repeat, repeat=3)) / repeat
+
+
+def run(number):
+    results = []
+
+    for (payload, build) in sorted(PAYLOADS.items()):
+        for size in SIZES:
+            rows = [build(identifier, 10) for identifier in range(1, size + 1)]
+            repeat = max(1, number * 100 // size)
+
+            for (name, format) in formats():
+                results.append(run_format(name, format, payload, rows, repeat))
+
+    return results
+
+
+def run_format(name, format, payload, rows, repeat):
+    body = format.encode(rows)
+    response = requests.Response()
+    response._content = body if isinstance(body, bytes) else body.encode('utf-8')
+    response.encoding = 'utf-8'
+
+    encode = measure(lambda: format.encode(rows), repeat)
+    decode = measure(lambda: decode_response(format, response), repeat)
+
+    return {
+        'benchmark': 'format_codecs',
+        'format': name,
+        'payload': payload,
+        'size': len(rows),
+        'bytes': len(response.content),
+        'encode_milliseconds': round(encode * 1000, 3),
+        'decode_milliseconds': round(decode * 1000, 3),
+        'encode_records_per_second': int(len(rows) / encode),
+        'decode_records_per_second': int(len(rows) / decode),
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(int(sys.argv[1]) if len(sys.argv) > 1 else 100), indent=2))
@@ -0,0 +1,77 @@
+"""
+Time and memory to build persisted resources from decoded rows, with and
+without change tracking.
+
+Usage: python -m benchmarks.hydration [count]
+"""
+from __future__ import absolute_import, print_function
+
+import json
+import sys
+import timeit
+import tracemalloc
+
+from activerest import Resource
+
+
+class Todo(Resource):
+    site = 'http://example.com'
+
+
+class TrackedTodo(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    track_changes = True
+
+
+def rows(count):
+    return [{
+        'id': i,
+        'title': 'todo %d' % i,
+        'description': 'something to do',
+        'completed': False,
+        'priority': 1,
+        'estimate': 1.5,
+        'owner_id': 7,
+        'project_id': 3,
+        'created_at': '2020-01-01T00:00:00Z',
+        'updated_at': '2020-01-02T00:00:00Z',
+        'tags': ['home', 'urgent'],
+        'metadata': {'source': 'import', 'version': 2},
+    } for i in range(count)]
+
+
+def hydrate(cls, data):
+    return [cls._instantiate(row) for row in data]
+
+
+def memory(cls, data):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = hydrate(cls, data)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Exclude the list holding the instances.
+    return (after - before - sys.getsizeof(instances)) / float(len(instances))
+
+
+def run(count):
+    data = rows(count)
+    results = []
+
+    for cls in [Todo, TrackedTodo]:
+        best = min(timeit.repeat(lambda: hydrate(cls, data), number=1, repeat=5))
+        results.append({
+            'benchmark': 'hydration',
+            'track_changes': cls.track_changes,
+            'count': count,
+            'microseconds_per_instance': round(best / count * 1e6, 3),
+            'bytes_per_instance': round(memory(cls, data), 1),
+        })
+
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000), indent=2))
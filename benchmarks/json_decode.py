@@ -0,0 +1,77 @@
+"""
+Decode throughput of the JSON backends on collection payloads.
+
+Each installed backend decodes the same response body from its text, as
+resources did before, with and without a charset, and straight from its
+bytes, as they do now.
+
+Usage: python -m benchmarks.json_decode [number]
+"""
+from __future__ import absolute_import, print_function
+
+import json
+import requests
+import sys
+import timeit
+
+from activerest.formats import decode_response, json_format
+from benchmarks.server import record
+
+
+SIZES = [100, 1000, 10000]
+
+
+def backends():
+    for name in json_format.BACKENDS:
+        try:
+            yield json_format.backend(name)
+        except ImportError:
+            pass
+
+
+def response(size, fields=10):
+    rows = [record(identifier, fields) for identifier in range(1, size + 1)]
+    response = requests.Response()
+    response._content = json.dumps({'todos': rows}).encode('utf-8')
+    return response
+
+
+def run(number):
+    results = []
+
+    for size in SIZES:
+        body = response(size)
+        repeat = max(1, number * 100 // size)
+
+        for backend in backends():
+            text_backend = json_format.JsonBackend(backend.name, backend._loads, backend._dumps)
+            text_backend.decode_bytes = False
+
+            # Without a charset, eg for application/vnd.api+json, requests
+            # detects the encoding of the text from the body.
+            sources = [
+                ('text', text_backend, 'utf-8'),
+                ('text_detected', text_backend, None),
+                ('bytes', backend, 'utf-8'),
+            ]
+
+            for (source, format, encoding) in sources:
+                body.encoding = encoding
+                best = min(timeit.repeat(lambda: decode_response(format, body),
+                                         number=repeat, repeat=3)) / repeat
+                results.append({
+                    'benchmark': 'json_decode',
+                    'backend': backend.name,
+                    'source': source,
+                    'size': size,
+                    'bytes': len(body.content),
+                    'milliseconds_per_decode': round(best * 1000, 3),
+                    'megabytes_per_second': round(len(body.content) / best / 1e6, 1),
+                    'records_per_second': int(size / best),
+                })
+
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(int(sys.argv[1]) if len(sys.argv) > 1 else 100), indent=2))
@@ -0,0 +1,60 @@
+"""
+Memory per Resource instance, with and without a declared schema.
+
+Usage: python -m benchmarks.memory_per_instance [count]
+"""
+from __future__ import absolute_import, print_function
+
+import json
+import sys
+import tracemalloc
+
+from activerest import Resource
+
+
+class Todo(Resource):
+    site = 'http://example.com'
+
+
+class TodoWithSchema(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    schema = ('id', 'title', 'completed', 'priority')
+
+
+def rows(count):
+    return [{'id': i, 'title': 'todo', 'completed': False, 'priority': 1} for i in range(count)]
+
+
+def measure(cls, count, persisted):
+    data = rows(count)
+    meta = {'persisted': persisted}
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = [cls(_meta=meta, **row) for row in data]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Exclude the list holding the instances.
+    return (after - before - sys.getsizeof(instances)) / float(len(instances))
+
+
+def run(count):
+    results = []
+
+    for (name, cls) in [('dict', Todo), ('schema', TodoWithSchema)]:
+        for persisted in [False, True]:
+            results.append({
+                'benchmark': 'memory_per_instance',
+                'storage': name,
+                'persisted': persisted,
+                'count': count,
+                'bytes_per_instance': round(measure(cls, count, persisted), 1),
+            })
+
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000), indent=2))
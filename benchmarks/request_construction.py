@@ -0,0 +1,56 @@
+"""
+Time to build a request's path and URL, without network.
+
+Usage: python -m benchmarks.request_construction [number]
+"""
+from __future__ import absolute_import, print_function
+
+import json
+import sys
+import timeit
+
+from activerest import Resource
+
+
+class Todo(Resource):
+    site = 'http://example.com'
+
+
+class ProjectTodo(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    prefix = '/projects/{project_id}/'
+
+
+def prepare_find(cls, identifier=None, params=None):
+    (template, path, params) = cls._find_request(identifier, params)
+    return cls.connection()._prepare_request('GET', path, params=params)
+
+
+STATEMENTS = [
+    'Todo.element_path(1)',
+    'ProjectTodo.element_path(1, project_id=2)',
+    'prepare_find(Todo, 1)',
+    "prepare_find(Todo, params={'page': 1})",
+    "prepare_find(ProjectTodo, 1, {'project_id': 2})",
+]
+
+
+def run(number):
+    namespace = {'Todo': Todo, 'ProjectTodo': ProjectTodo, 'prepare_find': prepare_find}
+    results = []
+
+    for statement in STATEMENTS:
+        best = min(timeit.repeat(statement, number=number, repeat=5, globals=namespace))
+        results.append({
+            'benchmark': 'request_construction',
+            'statement': statement,
+            'number': number,
+            'microseconds_per_call': round(best / number * 1e6, 3),
+        })
+
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000), indent=2))
@@ -0,0 +1,160 @@
+"""
+In-process stub REST server for the benchmarks.
+
+Serves a todos collection and its elements as JSON, XML or MessagePack,
+chosen by the Accept or Content-Type header. The collection size comes from
+the size query param, every record has the given number of fields, and each
+response can be delayed by a fixed latency.
+"""
+from __future__ import absolute_import
+
+import json
+import re
+import threading
+import time
+import xmltodict
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+
+
+ELEMENT_PATH = re.compile(r'^/todos/(\d+)$')
+
+
+def record(identifier, fields):
+    row = {
+        'id': identifier,
+        'title': 'todo %d' % identifier,
+        'completed': identifier % 2 == 0,
+    }
+    for index in range(max(fields - len(row), 0)):
+        row['field_%d' % index] = 'value %d' % index
+    return row
+
+
+def render(data, format):
+    if format == 'msgpack':
+        return msgpack.packb(next(iter(data.values())), use_bin_type=True)
+    if format == 'xml':
+        return xmltodict.unparse(data, full_document=False).encode('utf-8')
+    return json.dumps(next(iter(data.values()))).encode('utf-8')
+
+
+class Payloads(object):
+    """Rendered response bodies, built once per format and size."""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def collection(self, format, size):
+        key = ('collection', format, size)
+        with self._lock:
+            if key not in self._bodies:
+                rows = [record(identifier, self.fields) for identifier in range(1, size + 1)]
+                self._bodies[key] = render({'todos': {'todo': rows}} if format == 'xml' else {'todos': rows},
+                                           format)
+            return self._bodies[key]
+
+    def element(self, format, identifier):
+        key = ('element', format, identifier)
+        with self._lock:
+            if key not in self._bodies:
+                self._bodies[key] = render({'todo': record(identifier, self.fields)}, format)
+            return self._bodies[key]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without TCP_NODELAY every
+    # response would wait on the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _format(self):
+        headers = [self.headers.get('Accept', ''), self.headers.get('Content-Type', '')]
+        for format in ['msgpack', 'xml']:
+            if any(format in header for header in headers):
+                return format
+        return 'json'
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        url = urlparse(self.path)
+        format = self._format()
+        payloads = self.server.payloads
+        status = 200
+        body = b''
+
+        match = ELEMENT_PATH.match(url.path)
+
+        if url.path == '/todos':
+            if self.command == 'GET':
+                size = int(parse_qs(url.query).get('size', ['10'])[0])
+                body = payloads.collection(format, size)
+            elif self.command == 'POST':
+                status = 201
+                body = payloads.element(format, 1)
+            else:
+                status = 405
+        elif match:
+            if self.command in ['GET', 'PUT', 'PATCH']:
+                body = payloads.element(format, int(match.group(1)))
+        else:
+            status = 404
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/%s' % format)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _respond
+
+
+class ThreadingStubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class StubServer(object):
+    def __init__(self, latency=0.0, fields=10):
+        self.server = ThreadingStubServer(('127.0.0.1', 0), StubHandler)
+        self.server.latency = latency
+        self.server.payloads = Payloads(fields)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s' % self.server.server_address[1]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
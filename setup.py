@@ -18,14 +18,22 @@ setup(
     install_requires=[
         'furl',
         'future',
+        'futures; python_version < "3"',
         'inflection',
         'requests',
         'six',
         'xmltodict',
     ],
+    extras_require={
+        'async': ['aiohttp'],
+        'msgpack': ['msgpack'],
+        'numpy': ['numpy'],
+        'orjson': ['orjson'],
+    },
     tests_require=[
         'coverage',
         'coveralls',
+        'numpy',
         'pyyaml',
         'requests-mock',
     ],
@@ -1 +1,17 @@
+import six
+
+import tests.caches_test
+import tests.coalescing_test
+import tests.columns_test
+import tests.concurrency_test
+import tests.connections_test
+import tests.identity_map_test
+import tests.instrumentation_test
+import tests.pagination_test
+import tests.rate_limits_test
 import tests.resources_test
+import tests.retries_test
+import tests.results_test
+
+if six.PY3:
+    import tests.aio_test
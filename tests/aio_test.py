@@ -0,0 +1,303 @@
+import asyncio
+import requests
+import threading
+import time
+
+from activerest.caches import ResponseCache
+from activerest.coalescing import RequestCoalescer
+from activerest.identity_map import IdentityMap
+from activerest.rate_limits import RateLimiter
+from activerest.retries import CircuitBreaker, CircuitOpenError, RetryPolicy
+from requests.exceptions import HTTPError
+from tests.server import StubServer
+from unittest import TestCase, skipIf
+
+try:
+    from activerest.aio import AsyncConnection, AsyncResource, close_sessions
+except (ImportError, SyntaxError):
+    AsyncResource = object
+    aiohttp_missing = True
+else:
+    aiohttp_missing = False
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.run_until_complete(close_sessions())
+        loop.close()
+
+
+async def gather(*coroutines):
+    return await asyncio.gather(*coroutines)
+
+
+server = StubServer()
+
+
+class Todo(AsyncResource):
+    site = server.url
+    element_name = 'todo'
+
+
+@skipIf(aiohttp_missing, 'aiohttp is not installed')
+class AioTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        server.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        server.__exit__()
+
+    def setUp(self):
+        server.server.routes.clear()
+        self.server = server
+        self.Todo = Todo
+
+    def test_afind_all(self):
+        expected = [
+            {'id': 1, 'title': 'still todo', 'completed': False},
+            {'id': 2, 'title': 'done', 'completed': True},
+        ]
+        self.server.route('GET', '/todos', expected)
+
+        actual = run(self.Todo.afind())
+
+        self.assertEqual(expected, [todo.attributes for todo in actual])
+        self.assertTrue(all(todo.is_persisted() for todo in actual))
+
+    def test_aall(self):
+        self.server.route('GET', '/todos', [])
+        self.assertEqual([], run(self.Todo.aall()))
+
+    def test_afind_by_id(self):
+        expected = {'id': 1, 'title': 'still todo', 'completed': False}
+        self.server.route('GET', '/todos/1', expected)
+
+        actual = run(self.Todo.afind(1))
+
+        self.assertIsInstance(actual, self.Todo)
+        self.assertEqual(expected, actual.attributes)
+
+    def test_afind_by_params(self):
+        expected = [{'id': 1, 'title': 'still todo', 'completed': False}]
+        self.server.route('GET', '/todos?completed=false', expected)
+
+        actual = run(self.Todo.afind(params={'completed': False}))
+        self.assertEqual(expected, [todo.attributes for todo in actual])
+
+    def test_afind_request_log(self):
+        self.server.route('GET', '/todos/1', {'id': 1})
+        connection = self.Todo.async_connection()
+        events = []
+        connection.on('after_response', events.append)
+
+        try:
+            run(self.Todo.afind(1))
+        finally:
+            connection.off('after_response', events.append)
+
+        self.assertEqual(1, len(events))
+        self.assertEqual('/todos/{0}', events[0].template)
+        self.assertEqual(requests.codes.ok, events[0].status_code)
+        self.assertEqual(len(b'{"id": 1}'), events[0].bytes_received)
+        self.assertGreater(events[0].timings['hydrate'], 0)
+
+    def test_afind_not_found(self):
+        self.assertIsNone(run(self.Todo.afind(1)))
+
+    def test_afind_exception(self):
+        self.server.route('GET', '/todos', status=500)
+
+        with self.assertRaises(HTTPError):
+            run(self.Todo.afind())
+
+    def test_retry_and_circuit_breaker(self):
+        self.server.route('GET', '/todos', status=503)
+        connection = AsyncConnection(self.server.url)
+        connection.retry = RetryPolicy(backoff_factor=0, budget=False)
+        connection.circuit_breaker = CircuitBreaker(failure_threshold=3)
+
+        with self.assertRaises(CircuitOpenError):
+            run(connection.get('/todos'))
+
+        self.assertEqual('open', connection.circuit_breaker.state(self.server.url))
+        self.assertEqual(3, connection.circuit_breaker.stats()[self.server.url]['total_failures'])
+
+    def test_coalesced_afind(self):
+        def payload(handler):
+            time.sleep(0.1)
+            return {'id': 1}
+
+        self.server.route('GET', '/todos/1', payload)
+        self.server.received[:] = []
+        connection = self.Todo.async_connection()
+        connection.coalescer = coalescer = RequestCoalescer()
+
+        try:
+            todos = run(gather(*[self.Todo.afind(1) for _ in range(3)]))
+        finally:
+            connection.coalescer = None
+
+        self.assertEqual([1, 1, 1], [todo.id for todo in todos])
+        self.assertEqual(1, len(self.server.received))
+        self.assertEqual({'in_flight': 0, 'leaders': 1, 'collapsed': 2}, coalescer.stats())
+
+    def test_rate_limited_afind(self):
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def payload(handler):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return {'id': 1}
+
+        self.server.route('GET', '/todos/1', payload)
+        connection = self.Todo.async_connection()
+        connection.rate_limiter = limiter = RateLimiter(max_concurrency=2)
+
+        try:
+            todos = run(gather(*[self.Todo.afind(1) for _ in range(8)]))
+        finally:
+            connection.rate_limiter = None
+
+        self.assertEqual([1] * 8, [todo.id for todo in todos])
+        self.assertEqual(2, in_flight[1])
+        self.assertEqual(8, limiter.stats()[(self.server.url, None)]['requests'])
+
+    def test_afind_many(self):
+        expected = {'id': 1, 'title': 'still todo', 'completed': False}
+        self.server.route('GET', '/todos/1', expected)
+        self.server.route('GET', '/todos/3', status=500)
+
+        actual = run(self.Todo.afind_many([3, 1, 2], max_workers=2))
+
+        self.assertIsInstance(actual[0], HTTPError)
+        self.assertEqual(expected, actual[1].attributes)
+        self.assertIsNone(actual[2])
+
+    def test_cached_afind(self):
+        self.server.route('GET', '/todos/1', {'id': 1, 'tags': ['a']},
+                          headers={'Cache-Control': 'max-age=60'})
+        self.server.route('PUT', '/todos/1', {'id': 1, 'tags': ['a']})
+        self.server.received[:] = []
+        connection = self.Todo.async_connection()
+        connection.cache = cache = ResponseCache()
+
+        try:
+            first = run(self.Todo.afind(1))
+            first.tags.append('b')
+            second = run(self.Todo.afind(1))
+            run(second.asave())
+            run(self.Todo.afind(1))
+        finally:
+            connection.cache = None
+
+        self.assertEqual(['a'], second.tags)
+        self.assertEqual(['GET', 'PUT', 'GET'], [command for (command, _, _, _) in self.server.received])
+        self.assertEqual({'entries': 1, 'hits': 1, 'misses': 2, 'revalidations': 0}, cache.stats())
+
+    def test_identity_map_is_per_task(self):
+        self.server.route('GET', '/todos/1', {'id': 1})
+
+        async def load(loaded, other_loaded):
+            with IdentityMap() as identity_map:
+                todo = await self.Todo.afind(1)
+                loaded.set()
+                await other_loaded.wait()
+                return (identity_map, todo, await self.Todo.afind(1))
+
+        async def main():
+            loaded = [asyncio.Event(), asyncio.Event()]
+            return await gather(load(loaded[0], loaded[1]), load(loaded[1], loaded[0]))
+
+        ((first_map, first, again), (second_map, second, _)) = run(main())
+
+        self.assertIs(first, again)
+        self.assertIsNot(first, second)
+        self.assertEqual([1, 1], [len(first_map), len(second_map)])
+        self.assertIsNone(IdentityMap.current())
+
+    def test_aexists(self):
+        self.server.route('HEAD', '/todos/1')
+
+        self.assertTrue(run(self.Todo.aexists(1)))
+        self.assertFalse(run(self.Todo.aexists(2)))
+
+    def test_adelete(self):
+        self.server.route('DELETE', '/todos/1')
+        self.assertTrue(run(self.Todo.adelete(1)))
+
+    def test_adelete_unregisters_record(self):
+        self.server.route('GET', '/todos/1', {'id': 1})
+        self.server.route('DELETE', '/todos/1')
+
+        async def find_delete_find():
+            with IdentityMap() as identity_map:
+                todo = await self.Todo.afind(1)
+                deleted = await self.Todo.adelete(1)
+                return (todo, deleted, todo in identity_map, await self.Todo.afind(1))
+
+        (todo, deleted, registered, found) = run(find_delete_find())
+
+        self.assertTrue(deleted)
+        self.assertFalse(registered)
+        self.assertIsNot(todo, found)
+
+    def test_asave_create(self):
+        expected = {'id': 1, 'title': 'new todo', 'completed': False}
+        self.server.route('POST', '/todos', expected, status=requests.codes.created)
+
+        todo = self.Todo(title='new todo')
+
+        self.assertTrue(run(todo.asave()))
+        self.assertTrue(todo.is_persisted())
+        self.assertEqual(expected, todo.attributes)
+
+    def test_aupdate_attributes(self):
+        updated = {'id': 1, 'title': 'new title', 'completed': True}
+        self.server.route('PUT', '/todos/1', updated)
+
+        todo = self.Todo(_meta={'persisted': True}, id=1, title='new todo', completed=False)
+
+        self.assertTrue(run(todo.aupdate_attributes({'title': 'new title', 'completed': True})))
+        self.assertEqual(updated, todo.attributes)
+
+    def test_adestroy(self):
+        self.server.route('DELETE', '/todos/1')
+
+        todo = self.Todo(_meta={'persisted': True}, id=1)
+
+        self.assertTrue(run(todo.adestroy()))
+        self.assertTrue(todo.is_new())
+
+    def test_concurrent_requests_share_pool(self):
+        self.server.route('GET', '/todos/1', {'id': 1})
+
+        todos = run(gather(*[self.Todo.afind(1) for _ in range(20)]))
+
+        self.assertEqual(20, len(todos))
+        self.assertEqual(20, self.Todo.async_connection().pool_stats()['requests'])
+
+    def test_async_connection_follows_configuration(self):
+        class TodoWithTimeout(AsyncResource):
+            site = server.url
+            timeout = 5
+
+        connection = TodoWithTimeout.async_connection()
+
+        self.assertIsInstance(connection, AsyncConnection)
+        self.assertEqual(5, connection.timeout)
+        self.assertIs(connection, TodoWithTimeout.async_connection())
+
+        TodoWithTimeout.timeout = 10
+
+        self.assertIsNot(connection, TodoWithTimeout.async_connection())
+        self.assertEqual(10, TodoWithTimeout.async_connection().timeout)
@@ -0,0 +1,260 @@
+import multiprocessing
+import requests
+import requests_mock
+import shutil
+import tempfile
+
+from activerest import Resource
+from activerest.caches import CacheEntry, ResponseCache, SQLiteCache, cache_key
+from unittest import TestCase
+
+
+class Todo(Resource):
+    site = 'http://example.com'
+    cache = ResponseCache(max_entries=2)
+
+
+@requests_mock.Mocker()
+class CachesTest(TestCase):
+    def setUp(self):
+        self.cache = Todo.cache
+        self.cache.clear()
+        self.cache.hits = self.cache.misses = self.cache.revalidations = 0
+        self.now = 1000.0
+        self.cache.clock = lambda: self.now
+
+    def test_fresh_response_skips_network(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1',
+                       json={'id': 1}, headers={'Cache-Control': 'max-age=60'})
+
+        first = Todo.find(1)
+        second = Todo.find(1)
+
+        self.assertEqual(1, m.call_count)
+        self.assertEqual(first.attributes, second.attributes)
+        self.assertIsNot(first, second)
+        self.assertEqual({'entries': 1, 'hits': 1, 'misses': 1, 'revalidations': 0},
+                         self.cache.stats())
+
+    def test_stale_response_is_revalidated(self, m):
+        m.register_uri('GET', 'http://example.com/todos', [
+            {'json': [{'id': 1}], 'headers': {'ETag': '"v1"', 'Cache-Control': 'max-age=60'}},
+            {'status_code': requests.codes.not_modified},
+        ])
+
+        Todo.find()
+        self.now += 120
+        todos = Todo.find()
+
+        self.assertEqual([1], [todo.id for todo in todos])
+        self.assertEqual(2, m.call_count)
+        self.assertEqual('"v1"', m.last_request.headers['If-None-Match'])
+        self.assertEqual(1, self.cache.revalidations)
+
+    def test_last_modified_is_revalidated(self, m):
+        last_modified = 'Wed, 04 Jul 2018 09:57:00 GMT'
+
+        m.register_uri('GET', 'http://example.com/todos/1', [
+            {'json': {'id': 1}, 'headers': {'Last-Modified': last_modified}},
+            {'status_code': requests.codes.not_modified},
+        ])
+
+        Todo.find(1)
+        todo = Todo.find(1)
+
+        self.assertEqual(1, todo.id)
+        self.assertEqual(last_modified, m.last_request.headers['If-Modified-Since'])
+
+    def test_decoded_payload_is_copied_per_hit(self, m):
+        m.register_uri('GET', 'http://example.com/todos',
+                       json=[{'id': 1}], headers={'Cache-Control': 'max-age=60'})
+
+        response = Todo.connection().get('/todos')
+        decoded = Todo._decode_response(response)
+        cached = Todo.connection().get('/todos')
+        copied = Todo._decode_response(cached)
+
+        self.assertTrue(cached.from_cache)
+        self.assertEqual(decoded, copied)
+        self.assertIsNot(decoded, copied)
+        self.assertIsNot(decoded[0], copied[0])
+        self.assertIs(response.cache_entry.decoded, cached.cache_entry.decoded)
+
+    def test_changing_a_hit_leaves_later_hits_alone(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1',
+                       json={'id': 1, 'tags': ['a']}, headers={'Cache-Control': 'max-age=60'})
+
+        first = Todo.find(1)
+        first.tags.append('b')
+        first.title = 'changed'
+
+        second = Todo.find(1)
+
+        self.assertEqual(1, m.call_count)
+        self.assertEqual({'id': 1, 'tags': ['a']}, second.attributes)
+
+    def test_params_are_part_of_key(self, m):
+        m.register_uri('GET', 'http://example.com/todos',
+                       json=[], headers={'Cache-Control': 'max-age=60'})
+
+        Todo.find(params={'page': 1})
+        Todo.find(params={'page': 2})
+
+        self.assertEqual(2, m.call_count)
+
+    def test_no_store_is_not_cached(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1',
+                       json={'id': 1}, headers={'Cache-Control': 'no-store, max-age=60'})
+
+        Todo.find(1)
+        Todo.find(1)
+
+        self.assertEqual(2, m.call_count)
+        self.assertEqual(0, len(self.cache))
+
+    def test_least_recently_used_is_evicted(self, m):
+        for identifier in [1, 2, 3]:
+            m.register_uri('GET', 'http://example.com/todos/%s' % identifier,
+                           json={'id': identifier}, headers={'Cache-Control': 'max-age=60'})
+
+        Todo.find(1)
+        Todo.find(2)
+        Todo.find(1)
+        Todo.find(3)
+        Todo.find(1)
+        Todo.find(2)
+
+        self.assertEqual(4, m.call_count)
+        self.assertEqual(2, len(self.cache))
+
+    def test_write_invalidates_element(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1',
+                       json={'id': 1}, headers={'Cache-Control': 'max-age=60'})
+        m.register_uri('PUT', 'http://example.com/todos/1', json={'id': 1})
+
+        todo = Todo.find(1)
+        todo.save()
+        Todo.find(1)
+
+        self.assertEqual(3, m.call_count)
+
+
+def entry(content, expires=2000.0):
+    return CacheEntry(200, {'Content-Type': 'application/json', 'ETag': '"v1"'},
+                      content, 'http://example.com/todos', 'utf-8', expires)
+
+
+def store_entry(directory, key, content):
+    SQLiteCache(directory).set(key, entry(content))
+
+
+@requests_mock.Mocker()
+class SQLiteCacheTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.now = 1000.0
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def cache(self, **kwargs):
+        cache = SQLiteCache(self.directory, **kwargs)
+        cache.clock = lambda: self.now
+        return cache
+
+    def resource_class(self, cache):
+        return type('Todo', (Resource,), {'site': 'http://example.com', 'cache': cache})
+
+    def test_warm_restart_skips_network(self, m):
+        m.register_uri('GET', 'http://example.com/todos',
+                       json=[{'id': 1}], headers={'Cache-Control': 'max-age=60'})
+
+        self.resource_class(self.cache()).find()
+
+        cache = self.cache()
+        todos = self.resource_class(cache).find()
+
+        self.assertEqual([1], [todo.id for todo in todos])
+        self.assertEqual(1, m.call_count)
+        self.assertEqual(1, cache.hits)
+
+    def test_stale_entry_is_revalidated(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', [
+            {'json': {'id': 1}, 'headers': {'ETag': '"v1"', 'Cache-Control': 'max-age=60'}},
+            {'status_code': requests.codes.not_modified, 'headers': {'Cache-Control': 'max-age=60'}},
+        ])
+        cache = self.cache()
+        Todo = self.resource_class(cache)
+
+        Todo.find(1)
+        self.now += 120
+        todo = Todo.find(1)
+
+        self.assertEqual(1, todo.id)
+        self.assertEqual('"v1"', m.last_request.headers['If-None-Match'])
+        self.assertTrue(cache.get(cache_key('GET', 'http://example.com/todos/1',
+                                            accept='application/json')).is_fresh(self.now))
+
+    def test_bodies_are_compressed(self, m):
+        cache = self.cache()
+        content = b'[' + b','.join([b'{"title":"todo"}'] * 1000) + b']'
+
+        cache.set('key', entry(content))
+
+        self.assertEqual(content, cache.get('key').content)
+        self.assertEqual('"v1"', cache.get('key').etag)
+        self.assertLess(cache.stats()['bytes'], len(content) // 10)
+
+    def test_ttl(self, m):
+        cache = self.cache(ttl=60)
+        cache.set('key', entry(b'{}'))
+
+        self.now += 30
+        self.assertIsNotNone(cache.get('key'))
+
+        self.now += 30
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(0, len(cache))
+
+    def test_max_entries_evicts_least_recently_used(self, m):
+        cache = self.cache(max_entries=2)
+
+        for key in ['a', 'b']:
+            cache.set(key, entry(b'{}'))
+            self.now += 100
+
+        cache.get('a')
+        cache.set('c', entry(b'{}'))
+
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+
+    def test_max_bytes(self, m):
+        cache = self.cache(max_bytes=120, compress_level=0)
+
+        for key in ['a', 'b', 'c']:
+            cache.set(key, entry(b'x' * 40))
+            self.now += 1
+
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('a'))
+
+    def test_invalidate(self, m):
+        cache = self.cache()
+        cache.set(cache_key('GET', 'http://example.com/todos', {'page': 1}), entry(b'[]'))
+        cache.set(cache_key('GET', 'http://example.com/todos/1'), entry(b'{}'))
+
+        cache.invalidate('http://example.com/todos')
+
+        self.assertEqual(1, len(cache))
+        self.assertIsNotNone(cache.get(cache_key('GET', 'http://example.com/todos/1')))
+
+    def test_shared_between_processes(self, m):
+        process = multiprocessing.Process(target=store_entry,
+                                          args=(self.directory, 'key', b'{"id": 1}'))
+        process.start()
+        process.join()
+
+        self.assertEqual(0, process.exitcode)
+        self.assertEqual(b'{"id": 1}', self.cache().get('key').content)
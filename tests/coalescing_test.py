@@ -0,0 +1,176 @@
+import requests
+import threading
+import time
+
+from activerest import Resource
+from activerest.formats import json_format
+from activerest.coalescing import RequestCoalescer
+from concurrent.futures import ThreadPoolExecutor
+from tests.server import StubServer
+from unittest import TestCase
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError('timed out')
+        time.sleep(0.001)
+
+
+class RequestCoalescerTest(TestCase):
+    def setUp(self):
+        self.coalescer = RequestCoalescer()
+        self.release = threading.Event()
+        self.calls = []
+
+    def call(self, key):
+        def function():
+            self.calls.append(key)
+            self.release.wait(5)
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b'[]'
+            return response
+        return self.coalescer.do(key, function)
+
+    def test_collapses_concurrent_calls(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(self.call, 'a') for _ in range(3)]
+            futures.append(executor.submit(self.call, 'b'))
+            wait_for(lambda: self.coalescer.collapsed == 2 and len(self.calls) == 2)
+            self.release.set()
+
+        responses = [future.result() for future in futures]
+
+        self.assertEqual(['a', 'b'], sorted(self.calls))
+        self.assertEqual({'in_flight': 0, 'leaders': 2, 'collapsed': 2}, self.coalescer.stats())
+        self.assertEqual(4, len(set(id(response) for response in responses)))
+        self.assertEqual(1, len(set(id(response.cache_entry) for response in responses[:3])))
+        self.assertEqual([False, True, True, False],
+                         [getattr(response, 'coalesced', False) for response in responses])
+
+    def test_sequential_calls_are_not_collapsed(self):
+        self.release.set()
+        self.call('a')
+        self.call('a')
+        self.assertEqual(['a', 'a'], self.calls)
+        self.assertEqual(0, self.coalescer.collapsed)
+
+    def test_error_is_shared(self):
+        errors = []
+
+        def function():
+            self.release.wait(5)
+            raise ValueError('failed')
+
+        def call():
+            try:
+                self.coalescer.do('a', function)
+            except ValueError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=call) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        wait_for(lambda: self.coalescer.collapsed == 1)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(2, len(errors))
+        self.assertEqual(0, len(self.coalescer))
+
+    def test_lone_request_is_not_shared(self):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'[]'
+
+        self.assertIs(response, self.coalescer.do('a', lambda: response, json_format))
+        self.assertIsNone(getattr(response, 'cache_entry', None))
+
+
+class CoalescedFindTest(TestCase):
+    def test_concurrent_finds_share_one_request(self):
+        release = threading.Event()
+
+        def payload(handler):
+            release.wait(5)
+            return {'id': 42, 'title': 'todo'}
+
+        coalescer = RequestCoalescer()
+
+        with StubServer() as server:
+            server.route('GET', '/todos/42', payload)
+
+            class Todo(Resource):
+                site = server.url
+            Todo.coalescer = coalescer
+
+            with ThreadPoolExecutor(max_workers=5) as executor:
+                futures = [executor.submit(Todo.find, 42) for _ in range(5)]
+                wait_for(lambda: coalescer.collapsed == 4)
+                release.set()
+
+            todos = [future.result() for future in futures]
+
+            self.assertEqual(1, len(server.received))
+            self.assertEqual([{'id': 42, 'title': 'todo'}] * 5, [todo.attributes for todo in todos])
+            self.assertEqual(5, len(set(id(todo) for todo in todos)))
+
+    def test_payload_is_decoded_once(self):
+        release = threading.Event()
+        decoded = []
+
+        def payload(handler):
+            release.wait(5)
+            return [{'id': 1}]
+
+        class CountingFormat(object):
+            mime_type = staticmethod(json_format.mime_type)
+
+            @staticmethod
+            def decode(text):
+                decoded.append(text)
+                return json_format.decode(text)
+
+        with StubServer() as server:
+            server.route('GET', '/todos', payload)
+
+            class Todo(Resource):
+                site = server.url
+                coalescer = RequestCoalescer()
+                format = CountingFormat
+
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                futures = [executor.submit(Todo.find) for _ in range(3)]
+                wait_for(lambda: Todo.coalescer.collapsed == 2)
+                release.set()
+
+            self.assertEqual([[1]] * 3, [[todo.id for todo in future.result()] for future in futures])
+            self.assertEqual(1, len(decoded))
+
+    def test_each_find_gets_its_own_payload(self):
+        release = threading.Event()
+
+        def payload(handler):
+            release.wait(5)
+            return {'id': 42, 'tags': ['a']}
+
+        with StubServer() as server:
+            server.route('GET', '/todos/42', payload)
+
+            class Todo(Resource):
+                site = server.url
+                coalescer = RequestCoalescer()
+
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                futures = [executor.submit(Todo.find, 42) for _ in range(3)]
+                wait_for(lambda: Todo.coalescer.collapsed == 2)
+                release.set()
+
+            todos = [future.result() for future in futures]
+            todos[0].tags.append('b')
+
+            self.assertEqual([['a', 'b'], ['a'], ['a']], [todo.tags for todo in todos])
+            self.assertEqual(3, len(set(id(todo.tags) for todo in todos)))
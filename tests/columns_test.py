@@ -0,0 +1,147 @@
+import json
+import numpy
+import requests_mock
+
+from activerest import Resource
+from activerest.columns import ColumnBuilder
+from activerest.instrumentation import RequestLog
+from requests.exceptions import HTTPError
+from unittest import TestCase
+
+
+class Todo(Resource):
+    site = 'http://example.com'
+
+
+ROWS = [
+    {'id': 1, 'title': 'still todo', 'completed': False, 'estimate': 1.5},
+    {'id': 2, 'title': 'done', 'completed': True, 'estimate': 2},
+    {'id': 3, 'title': 'also done', 'completed': True, 'estimate': 0.5},
+]
+
+
+class ColumnBuilderTest(TestCase):
+    def test_infers_arrays_and_lists(self):
+        builder = ColumnBuilder()
+        builder.extend(ROWS)
+
+        columns = builder.columns()
+
+        self.assertEqual(['id', 'title', 'completed', 'estimate'], list(columns))
+        self.assertEqual('int64', columns['id'].dtype)
+        self.assertEqual(bool, columns['completed'].dtype)
+        self.assertEqual([1.5, 2.0, 0.5], columns['estimate'].tolist())
+        self.assertEqual(['still todo', 'done', 'also done'], columns['title'])
+
+    def test_declared_dtypes(self):
+        builder = ColumnBuilder(['id', 'estimate'], {'id': 'int32', 'estimate': 'float32'})
+        builder.extend(ROWS + [{'id': 4}])
+
+        columns = builder.columns()
+
+        self.assertEqual(['id', 'estimate'], list(columns))
+        self.assertEqual('int32', columns['id'].dtype)
+        self.assertEqual('float32', columns['estimate'].dtype)
+        self.assertTrue(numpy.isnan(columns['estimate'][3]))
+
+    def test_chunks_are_joined(self):
+        builder = ColumnBuilder(chunk_size=2)
+
+        for row in ROWS:
+            builder.append(row)
+
+        self.assertEqual(3, len(builder))
+        self.assertEqual(1, len(builder._rows))
+
+        columns = builder.columns()
+
+        self.assertEqual([1, 2, 3], columns['id'].tolist())
+        self.assertEqual([1.5, 2.0, 0.5], columns['estimate'].tolist())
+
+    def test_column_falls_back_to_list(self):
+        builder = ColumnBuilder(chunk_size=2)
+        builder.extend([{'id': 1}, {'id': 2}, {'id': None}, {'id': [4]}])
+
+        self.assertEqual([1, 2, None, [4]], builder.columns()['id'])
+
+    def test_fields_found_late_are_backfilled(self):
+        builder = ColumnBuilder(chunk_size=1)
+        builder.extend([{'id': 1}, {'id': 2, 'tag': 'b'}, {'id': 3, 'tag': 'c'}])
+
+        self.assertEqual([None, 'b', 'c'], builder.columns()['tag'])
+
+    def test_empty(self):
+        self.assertEqual({}, ColumnBuilder().columns())
+
+        columns = ColumnBuilder(['id', 'title'], {'id': 'int64'}).columns()
+
+        self.assertEqual(0, len(columns['id']))
+        self.assertEqual('int64', columns['id'].dtype)
+        self.assertEqual([], columns['title'])
+
+
+@requests_mock.Mocker()
+class FindColumnsTest(TestCase):
+    def test_find_columns(self, m):
+        m.register_uri('GET', 'http://example.com/todos?completed=true', json=ROWS[1:])
+
+        columns = Todo.find_columns(['id', 'estimate'], params={'completed': True})
+
+        self.assertEqual(['id', 'estimate'], list(columns))
+        self.assertEqual([2, 3], columns['id'].tolist())
+        self.assertEqual([2.0, 0.5], columns['estimate'].tolist())
+
+    def test_find_columns_does_not_build_resources(self, m):
+        m.register_uri('GET', 'http://example.com/todos', json=ROWS)
+
+        original = Todo._instantiate
+        Todo._instantiate = classmethod(lambda cls, attributes: self.fail('built a resource'))
+
+        try:
+            columns = Todo.find_columns()
+        finally:
+            Todo._instantiate = original
+
+        self.assertEqual([1, 2, 3], columns['id'].tolist())
+
+    def test_find_columns_stream(self, m):
+        m.register_uri('GET', 'http://example.com/todos', content=json.dumps(ROWS).encode('utf-8'))
+
+        columns = Todo.find_columns(stream=True, dtypes={'id': 'int16'})
+
+        self.assertEqual('int16', columns['id'].dtype)
+        self.assertEqual([1, 2, 3], columns['id'].tolist())
+        self.assertEqual([False, True, True], columns['completed'].tolist())
+
+    def test_find_columns_in_pages(self, m):
+        m.register_uri('GET', 'http://example.com/todos?page=1&per_page=2', json=ROWS[:2])
+        m.register_uri('GET', 'http://example.com/todos?page=2&per_page=2', json=ROWS[2:])
+        m.register_uri('GET', 'http://example.com/todos?page=3&per_page=2', json=[])
+
+        columns = Todo.find_columns(batch_size=2)
+
+        self.assertEqual([1, 2, 3], columns['id'].tolist())
+        self.assertEqual(['still todo', 'done', 'also done'], columns['title'])
+        self.assertEqual(3, m.call_count)
+
+    def test_find_columns_error(self, m):
+        m.register_uri('GET', 'http://example.com/todos', status_code=500)
+
+        for stream in [False, True]:
+            with self.assertRaises(HTTPError):
+                Todo.find_columns(stream=stream)
+
+    def test_find_columns_is_instrumented(self, m):
+        m.register_uri('GET', 'http://example.com/todos', json=ROWS)
+
+        class InstrumentedTodo(Resource):
+            site = 'http://example.com'
+            element_name = 'todo'
+            request_log = RequestLog()
+
+        InstrumentedTodo.find_columns()
+
+        (event,) = InstrumentedTodo.request_log.recent()
+        self.assertEqual('/todos', event.template)
+        self.assertEqual(200, event.status_code)
+        self.assertGreater(event.timings['hydrate'], 0)
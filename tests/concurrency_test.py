@@ -0,0 +1,125 @@
+import threading
+import time
+
+from activerest import Connection, Resource
+from concurrent.futures import ThreadPoolExecutor
+from tests.server import StubServer
+from unittest import TestCase
+
+
+RECORDS = 50
+
+
+class CountingConnection(Connection):
+    built = 0
+    built_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        with self.built_lock:
+            CountingConnection.built += 1
+        super(CountingConnection, self).__init__(*args, **kwargs)
+
+
+def serve_records(server, latency=0):
+    def payload(identifier):
+        def render(handler):
+            if latency:
+                time.sleep(latency)
+            return {'id': identifier, 'title': 'todo %d' % identifier}
+        return render
+
+    for identifier in range(1, RECORDS + 1):
+        server.route('GET', '/todos/%d' % identifier, payload(identifier))
+
+
+def resource_class(site):
+    return type('Todo', (Resource,), {
+        'site': site,
+        'element_name': 'todo',
+        'connection_class': CountingConnection,
+        'share_pool': False,
+        'pool_maxsize': 16,
+    })
+
+
+def find_all(cls, threads, calls):
+    """Find calls records with threads threads, returning them and the seconds it took."""
+    started = threading.Event()
+
+    def find(index):
+        started.wait()
+        return cls.find(index % RECORDS + 1)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = executor.map(find, range(calls))
+        start = time.time()
+        started.set()
+        todos = list(results)
+        return (todos, time.time() - start)
+
+
+class ConcurrencyTest(TestCase):
+    def setUp(self):
+        CountingConnection.built = 0
+
+    def test_concurrent_finds(self):
+        with StubServer() as server:
+            serve_records(server)
+            cls = resource_class(server.url)
+
+            (todos, _) = find_all(cls, 16, 2000)
+
+            stats = cls.connection().pool_stats()
+
+        self.assertEqual(1, CountingConnection.built)
+        self.assertEqual([index % RECORDS + 1 for index in range(2000)],
+                         [todo.id for todo in todos])
+        self.assertTrue(all(todo.title == 'todo %d' % todo.id for todo in todos))
+        self.assertEqual(2000, stats['requests'])
+        self.assertLessEqual(stats['connections'], 16)
+
+    def test_throughput_scales_with_threads(self):
+        with StubServer() as server:
+            serve_records(server, latency=0.01)
+
+            (_, serial) = find_all(resource_class(server.url), 1, 40)
+            (todos, concurrent) = find_all(resource_class(server.url), 8, 320)
+
+        self.assertEqual(320, len(todos))
+        self.assertGreater((320.0 / concurrent) / (40.0 / serial), 3)
+
+    def test_each_thread_has_its_own_session(self):
+        connection = Connection('http://example.com')
+        sessions = []
+
+        def session():
+            sessions.append(connection.session)
+
+        threads = [threading.Thread(target=session) for _ in range(2)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIsNot(sessions[0], sessions[1])
+        self.assertIs(sessions[0].get_adapter('http://example.com'),
+                      sessions[1].get_adapter('http://example.com'))
+        self.assertIs(connection.session, connection.session)
+
+    def test_credentials_share_pool_but_not_sessions(self):
+        with StubServer() as server:
+            server.route('GET', '/todos/1', {'id': 1}, headers={'Set-Cookie': 'session=secret'})
+
+            classes = [type('Todo', (Resource,), {
+                'site': server.url.replace('http://', 'http://%s:secret@' % username),
+                'element_name': 'todo',
+            }) for username in ['alice', 'bob']]
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                todos = list(executor.map(lambda index: classes[index % 2].find(1), range(200)))
+
+        self.assertEqual([1] * 200, [todo.id for todo in todos])
+        self.assertIs(classes[0].connection().adapter, classes[1].connection().adapter)
+        self.assertIsNot(classes[0].connection().session, classes[1].connection().session)
+        self.assertTrue(all('Cookie' not in headers for (_, _, headers, _) in server.received))
@@ -1,7 +1,13 @@
-from unittest import TestCase
+import json
+from unittest import TestCase, skipIf
 
 from activerest.formats import json_format
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class JsonFormatTest(TestCase):
     def test_extension(self):
@@ -12,8 +18,13 @@ class JsonFormatTest(TestCase):
 
     def test_encode(self):
         data = {"values": [1, 2]}
-        expected = '{"values": [1, 2]}'
-        self.assertEqual(expected, json_format.encode(data, indent=None))
+        expected = '{"values":[1,2]}'
+        self.assertEqual(expected, json_format.encode(data))
+
+    def test_encode_with_kwargs(self):
+        data = {"values": [1, 2]}
+        expected = '{\n    "values": [\n        1,\n        2\n    ]\n}'
+        self.assertEqual(expected, json_format.encode(data, indent=4, separators=(',', ': ')))
 
     def test_decode(self):
         text = '{"values":[1,2],"other_value":2}'
@@ -29,3 +40,99 @@ class JsonFormatTest(TestCase):
         text = '{"values":{"attr":"value"}}'
         expected = {"attr": "value"}
         self.assertEqual(expected, json_format.decode(text))
+
+    def test_iterdecode_with_list(self):
+        chunks = [b'[{"id": 1}, {"i', b'd": 2}, 12', b'3, "\xc3', b'\xa9"]']
+        expected = [{"id": 1}, {"id": 2}, 123, u"\u00e9"]
+        self.assertEqual(expected, list(json_format.iterdecode(chunks)))
+
+    def test_iterdecode_with_numbers_split_across_chunks(self):
+        document = b'[{"a": 1.5}, 2.25, 1e5, -3, 4E-2, 0]'
+        expected = [{"a": 1.5}, 2.25, 1e5, -3, 4E-2, 0]
+
+        self.assertEqual(expected, list(json_format.iterdecode(
+            [document[:15], document[15:21], document[21:]])))
+
+        for first in range(1, len(document)):
+            for second in range(first, len(document)):
+                chunks = [document[:first], document[first:second], document[second:]]
+                self.assertEqual(expected, list(json_format.iterdecode(chunks)), chunks)
+
+    def test_iterdecode_with_single_list(self):
+        chunks = [b'{"values"', b': [1, ', b'2]}']
+        self.assertEqual([1, 2], list(json_format.iterdecode(chunks)))
+
+    def test_iterdecode_with_single_dict(self):
+        chunks = [b'{"value": {"attr"', b': "value"}}']
+        self.assertEqual([{"attr": "value"}], list(json_format.iterdecode(chunks)))
+
+    def test_iterdecode_with_multiple_root(self):
+        chunks = [b'{"values": 1, ', b'"other_value": 2}']
+        expected = [{"values": 1, "other_value": 2}]
+        self.assertEqual(expected, list(json_format.iterdecode(chunks)))
+
+    def test_iterdecode_with_empty_list(self):
+        self.assertEqual([], list(json_format.iterdecode([b' [ ', b'] '])))
+
+    def test_iterdecode_is_incremental(self):
+        def chunks():
+            yield b'[{"id": 1},'
+            raise AssertionError('read past the first element')
+
+        self.assertEqual({"id": 1}, next(json_format.iterdecode(chunks())))
+
+    def test_iterdecode_with_invalid_document(self):
+        with self.assertRaises(ValueError):
+            list(json_format.iterdecode([b'[1, 2', b' 3]']))
+
+    def test_iterdecode_with_extra_root_keys(self):
+        with self.assertRaises(ValueError):
+            list(json_format.iterdecode([b'{"values": [1], "other_value": 2}']))
+
+    def test_decode_bytes(self):
+        self.assertEqual({"attr": "value"}, json_format.decode(b'{"values":{"attr":"value"}}'))
+
+    def test_backend(self):
+        backend = json_format.backend('json')
+        self.assertEqual('json', backend.name)
+        self.assertIs(backend, json_format.backend('json'))
+        self.assertEqual('application/json', backend.mime_type())
+        self.assertEqual('{"values":[1,2]}', backend.encode({"values": [1, 2]}))
+        self.assertEqual([1, 2], backend.decode(b'{"values":[1,2]}'))
+        self.assertEqual([1, 2], list(backend.iterdecode([b'[1,', b'2]'])))
+
+    def test_default_backend(self):
+        self.assertIs(json_format._default, json_format.backend())
+        self.assertIn(json_format.backend().name, json_format.BACKENDS)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            json_format.backend('yaml')
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_backend(self):
+        backend = json_format.backend('orjson')
+        self.assertEqual('{"1":[1,2]}', backend.encode({1: [1, 2]}))
+        self.assertEqual(json_format.backend('json').encode({"values": [1, 2]}, indent=2),
+                         backend.encode({"values": [1, 2]}, indent=2))
+        self.assertEqual({"attr": "value"}, backend.decode(b'{"values":{"attr":"value"}}'))
+
+    def test_big_integers(self):
+        document = b'{"id": 123456789012345678901234567890, "small": 1, "tag": "x"}'
+        expected = {'id': 123456789012345678901234567890, 'small': 1, 'tag': 'x'}
+        backends = [json_format] + [json_format.backend(name) for name in json_format.BACKENDS
+                                    if name == 'json' or name == 'orjson' and orjson is not None]
+
+        for backend in backends:
+            self.assertEqual(expected, backend.decode(document))
+            self.assertEqual(expected, backend.decode(document.decode('utf-8')))
+            self.assertEqual([expected], list(backend.iterdecode([document[:20], document[20:]])))
+            self.assertEqual(expected, json.loads(backend.encode(expected)))
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_big_integers_without_exact_integers(self):
+        fast = json_format.backend('orjson', exact_integers=False)
+
+        self.assertIsNot(fast, json_format.backend('orjson'))
+        self.assertIsInstance(fast.decode(b'{"id": 123456789012345678901234567890}')['id'], float)
+        self.assertEqual({'id': 1}, fast.decode(b'{"id": 1}'))
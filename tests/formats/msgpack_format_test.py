@@ -0,0 +1,65 @@
+from unittest import TestCase, skipIf
+
+try:
+    import msgpack
+    from activerest.formats import msgpack_format
+except ImportError:
+    msgpack = None
+
+
+def chunked(data, size=3):
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+@skipIf(msgpack is None, 'msgpack is not installed')
+class MsgpackFormatTest(TestCase):
+    def test_extension(self):
+        self.assertEqual('msgpack', msgpack_format.extension())
+
+    def test_mime_type(self):
+        self.assertEqual('application/msgpack', msgpack_format.mime_type())
+
+    def test_encode(self):
+        data = {"values": [1, 2], "bytes": b'\x00'}
+        self.assertEqual(data, msgpack.unpackb(msgpack_format.encode(data), raw=False))
+        self.assertIsInstance(msgpack_format.encode(data), bytes)
+
+    def test_decode(self):
+        data = {"values": [1, 2], "other_value": 2}
+        self.assertEqual(data, msgpack_format.decode(msgpack.packb(data)))
+
+    def test_decode_with_single_list(self):
+        self.assertEqual([1, 2], msgpack_format.decode(msgpack.packb({"values": [1, 2]})))
+
+    def test_decode_with_single_dict(self):
+        expected = {"attr": "value"}
+        self.assertEqual(expected, msgpack_format.decode(msgpack.packb({"value": expected})))
+
+    def test_iterdecode_list(self):
+        data = msgpack.packb([{"id": 1}, {"id": 2}])
+        self.assertEqual([{"id": 1}, {"id": 2}], list(msgpack_format.iterdecode(chunked(data))))
+
+    def test_iterdecode_list_with_root(self):
+        data = msgpack.packb({"todos": [{"id": 1}, {"id": 2}]})
+        self.assertEqual([{"id": 1}, {"id": 2}], list(msgpack_format.iterdecode(chunked(data))))
+
+    def test_iterdecode_is_incremental(self):
+        data = msgpack.packb([{"id": 1}, {"id": 2}])
+        chunks = iter(chunked(data, 6))
+        values = msgpack_format.iterdecode(chunks)
+        self.assertEqual({"id": 1}, next(values))
+        self.assertGreater(len(list(chunks)), 0)
+
+    def test_iterdecode_single_dict(self):
+        data = msgpack.packb({"todo": {"id": 1}})
+        self.assertEqual([{"id": 1}], list(msgpack_format.iterdecode(chunked(data))))
+
+    def test_iterdecode_multiple_keys(self):
+        data = msgpack.packb({"values": [1], "other_value": 2})
+        self.assertEqual([{"values": [1], "other_value": 2}],
+                         list(msgpack_format.iterdecode(chunked(data))))
+
+    def test_iterdecode_truncated(self):
+        data = msgpack.packb([1, 2, 3])[:-1]
+        with self.assertRaises(ValueError):
+            list(msgpack_format.iterdecode(chunked(data)))
@@ -35,3 +35,41 @@ class XmlFormatTest(TestCase):
         text = '<root><attr>name</attr></root>'
         expected = OrderedDict({"attr": "name"})
         self.assertEqual(expected, xml_format.decode(text))
+
+    def test_decode_collection(self):
+        self.assertEqual([{'id': '1'}, {'id': '2'}],
+                         xml_format.decode_collection('<todos><todo><id>1</id></todo><todo><id>2</id></todo></todos>'))
+        self.assertEqual([{'id': '1'}], xml_format.decode_collection(b'<todos><todo><id>1</id></todo></todos>'))
+        self.assertEqual([], xml_format.decode_collection('<todos/>'))
+
+    def test_decode_collection_ignores_declared_encoding_of_text(self):
+        text = u'<?xml version="1.0" encoding="ISO-8859-1"?><todos><todo>caf\u00e9</todo></todos>'
+
+        self.assertEqual([u'caf\u00e9'], xml_format.decode_collection(text))
+        self.assertEqual(xml_format.decode(text), {'todo': xml_format.decode_collection(text)[0]})
+
+    def test_iterdecode_with_declared_encoding(self):
+        chunks = [u'<?xml version="1.0" encoding="ISO-8859-1"?><todos><todo>caf\u00e9</todo></todos>'
+                  .encode('iso-8859-1')]
+
+        self.assertEqual([u'caf\u00e9'], list(xml_format.iterdecode(chunks)))
+
+    def test_iterdecode(self):
+        chunks = [b'<todos><todo><id>1</id><title>fir', b'st</title></todo>', b'<todo><id>2</id></todo></todos>']
+        expected = [{'id': '1', 'title': 'first'}, {'id': '2'}]
+        self.assertEqual(expected, list(xml_format.iterdecode(chunks)))
+
+    def test_iterdecode_with_empty_root(self):
+        self.assertEqual([], list(xml_format.iterdecode([b'<todos>', b'</todos>'])))
+
+    def test_iterdecode_is_incremental(self):
+        def chunks():
+            yield b'<todos><todo><id>1</id></todo>'
+            raise AssertionError('read past the first element')
+
+        self.assertEqual({'id': '1'}, next(xml_format.iterdecode(chunks())))
+
+    def test_iterdecode_with_entities(self):
+        chunks = [b'<!DOCTYPE todos [<!ENTITY a "a">]><todos><todo>&a;</todo></todos>']
+        with self.assertRaises(ValueError):
+            list(xml_format.iterdecode(chunks))
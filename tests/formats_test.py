@@ -1,4 +1,6 @@
-from activerest.formats import remove_root
+import requests
+
+from activerest.formats import decode_response, json_format, remove_root
 from unittest import TestCase
 
 
@@ -16,3 +18,27 @@ class FormatsTest(TestCase):
     def test_remove_root_with_multiple_root(self):
         data = {'values': {}, 'other': {}}
         self.assertEqual(data, remove_root(data))
+
+    def test_decode_response_from_bytes(self):
+        decoded = []
+
+        class Format(object):
+            decode_bytes = True
+
+            @staticmethod
+            def decode(body):
+                decoded.append(body)
+                return json_format.decode(body)
+
+        response = requests.Response()
+        response._content = '{"title": "caf\u00e9"}'.encode('utf-8')
+
+        for encoding in [None, 'utf-8', 'UTF8']:
+            response.encoding = encoding
+            self.assertEqual({'title': u'caf\u00e9'}, decode_response(Format, response))
+            self.assertIsInstance(decoded.pop(), bytes)
+
+        response._content = '{"title": "caf\u00e9"}'.encode('latin-1')
+        response.encoding = 'latin-1'
+        self.assertEqual({'title': u'caf\u00e9'}, decode_response(Format, response))
+        self.assertNotIsInstance(decoded.pop(), bytes)
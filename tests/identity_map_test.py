@@ -0,0 +1,156 @@
+import requests
+import requests_mock
+import threading
+
+from activerest import Resource
+from activerest.identity_map import IdentityMap
+from unittest import TestCase
+
+
+class Todo(Resource):
+    site = 'http://example.com'
+
+
+class Note(Resource):
+    site = 'http://example.com'
+
+
+@requests_mock.Mocker()
+class IdentityMapTest(TestCase):
+    def test_without_identity_map(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1})
+
+        self.assertIsNot(Todo.find(1), Todo.find(1))
+        self.assertIsNone(IdentityMap.current())
+
+    def test_find_returns_loaded_instance(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1, 'title': 'todo'})
+
+        with IdentityMap():
+            first = Todo.find(1)
+            second = Todo.find('1')
+
+        self.assertIs(first, second)
+        self.assertEqual(1, m.call_count)
+
+    def test_collection_merges_into_loaded_instance(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1, 'title': 'todo'})
+        m.register_uri('GET', 'http://example.com/todos',
+                       json=[{'id': 1, 'title': 'changed'}, {'id': 2, 'title': 'other'}])
+
+        with IdentityMap() as identity_map:
+            todo = Todo.find(1)
+            todos = Todo.find()
+
+            self.assertEqual(2, len(identity_map))
+
+        self.assertIs(todo, todos[0])
+        self.assertEqual('changed', todo.title)
+
+    def test_scoped_by_class(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1})
+        m.register_uri('GET', 'http://example.com/notes/1', json={'id': 1})
+
+        with IdentityMap():
+            todo = Todo.find(1)
+            note = Note.find(1)
+
+        self.assertIsInstance(todo, Todo)
+        self.assertIsInstance(note, Note)
+
+    def test_scope_ends_with_context(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1})
+
+        with IdentityMap():
+            todo = Todo.find(1)
+
+        self.assertIsNot(todo, Todo.find(1))
+        self.assertEqual(2, m.call_count)
+
+    def test_nested_scopes(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1})
+
+        with IdentityMap() as outer:
+            todo = Todo.find(1)
+            with IdentityMap() as inner:
+                self.assertIs(inner, IdentityMap.current())
+                self.assertIsNot(todo, Todo.find(1))
+            self.assertIs(outer, IdentityMap.current())
+
+    def test_save_registers_instance(self, m):
+        m.register_uri('POST', 'http://example.com/todos',
+                       json={'id': 1, 'title': 'new'}, status_code=requests.codes.created)
+
+        with IdentityMap():
+            todo = Todo(title='new')
+            todo.save()
+            self.assertIs(todo, Todo.find(1))
+
+    def test_destroy_unregisters_instance(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1})
+        m.register_uri('DELETE', 'http://example.com/todos/1')
+
+        with IdentityMap() as identity_map:
+            todo = Todo.find(1)
+            todo.destroy()
+            self.assertNotIn(todo, identity_map)
+
+    def test_delete_unregisters_record(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1})
+        m.register_uri('DELETE', 'http://example.com/todos/1')
+
+        with IdentityMap() as identity_map:
+            todo = Todo.find(1)
+            self.assertTrue(Todo.delete(1))
+            self.assertNotIn(todo, identity_map)
+            self.assertIsNot(todo, Todo.find(1))
+
+        self.assertEqual(2, len([request for request in m.request_history if request.method == 'GET']))
+
+    def test_failed_delete_keeps_record(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1})
+        m.register_uri('DELETE', 'http://example.com/todos/1', status_code=requests.codes.accepted)
+
+        with IdentityMap() as identity_map:
+            todo = Todo.find(1)
+            self.assertFalse(Todo.delete(1))
+            self.assertIn(todo, identity_map)
+
+    def test_destroy_all_unregisters_records(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1})
+        m.register_uri('GET', 'http://example.com/todos/2', json={'id': 2})
+        m.register_uri('DELETE', 'http://example.com/todos/1')
+        m.register_uri('DELETE', 'http://example.com/todos/2')
+
+        with IdentityMap() as identity_map:
+            (first, second) = Todo.find_many([1, 2])
+            self.assertEqual([True, True], Todo.destroy_all([1, second]))
+            self.assertEqual(0, len(identity_map))
+            self.assertIsNot(first, Todo.find(1))
+
+    def test_find_many_uses_identity_map(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1})
+        m.register_uri('GET', 'http://example.com/todos/2', json={'id': 2})
+
+        with IdentityMap() as identity_map:
+            todo = Todo.find(1)
+            todos = Todo.find_many([1, 2, 2])
+
+            self.assertEqual(2, len(identity_map))
+
+        self.assertIs(todo, todos[0])
+        self.assertIs(todos[1], todos[2])
+        self.assertEqual(1, len([request for request in m.request_history if request.path == '/todos/1']))
+
+    def test_workers_leave_their_thread_clean(self, m):
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1})
+        current = []
+
+        with IdentityMap():
+            Todo.find_many([1])
+
+        thread = threading.Thread(target=lambda: current.append(IdentityMap.current()))
+        thread.start()
+        thread.join()
+
+        self.assertEqual([None], current)
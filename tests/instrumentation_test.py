@@ -0,0 +1,164 @@
+import requests
+import requests_mock
+
+from activerest import Connection, Resource
+from activerest.instrumentation import Histogram, RequestLog
+from requests.exceptions import ConnectionError, HTTPError
+from unittest import TestCase
+
+
+class Todo(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+
+
+class Comment(Resource):
+    site = 'http://example.com'
+    prefix = '/todos/{todo_id}/'
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        self.events = []
+        self.log = RequestLog(max_entries=2)
+        Todo.request_log = self.log
+        Todo.hooks = {
+            'before_request': [lambda event: self.events.append(('before_request', event))],
+            'after_response': [lambda event: self.events.append(('after_response', event))],
+            'on_error': [lambda event: self.events.append(('on_error', event))],
+        }
+
+    def tearDown(self):
+        Todo.request_log = None
+        Todo.hooks = None
+
+    def test_uninstrumented_response_has_no_event(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1})
+            response = Connection('http://example.com').get('/todos/1')
+
+        self.assertFalse(hasattr(response, 'event'))
+
+    def test_find_events(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1, 'title': 'todo'})
+            Todo.find(1)
+
+        self.assertEqual(['before_request', 'after_response'], [name for (name, _) in self.events])
+
+        event = self.events[-1][1]
+        self.assertEqual('GET', event.method)
+        self.assertEqual('http://example.com/todos/1', event.url)
+        self.assertEqual('/todos/{0}', event.template)
+        self.assertEqual('Todo', event.resource)
+        self.assertEqual(requests.codes.ok, event.status_code)
+        self.assertEqual(len(b'{"id": 1, "title": "todo"}'), event.bytes_received)
+        self.assertGreater(event.timings['decode'], 0)
+        self.assertGreater(event.timings['hydrate'], 0)
+        self.assertIsNone(event.error)
+
+    def test_find_stream_finishes_after_iteration(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', json=[{'id': 1}, {'id': 2}])
+            todos = Todo.find(stream=True)
+            self.assertEqual(['before_request'], [name for (name, _) in self.events])
+            self.assertEqual(2, len(list(todos)))
+
+        event = self.events[-1][1]
+        self.assertEqual('after_response', self.events[-1][0])
+        self.assertGreater(event.timings['hydrate'], 0)
+
+    def test_save_bytes_sent(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', 'http://example.com/todos', status_code=201, json={'id': 1})
+            Todo(title='todo').save()
+
+        event = self.events[-1][1]
+        self.assertEqual('/todos', event.template)
+        self.assertEqual(len('{"title":"todo"}'), event.bytes_sent)
+
+    def test_http_error(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', status_code=500)
+            with self.assertRaises(HTTPError):
+                Todo.find()
+
+        (name, event) = self.events[-1]
+        self.assertEqual('on_error', name)
+        self.assertEqual(500, event.status_code)
+        self.assertIsInstance(event.error, HTTPError)
+
+    def test_connection_error(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos/1', exc=ConnectionError)
+            with self.assertRaises(ConnectionError):
+                Todo.find(1)
+
+        (name, event) = self.events[-1]
+        self.assertEqual('on_error', name)
+        self.assertIsNone(event.status_code)
+        self.assertIsInstance(event.error, ConnectionError)
+
+    def test_request_log(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1})
+            m.register_uri('GET', 'http://example.com/todos/2', status_code=404)
+            m.register_uri('HEAD', 'http://example.com/todos/1')
+            Todo.find(1)
+            Todo.find(2)
+            Todo.exists(1)
+
+        self.assertEqual(2, len(self.log))
+        self.assertEqual(['/todos/2', '/todos/1'],
+                         [event.url[len('http://example.com'):] for event in self.log.recent()])
+
+        stats = dict((stats['method'], stats) for stats in self.log.stats())
+        self.assertEqual(2, stats['GET']['requests'])
+        self.assertEqual(1, stats['GET']['errors'])
+        self.assertEqual(2, stats['GET']['latency']['count'])
+        self.assertEqual('/todos/{0}', stats['HEAD']['template'])
+        self.assertEqual('Todo', stats['HEAD']['resource'])
+
+    def test_prefix_template(self):
+        log = RequestLog()
+        Comment.request_log = log
+
+        try:
+            with requests_mock.Mocker() as m:
+                m.register_uri('GET', 'http://example.com/todos/1/comments', json=[])
+                Comment.find(params={'todo_id': 1})
+        finally:
+            Comment.request_log = None
+
+        self.assertEqual('/todos/{todo_id}/comments', log.recent()[0].template)
+
+    def test_on_and_off(self):
+        connection = Connection('http://example.com')
+        events = []
+        callback = connection.on('after_response', events.append)
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', json=[])
+            connection.get('/todos')
+            connection.off('after_response', callback)
+            connection.get('/todos')
+
+        self.assertEqual(1, len(events))
+        self.assertIsNone(events[0].template)
+
+    def test_unknown_hook(self):
+        connection = Connection('http://example.com')
+        with self.assertRaises(ValueError):
+            connection.on('after_request', print)
+
+
+class HistogramTest(TestCase):
+    def test_percentiles(self):
+        histogram = Histogram(buckets=(0.01, 0.1, 1.0, float('inf')))
+        for value in [0.005] * 90 + [0.05] * 9 + [2.0]:
+            histogram.add(value)
+
+        self.assertEqual([90, 9, 0, 1], histogram.counts)
+        self.assertEqual(0.01, histogram.percentile(0.5))
+        self.assertEqual(0.1, histogram.percentile(0.99))
+        self.assertEqual(2.0, histogram.percentile(1.0))
@@ -0,0 +1,135 @@
+import requests_mock
+import time
+
+from activerest import Resource
+from activerest.formats import xml_format
+from activerest.pagination import CursorPagination, LinkPagination, PagePagination
+from requests.exceptions import HTTPError
+from unittest import TestCase
+
+
+class Todo(Resource):
+    site = 'http://example.com'
+
+
+class TodoWithXmlFormat(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    format = xml_format
+
+
+class TodoWithLinks(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    pagination = LinkPagination()
+
+
+class TodoWithCursor(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    pagination = CursorPagination()
+
+
+@requests_mock.Mocker()
+class PaginationTest(TestCase):
+    def test_find_in_batches_with_pages(self, m):
+        m.register_uri('GET', 'http://example.com/todos?page=1&per_page=2',
+                       json=[{'id': 1}, {'id': 2}])
+        m.register_uri('GET', 'http://example.com/todos?page=2&per_page=2',
+                       json=[{'id': 3}])
+        m.register_uri('GET', 'http://example.com/todos?page=3&per_page=2',
+                       json=[])
+
+        batches = list(Todo.find_in_batches(batch_size=2))
+
+        self.assertEqual([[1, 2], [3]], [[todo.id for todo in batch] for batch in batches])
+        self.assertTrue(batches[0][0].is_persisted())
+        self.assertEqual(3, m.call_count)
+
+    def test_find_each_with_xml_pages(self, m):
+        m.register_uri('GET', 'http://example.com/todos?page=1&per_page=2',
+                       text='<todos><todo><id>1</id></todo><todo><id>2</id></todo></todos>')
+        m.register_uri('GET', 'http://example.com/todos?page=2&per_page=2',
+                       text='<todos><todo><id>3</id></todo></todos>')
+        m.register_uri('GET', 'http://example.com/todos?page=3&per_page=2',
+                       text='<todos></todos>')
+
+        self.assertEqual(['1', '2', '3'], [todo.id for todo in TodoWithXmlFormat.find_each(batch_size=2)])
+        self.assertEqual(['1', '2', '3'], TodoWithXmlFormat.find_columns(batch_size=2)['id'])
+
+    def test_find_each_with_capped_page_size(self, m):
+        m.register_uri('GET', 'http://example.com/todos?page=1&per_page=100',
+                       json=[{'id': 1}, {'id': 2}])
+        m.register_uri('GET', 'http://example.com/todos?page=2&per_page=100',
+                       json=[{'id': 3}, {'id': 4}])
+        m.register_uri('GET', 'http://example.com/todos?page=3&per_page=100',
+                       json=[])
+
+        self.assertEqual([1, 2, 3, 4], [todo.id for todo in Todo.find_each(batch_size=100)])
+
+    def test_find_each_with_short_page_is_last(self, m):
+        m.register_uri('GET', 'http://example.com/todos?page=1&per_page=2',
+                       json=[{'id': 1}, {'id': 2}])
+        m.register_uri('GET', 'http://example.com/todos?page=2&per_page=2',
+                       json=[{'id': 3}])
+
+        class TodoWithShortPages(Resource):
+            site = 'http://example.com'
+            element_name = 'todo'
+            pagination = PagePagination(short_page_is_last=True)
+
+        self.assertEqual([1, 2, 3], [todo.id for todo in TodoWithShortPages.find_each(batch_size=2)])
+        self.assertEqual(2, m.call_count)
+
+    def test_find_each_with_pages_and_params(self, m):
+        m.register_uri('GET', 'http://example.com/todos?completed=true&page=1&per_page=2',
+                       json=[{'id': 1}, {'id': 2}])
+        m.register_uri('GET', 'http://example.com/todos?completed=true&page=2&per_page=2',
+                       json=[])
+
+        todos = Todo.find_each(params={'completed': True}, batch_size=2)
+
+        self.assertEqual([1, 2], [todo.id for todo in todos])
+
+    def test_find_each_with_links(self, m):
+        m.register_uri('GET', 'http://example.com/todos?per_page=2',
+                       json=[{'id': 1}, {'id': 2}],
+                       headers={'Link': '<http://example.com/todos?after=2&per_page=2>; rel="next"'})
+        m.register_uri('GET', 'http://example.com/todos?after=2&per_page=2',
+                       json=[{'id': 3}])
+
+        todos = TodoWithLinks.find_each(batch_size=2)
+
+        self.assertEqual([1, 2, 3], [todo.id for todo in todos])
+
+    def test_find_each_with_cursor(self, m):
+        m.register_uri('GET', 'http://example.com/todos?per_page=2',
+                       json={'data': [{'id': 1}, {'id': 2}], 'next_cursor': 'abc'})
+        m.register_uri('GET', 'http://example.com/todos?cursor=abc&per_page=2',
+                       json={'data': [{'id': 3}], 'next_cursor': None})
+
+        todos = TodoWithCursor.find_each(batch_size=2)
+
+        self.assertEqual([1, 2, 3], [todo.id for todo in todos])
+
+    def test_find_each_prefetches_next_page(self, m):
+        m.register_uri('GET', 'http://example.com/todos?page=1&per_page=1', json=[{'id': 1}])
+        m.register_uri('GET', 'http://example.com/todos?page=2&per_page=1', json=[{'id': 2}])
+        m.register_uri('GET', 'http://example.com/todos?page=3&per_page=1', json=[])
+
+        todos = Todo.find_each(batch_size=1)
+        next(todos)
+
+        for _ in range(100):
+            if m.call_count == 2:
+                break
+            time.sleep(0.01)
+
+        self.assertEqual(2, m.call_count)
+        self.assertEqual([2], [todo.id for todo in todos])
+
+    def test_find_each_raises_errors(self, m):
+        m.register_uri('GET', 'http://example.com/todos?page=1', status_code=500)
+
+        with self.assertRaises(HTTPError):
+            list(Todo.find_each())
@@ -6,9 +6,16 @@ import requests_mock
 import six
 
 from activerest import Connection, Resource
+from activerest.formats import json_format, xml_format
 from furl import furl
 from requests.exceptions import HTTPError
-from unittest import TestCase
+from unittest import TestCase, skipIf
+
+try:
+    import msgpack
+    from activerest.formats import msgpack_format
+except ImportError:
+    msgpack = None
 
 class ExampleConnection(Connection):
     pass
@@ -45,6 +52,13 @@ class TodoWithDigestAuth(Resource):
     password = 'password'
 
 
+class TodoWithBulkPath(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    bulk_path = '/todos/bulk'
+    track_changes = True
+
+
 class TodoWithTimeout(Resource):
     site = 'http://example.com'
     element_name = 'todo'
@@ -67,6 +81,44 @@ class TodoWithConnectionClass(Resource):
     username = 'username'
 
 
+class TodoWithPool(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    pool_maxsize = 32
+    keep_alive = False
+
+
+class TodoWithXmlFormat(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    format = xml_format
+
+
+class TodoWithPartialUpdates(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    partial_updates = True
+
+
+class TodoWithTrackChanges(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    track_changes = True
+
+
+class TodoWithSchema(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    schema = ('id', 'title', 'completed')
+    track_changes = True
+
+
+class TodoWithPrefix(Resource):
+    site = 'http://example.com'
+    element_name = 'todo'
+    prefix = '/projects/{project_id}'
+
+
 class TodoWithoutSite(Resource):
     pass
 
@@ -121,6 +173,175 @@ class ResourcesTest(TestCase):
         actual = Todo.find(1)
         self.assert_todo(expected, actual)
 
+    def test_find_many(self, m):
+        expected = {'id': 1, 'title': 'still todo', 'completed': False}
+
+        m.register_uri('GET', 'http://example.com/todos/1', json=expected)
+        m.register_uri('GET', 'http://example.com/todos/2', status_code=requests.codes.not_found)
+        m.register_uri('GET', 'http://example.com/todos/3', status_code=500)
+
+        actual = Todo.find_many([3, 1, 2], max_workers=2)
+
+        self.assertEqual(3, len(actual))
+        self.assertIsInstance(actual[0], HTTPError)
+        self.assert_todo(expected, actual[1])
+        self.assertIsNone(actual[2])
+
+    def test_find_many_with_no_identifiers(self, m):
+        self.assertEqual([], Todo.find_many([]))
+
+    def test_save_all(self, m):
+        m.register_uri('POST', 'http://example.com/todos', status_code=201, json={'id': 3})
+        m.register_uri('PUT', 'http://example.com/todos/1', json={'id': 1, 'title': 'saved'})
+        m.register_uri('PUT', 'http://example.com/todos/2', status_code=500)
+
+        todos = [
+            Todo(_meta={'persisted': True}, id=1, title='todo'),
+            Todo(title='new'),
+            Todo(_meta={'persisted': True}, id=2, title='fails'),
+        ]
+
+        self.assertEqual([True, True, False], Todo.save_all(todos, max_workers=2))
+        self.assertEqual('saved', todos[0].title)
+        self.assertEqual(3, todos[1].id)
+        self.assertTrue(todos[1].is_persisted())
+
+    def test_save_all_with_bulk_path(self, m):
+        m.register_uri('POST', 'http://example.com/todos/bulk', status_code=201,
+                       json=[{'id': 1, 'title': 'first'}, {'id': 2, 'title': 'second'}])
+        m.register_uri('PUT', 'http://example.com/todos/9', json={'id': 9})
+
+        todos = [
+            TodoWithBulkPath(title='first', completed=False),
+            TodoWithBulkPath(_meta={'persisted': True}, id=9),
+            TodoWithBulkPath(title='second', completed=True),
+        ]
+
+        self.assertEqual([True, True, True], TodoWithBulkPath.save_all(todos))
+        self.assertEqual([1, 9, 2], [todo.id for todo in todos])
+        self.assertTrue(all(todo.is_persisted() for todo in todos))
+        self.assertFalse(todos[0].is_changed())
+
+        bulk = [request for request in m.request_history if request.path == '/todos/bulk']
+        self.assertEqual(1, len(bulk))
+        self.assertEqual([{'title': 'first', 'completed': False}, {'title': 'second', 'completed': True}],
+                         bulk[0].json())
+
+    def test_save_all_with_bulk_path_in_batches(self, m):
+        m.register_uri('POST', 'http://example.com/todos/bulk', [
+            {'status_code': 201, 'json': [{'id': 1}, {'id': 2}]},
+            {'status_code': 422},
+        ])
+
+        todos = [TodoWithBulkPath(title=str(index)) for index in range(3)]
+
+        self.assertEqual([True, True, False], TodoWithBulkPath.save_all(todos, batch_size=2))
+        self.assertEqual([True, True, False], [todo.is_persisted() for todo in todos])
+
+    def test_save_all_with_bulk_path_row_mismatch(self, m):
+        m.register_uri('POST', 'http://example.com/todos/bulk', status_code=201, json=[{'id': 1}])
+
+        todos = [TodoWithBulkPath(title='first'), TodoWithBulkPath(title='second')]
+        results = TodoWithBulkPath.save_all(todos)
+
+        self.assertIsInstance(results[0], ValueError)
+        self.assertIs(results[0], results[1])
+
+    def test_destroy_all(self, m):
+        m.register_uri('DELETE', 'http://example.com/todos/1')
+        m.register_uri('DELETE', 'http://example.com/todos/2', status_code=404)
+        m.register_uri('DELETE', 'http://example.com/todos/3')
+
+        todo = Todo(_meta={'persisted': True}, id=3)
+
+        self.assertEqual([True, False, True], Todo.destroy_all([1, 2, todo]))
+        self.assertTrue(todo.is_new())
+
+    def test_json_backend(self, m):
+        class TodoWithJsonBackend(Resource):
+            site = 'http://example.com'
+            element_name = 'todo'
+            format = json_format.backend('json')
+
+        m.register_uri('GET', 'http://example.com/todos/1', json={'id': 1, 'title': 'todo'})
+
+        self.assertEqual({'id': 1, 'title': 'todo'}, TodoWithJsonBackend.find(1).attributes)
+        self.assertEqual('application/json', m.last_request.headers['Accept'])
+
+    @skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack_format(self, m):
+        class TodoWithMsgpackFormat(Resource):
+            site = 'http://example.com'
+            element_name = 'todo'
+            format = msgpack_format
+
+        m.register_uri('GET', 'http://example.com/todos',
+                       content=msgpack.packb({'todos': [{'id': 1}, {'id': 2}]}),
+                       headers={'Content-Type': 'application/msgpack; charset=latin-1'})
+        m.register_uri('POST', 'http://example.com/todos', status_code=201,
+                       content=msgpack.packb({'id': 3, 'title': u'caf\u00e9'}))
+
+        self.assertEqual([1, 2], [todo.id for todo in TodoWithMsgpackFormat.find()])
+        self.assertEqual([1, 2], [todo.id for todo in TodoWithMsgpackFormat.find(stream=True)])
+
+        todo = TodoWithMsgpackFormat(title=u'caf\u00e9')
+        self.assertTrue(todo.save())
+        self.assertEqual(3, todo.id)
+        self.assertEqual({'title': u'caf\u00e9'}, msgpack.unpackb(m.last_request.body, raw=False))
+        self.assertEqual('application/msgpack', m.last_request.headers['Content-Type'])
+
+    def test_find_stream(self, m):
+        expected = [
+            {'id': 1, 'title': 'still todo', 'completed': False},
+            {'id': 2, 'title': 'done', 'completed': True},
+        ]
+
+        m.register_uri(
+            'GET',
+            'http://example.com/todos',
+            json={'todos': expected},
+            status_code=requests.codes.ok
+        )
+
+        actual = Todo.find(stream=True)
+
+        self.assertNotIsInstance(actual, list)
+        self.assert_todo_list(expected, list(actual))
+
+    def test_find_stream_xml(self, m):
+        m.register_uri(
+            'GET',
+            'http://example.com/todos',
+            text='<todos><todo><id>1</id></todo><todo><id>2</id></todo></todos>',
+            status_code=requests.codes.ok
+        )
+
+        actual = list(TodoWithXmlFormat.find(stream=True))
+
+        self.assertEqual([{'id': '1'}, {'id': '2'}], [todo.attributes for todo in actual])
+        self.assertTrue(all(todo.is_persisted() for todo in actual))
+
+    def test_find_xml_agrees_with_stream(self, m):
+        for body in ['<todos><todo><id>1</id><title>first</title></todo><todo><id>2</id></todo></todos>',
+                     '<todos><todo><id>1</id></todo></todos>',
+                     '<todos></todos>']:
+            m.register_uri('GET', 'http://example.com/todos', text=body)
+
+            streamed = [todo.attributes for todo in TodoWithXmlFormat.find(stream=True)]
+
+            self.assertEqual(streamed, [todo.attributes for todo in TodoWithXmlFormat.find()])
+            self.assertEqual(TodoWithXmlFormat.find_columns(stream=True), TodoWithXmlFormat.find_columns())
+
+    def test_find_stream_exception(self, m):
+        m.register_uri(
+            'GET',
+            'http://example.com/todos',
+            status_code=500
+        )
+
+        with self.assertRaises(HTTPError):
+            Todo.find(stream=True)
+
     def test_find_by_params(self, m):
         expected = [
             {'id': 1, 'title': 'still todo', 'completed': False},
@@ -365,6 +586,140 @@ class ResourcesTest(TestCase):
         actual.update_attributes(updates)
         self.assertEqual(updated, actual.attributes)
 
+    def test_changes(self, m):
+        todo = TodoWithTrackChanges(_meta={'persisted': True}, id=1, title='new todo', tags=['a'])
+
+        self.assertFalse(todo.is_changed())
+
+        todo.title = 'amended todo'
+        todo.tags.append('b')
+        todo.completed = True
+
+        self.assertTrue(todo.is_changed())
+        self.assertEqual(['completed', 'tags', 'title'], todo.changed())
+        self.assertEqual({
+            'completed': (None, True),
+            'tags': (['a'], ['a', 'b']),
+            'title': ('new todo', 'amended todo'),
+        }, todo.changes())
+
+    def test_changes_on_new(self, m):
+        todo = Todo(title='new todo')
+        self.assertEqual(['title'], todo.changed())
+
+    def test_changes_untracked(self, m):
+        todo = Todo(_meta={'persisted': True}, id=1, title='new todo')
+
+        self.assertFalse(Todo.track_changes)
+        self.assertTrue(TodoWithPartialUpdates.track_changes)
+        self.assertIsNone(todo._original)
+        self.assertEqual(['id', 'title'], todo.changed())
+
+    def test_changes_reset_on_save(self, m):
+        m.register_uri(
+            'PUT',
+            'http://example.com/todos/1',
+            json={'id': 1, 'title': 'amended todo'},
+            status_code=requests.codes.ok
+        )
+
+        todo = TodoWithTrackChanges(_meta={'persisted': True}, id=1, title='new todo')
+        todo.title = 'amended todo'
+        todo.save()
+
+        self.assertEqual([], todo.changed())
+
+    def test_partial_update(self, m):
+        m.register_uri(
+            'GET',
+            'http://example.com/todos/1',
+            json={'id': 1, 'title': 'new todo', 'completed': False},
+            status_code=requests.codes.ok
+        )
+
+        m.register_uri(
+            'PATCH',
+            'http://example.com/todos/1',
+            json={'id': 1, 'title': 'new todo', 'completed': True},
+            status_code=requests.codes.ok
+        )
+
+        todo = TodoWithPartialUpdates.find(1)
+
+        self.assertTrue(todo.update_attribute('completed', True))
+        self.assertEqual({'completed': True}, m.last_request.json())
+        self.assertEqual([], todo.changed())
+
+    def test_partial_update_without_changes(self, m):
+        todo = TodoWithPartialUpdates(_meta={'persisted': True}, id=1, title='new todo')
+
+        self.assertTrue(todo.save())
+        self.assertEqual(0, m.call_count)
+
+    def test_schema(self, m):
+        expected = {'id': 1, 'title': 'new todo', 'completed': False}
+
+        m.register_uri(
+            'GET',
+            'http://example.com/todos/1',
+            json=dict(expected, extra='ignored'),
+            status_code=requests.codes.ok
+        )
+
+        m.register_uri(
+            'PUT',
+            'http://example.com/todos/1',
+            json={'id': 1, 'title': 'new title', 'completed': False},
+            status_code=requests.codes.ok
+        )
+
+        todo = TodoWithSchema.find(1)
+
+        self.assertFalse(hasattr(todo, '__dict__'))
+        self.assertEqual(expected, todo.attributes)
+        self.assertEqual(1, todo.id)
+        self.assertEqual("TodoWithSchema(id=1, title='new todo', completed=False)", repr(todo))
+
+        todo.title = 'new title'
+        self.assertEqual({'title': ('new todo', 'new title')}, todo.changes())
+
+        self.assertTrue(todo.save())
+        self.assertEqual([], todo.changed())
+        self.assertEqual('new title', todo.title)
+
+    def test_schema_with_setting_names(self, m):
+        m.register_uri('GET', 'http://example.com/users/1',
+                       json={'id': 1, 'username': 'bob', 'timeout': 3})
+
+        class User(Resource):
+            site = 'http://example.com'
+            schema = ('id', 'username', 'timeout')
+            username = 'admin'
+
+        user = User.find(1)
+
+        self.assertEqual({'id': 1, 'username': 'bob', 'timeout': 3}, user.attributes)
+        self.assertEqual('admin', User.username)
+        self.assertEqual('admin', User.connection().username)
+        self.assertIsNone(User.timeout)
+
+        user.username = 'alice'
+        User.timeout = 5
+
+        self.assertEqual('alice', user.username)
+        self.assertEqual(3, user.timeout)
+        self.assertEqual(5, User.connection().timeout)
+
+    def test_schema_with_missing_attributes(self, m):
+        todo = TodoWithSchema(title='new todo')
+
+        self.assertTrue(todo.is_new())
+        self.assertEqual({'title': 'new todo'}, todo.attributes)
+        self.assertFalse(hasattr(todo, 'completed'))
+
+        todo.id = 2
+        self.assertEqual(2, todo.id)
+
     def test_destroy_new(self, m):
         todo = Todo(title='new todo')
         self.assertFalse(todo.destroy())
@@ -411,6 +766,52 @@ class ResourcesTest(TestCase):
         self.assertEqual(TodoWithConnectionClass.timeout, connection.timeout)
         self.assertEqual(TodoWithConnectionClass.username, connection.username)
 
+    def test_pool_settings(self, m):
+        connection = TodoWithPool.connection()
+
+        self.assertEqual(32, connection.pool_maxsize)
+        self.assertFalse(connection.keep_alive)
+        self.assertIsNot(Todo.connection().adapter, connection.adapter)
+
+    def test_pool_shared_between_resources(self, m):
+        self.assertIs(Todo.connection().adapter, TodoWithElementName.connection().adapter)
+
+    def test_configuration_is_not_inherited(self, m):
+        class Pony(TodoWithElementName):
+            pass
+
+        self.assertEqual('horses', TodoWithElementName.collection_name)
+        self.assertEqual('ponies', Pony.collection_name)
+
+    def test_setting_element_name_updates_collection_name(self, m):
+        class Horse(Resource):
+            site = 'http://example.com'
+
+        self.assertEqual('horses', Horse.collection_name)
+
+        Horse.element_name = 'pony'
+
+        self.assertEqual('ponies', Horse.collection_name)
+        self.assertEqual('/ponies/1', Horse.element_path(1))
+
+    def test_setting_configuration_resets_connection(self, m):
+        class Horse(Resource):
+            site = 'http://example.com'
+
+        connection = Horse.connection()
+        self.assertIs(connection, Horse.connection())
+
+        Horse.timeout = 5
+
+        self.assertIsNot(connection, Horse.connection())
+        self.assertEqual(5, Horse.connection().timeout)
+
+    def test_connection_is_per_class(self, m):
+        class Horse(Todo):
+            pass
+
+        self.assertIsNot(Todo.connection(), Horse.connection())
+
     def test_without_site(self, m):
         with self.assertRaises(ValueError, msg='resource must have site defined'):
             todo = TodoWithoutSite()
@@ -461,6 +862,60 @@ class ResourcesTest(TestCase):
     def test_query_string_with_params(self, m):
         self.assertEqual('?attr=name', Todo.query_string(attr="name"))
 
+    def test_prefix_paths(self, m):
+        self.assertEqual('/projects/1/todos', TodoWithPrefix.collection_path(project_id=1))
+        self.assertEqual('/projects/1/todos/2?done=true',
+                         TodoWithPrefix.element_path(2, project_id=1, done=True))
+
+        with self.assertRaises(ValueError):
+            TodoWithPrefix.collection_path()
+
+    def test_paths_escape_ids_and_prefix_options(self, m):
+        self.assertEqual('/todos/a%3Fb%20c', Todo.element_path('a?b c'))
+        self.assertEqual('/todos/a%2Fb', Todo.element_path('a/b'))
+        self.assertEqual('/projects/x%2Fy%3Fz/todos/a%3Fb%20c?done=true',
+                         TodoWithPrefix.element_path('a?b c', project_id='x/y?z', done=True))
+        self.assertEqual('/projects/x%20y/todos', TodoWithPrefix.collection_path(project_id='x y'))
+
+    def test_find_id_with_reserved_characters(self, m):
+        m.register_uri('GET', 'http://example.com/todos/a%3Fb%20c', json={'id': 'a?b c'})
+
+        self.assertEqual('a?b c', Todo.find('a?b c').id)
+        self.assertEqual('http://example.com/todos/a%3Fb%20c', m.last_request.url)
+
+    def test_find_with_prefix(self, m):
+        m.register_uri(
+            'GET',
+            'http://example.com/projects/1/todos?completed=true',
+            json=[{'id': 2, 'project_id': 1}],
+            status_code=200
+        )
+
+        todos = TodoWithPrefix.find(params={'project_id': 1, 'completed': True})
+        self.assertEqual([2], [todo.id for todo in todos])
+
+    def test_save_and_destroy_with_prefix(self, m):
+        m.register_uri(
+            'POST',
+            'http://example.com/projects/1/todos',
+            json={'id': 2, 'project_id': 1},
+            status_code=requests.codes.created
+        )
+
+        m.register_uri(
+            'DELETE',
+            'http://example.com/projects/1/todos/2',
+            status_code=requests.codes.ok
+        )
+
+        todo = TodoWithPrefix(project_id=1)
+
+        self.assertTrue(todo.save())
+        self.assertTrue(todo.destroy())
+
+    def test_element_path_with_format(self, m):
+        self.assertEqual('/todos/1.json', TodoWithIncludeFormatInPath.element_path(1))
+
     def test_include_format_in_path(self, m):
         m.register_uri(
             'GET',
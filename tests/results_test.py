@@ -0,0 +1,111 @@
+import json
+import requests_mock
+
+from activerest import Resource
+from activerest.results import LazyCollection
+from unittest import TestCase
+
+
+class Todo(Resource):
+    site = 'http://example.com'
+    collection_parser = LazyCollection
+
+
+ROWS = [
+    {'id': 1, 'title': 'still todo', 'completed': False},
+    {'id': 2, 'title': 'done', 'completed': True},
+    {'id': 3, 'title': 'also done', 'completed': True},
+]
+
+
+def built(todos):
+    """Whether each item of todos has been built into a resource."""
+    return [isinstance(item, Todo) for item in list.__iter__(todos)]
+
+
+@requests_mock.Mocker()
+class LazyCollectionTest(TestCase):
+    def find(self, m):
+        m.register_uri('GET', 'http://example.com/todos', json=ROWS)
+        return Todo.find()
+
+    def test_find_returns_lazy_collection(self, m):
+        todos = self.find(m)
+
+        self.assertIsInstance(todos, LazyCollection)
+        self.assertIsInstance(todos, list)
+        self.assertEqual(3, len(todos))
+        self.assertEqual([False, False, False], built(todos))
+
+    def test_index_builds_one_resource(self, m):
+        todos = self.find(m)
+
+        todo = todos[1]
+
+        self.assertIsInstance(todo, Todo)
+        self.assertTrue(todo.is_persisted())
+        self.assertEqual(ROWS[1], todo.attributes)
+        self.assertIs(todo, todos[-2])
+        self.assertEqual([False, True, False], built(todos))
+
+    def test_behaves_like_list(self, m):
+        todos = self.find(m)
+
+        self.assertEqual([1, 2, 3], [todo.id for todo in todos])
+        self.assertEqual([2, 3], [todo.id for todo in todos[1:]])
+        self.assertEqual(list(todos), todos)
+        self.assertIn(todos[0], todos)
+        self.assertTrue(todos)
+        self.assertEqual([3, 2, 1], [todo.id for todo in reversed(todos)])
+
+    def test_changes_like_list(self, m):
+        todos = self.find(m)
+        other = Todo(id=4)
+
+        todos.append(other)
+        self.assertEqual([True] * 4, built(todos))
+        self.assertIs(other, todos[-1])
+
+        todos.sort(key=lambda todo: -todo.id)
+        self.assertEqual([4, 3, 2, 1], [todo.id for todo in todos])
+
+        todos[0] = Todo(id=5)
+        del todos[1]
+        todos.insert(0, other)
+        self.assertEqual([4, 5, 2, 1], [todo.id for todo in todos])
+        self.assertIs(other, todos.pop(0))
+
+        todos.extend([other])
+        todos += [Todo(id=6)]
+        self.assertEqual([5, 2, 1, 4, 6], [todo.id for todo in todos])
+
+    def test_concatenates_like_list(self, m):
+        todos = self.find(m)
+        other = Todo(id=4)
+
+        self.assertEqual([1, 2, 3, 4], [todo.id for todo in todos + [other]])
+        self.assertEqual([4, 1, 2, 3], [todo.id for todo in [other] + todos])
+        self.assertEqual([1, 2, 3, 1, 2, 3], [todo.id for todo in todos * 2])
+        self.assertIs(list, type(todos + [other]))
+
+    def test_serializes_like_list(self, m):
+        todos = self.find(m)
+        todos[0]
+
+        self.assertEqual(ROWS, json.loads(json.dumps(todos, default=lambda todo: todo.attributes)))
+
+        todos.reverse()
+
+        self.assertEqual(ROWS[::-1], json.loads(json.dumps(todos, default=lambda todo: todo.attributes)))
+
+    def test_columns_skip_resources(self, m):
+        todos = self.find(m)
+
+        self.assertEqual(['still todo', 'done', 'also done'], todos.column('title'))
+        self.assertEqual({'id': [1, 2, 3], 'completed': [False, True, True]},
+                         todos.columns('id', 'completed'))
+        self.assertEqual([False, False, False], built(todos))
+
+        todos[0].title = 'changed'
+
+        self.assertEqual(['changed', 'done', 'also done'], todos.column('title'))
@@ -0,0 +1,274 @@
+import requests
+import requests_mock
+
+from activerest import Connection, Resource
+from activerest.retries import CircuitBreaker, CircuitOpenError, RetryBudget, RetryPolicy
+from requests.exceptions import ChunkedEncodingError, ConnectionError, ContentDecodingError
+from unittest import TestCase
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def retry_policy(**kwargs):
+    policy = RetryPolicy(**kwargs)
+    policy.sleeps = []
+    policy.sleep = policy.sleeps.append
+    policy.random = lambda: 0.5
+    return policy
+
+
+class RetryPolicyTest(TestCase):
+    def setUp(self):
+        self.retry = retry_policy(backoff_factor=1, budget=False)
+        self.connection = Connection('http://example.com')
+        self.connection.retry = self.retry
+
+    def test_retries_transient_status(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', [
+                {'status_code': 503},
+                {'status_code': 502},
+                {'json': []},
+            ])
+            response = self.connection.get('/todos')
+
+        self.assertEqual(requests.codes.ok, response.status_code)
+        self.assertEqual(3, m.call_count)
+        self.assertEqual([0.5, 1.0], self.retry.sleeps)
+
+    def test_retries_connection_error(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', [
+                {'exc': ConnectionError},
+                {'json': []},
+            ])
+            response = self.connection.get('/todos')
+
+        self.assertEqual(requests.codes.ok, response.status_code)
+        self.assertEqual(2, m.call_count)
+
+    def test_gives_up_after_total(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', exc=ConnectionError)
+            with self.assertRaises(ConnectionError):
+                self.connection.get('/todos')
+
+        self.assertEqual(4, m.call_count)
+        self.assertEqual([0.5, 1.0, 2.0], self.retry.sleeps)
+
+    def test_does_not_retry_post(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('POST', 'http://example.com/todos', status_code=503)
+            response = self.connection.post('/todos', data={})
+
+        self.assertEqual(503, response.status_code)
+        self.assertEqual(1, m.call_count)
+
+    def test_does_not_retry_client_error(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', status_code=404)
+            self.connection.get('/todos')
+
+        self.assertEqual(1, m.call_count)
+
+    def test_honors_retry_after(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', [
+                {'status_code': 429, 'headers': {'Retry-After': '7'}},
+                {'json': []},
+            ])
+            self.connection.get('/todos')
+
+        self.assertEqual([7.0], self.retry.sleeps)
+
+    def test_retry_after_date(self):
+        self.retry.clock = lambda: 784111767.0
+        response = requests.Response()
+        response.headers['Retry-After'] = 'Sun, 06 Nov 1994 08:49:37 GMT'
+        self.assertEqual(10.0, self.retry.retry_after(response))
+
+    def test_retry_after_too_long(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos',
+                           status_code=503, headers={'Retry-After': '3600'})
+            response = self.connection.get('/todos')
+
+        self.assertEqual(503, response.status_code)
+        self.assertEqual(1, m.call_count)
+
+    def test_budget_limits_retries(self):
+        self.connection.retry = retry = retry_policy(budget=RetryBudget(ratio=0.5, reserve=1))
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', status_code=503)
+            self.connection.get('/todos')
+            self.assertEqual(2, m.call_count)
+            self.connection.get('/todos')
+            self.assertEqual(3, m.call_count)
+
+        self.assertEqual(0.5, retry.budget.tokens)
+
+    def test_resource_retry(self):
+        class Todo(Resource):
+            site = 'http://example.com'
+            retry = self.retry
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('PUT', 'http://example.com/todos/1', [
+                {'status_code': 503},
+                {'json': {'id': 1, 'title': 'saved'}},
+            ])
+            todo = Todo(_meta={'persisted': True}, id=1, title='todo')
+            self.assertTrue(todo.save())
+
+        self.assertEqual('saved', todo.title)
+
+
+class CircuitBreakerTest(TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10)
+        self.breaker.clock = self.clock
+        self.connection = Connection('http://example.com')
+        self.connection.circuit_breaker = self.breaker
+
+    def test_opens_after_failures(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', status_code=500)
+            self.connection.get('/todos')
+            self.assertEqual('closed', self.breaker.state('http://example.com'))
+            self.connection.get('/todos')
+            self.assertEqual('open', self.breaker.state('http://example.com'))
+
+            with self.assertRaises(CircuitOpenError) as context:
+                self.connection.get('/todos')
+
+        self.assertEqual(2, m.call_count)
+        self.assertEqual(10, context.exception.retry_in)
+        self.assertEqual(1, self.breaker.stats()['http://example.com']['rejected'])
+
+    def test_success_resets_failures(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', [
+                {'status_code': 500},
+                {'json': []},
+                {'status_code': 500},
+            ])
+            for _ in range(3):
+                self.connection.get('/todos')
+
+        self.assertEqual('closed', self.breaker.state('http://example.com'))
+
+    def test_half_open_probe(self):
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', [
+                {'exc': ConnectionError},
+                {'exc': ConnectionError},
+                {'status_code': 503},
+                {'json': []},
+            ])
+
+            for _ in range(2):
+                with self.assertRaises(ConnectionError):
+                    self.connection.get('/todos')
+
+            self.clock.now += 10
+            self.assertEqual('half_open', self.breaker.state('http://example.com'))
+            self.connection.get('/todos')
+            self.assertEqual('open', self.breaker.state('http://example.com'))
+
+            self.clock.now += 10
+            self.connection.get('/todos')
+            self.assertEqual('closed', self.breaker.state('http://example.com'))
+
+        self.assertEqual(2, self.breaker.stats()['http://example.com']['opened'])
+
+    def test_half_open_limits_probes(self):
+        self.breaker.before_request('site')
+        self.breaker.record('site', error=ConnectionError())
+        self.breaker.before_request('site')
+        self.breaker.record('site', 500)
+        self.clock.now += 10
+
+        self.breaker.before_request('site')
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request('site')
+
+    def open_circuit(self, m):
+        m.register_uri('GET', 'http://example.com/todos', status_code=500)
+        self.connection.get('/todos')
+        self.connection.get('/todos')
+        self.clock.now += 10
+
+    def test_probe_cut_short_counts_as_failure(self):
+        with requests_mock.Mocker() as m:
+            self.open_circuit(m)
+            m.register_uri('GET', 'http://example.com/todos', [
+                {'exc': ChunkedEncodingError},
+                {'json': []},
+            ])
+
+            with self.assertRaises(ChunkedEncodingError):
+                self.connection.get('/todos')
+
+            self.assertEqual('open', self.breaker.state('http://example.com'))
+            self.clock.now += 10
+            self.assertEqual(requests.codes.ok, self.connection.get('/todos').status_code)
+
+        self.assertEqual('closed', self.breaker.state('http://example.com'))
+
+    def test_probe_failing_otherwise_counts_as_failure(self):
+        with requests_mock.Mocker() as m:
+            self.open_circuit(m)
+            m.register_uri('GET', 'http://example.com/todos', exc=ContentDecodingError)
+
+            with self.assertRaises(ContentDecodingError):
+                self.connection.get('/todos')
+
+        self.assertEqual('open', self.breaker.state('http://example.com'))
+
+    def test_abandoned_probe_is_released(self):
+        with requests_mock.Mocker() as m:
+            self.open_circuit(m)
+            m.register_uri('GET', 'http://example.com/todos', [
+                {'exc': KeyboardInterrupt},
+                {'json': []},
+            ])
+
+            with self.assertRaises(KeyboardInterrupt):
+                self.connection.get('/todos')
+
+            self.assertEqual(requests.codes.ok, self.connection.get('/todos').status_code)
+
+        self.assertEqual('closed', self.breaker.state('http://example.com'))
+
+    def test_circuits_are_per_site(self):
+        other = Connection('http://example.org')
+        other.circuit_breaker = self.breaker
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', status_code=500)
+            m.register_uri('GET', 'http://example.org/todos', json=[])
+            self.connection.get('/todos')
+            self.connection.get('/todos')
+            self.assertEqual(requests.codes.ok, other.get('/todos').status_code)
+
+        self.assertEqual('open', self.breaker.state('http://example.com'))
+        self.assertEqual('closed', self.breaker.state('http://example.org'))
+
+    def test_retries_stop_when_circuit_opens(self):
+        self.connection.retry = retry_policy(budget=False)
+
+        with requests_mock.Mocker() as m:
+            m.register_uri('GET', 'http://example.com/todos', status_code=503)
+            with self.assertRaises(CircuitOpenError):
+                self.connection.get('/todos')
+
+        self.assertEqual(2, m.call_count)
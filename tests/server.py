@@ -0,0 +1,83 @@
+import json
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        self.server.received.append((self.command, self.path, dict(self.headers), body))
+
+        route = self.server.routes.get((self.command, self.path))
+        if route is None:
+            route = (404, {}, None)
+
+        (status, headers, payload) = route
+        if callable(payload):
+            payload = payload(self)
+
+        if payload is None:
+            content = b''
+        elif isinstance(payload, bytes):
+            content = payload
+        else:
+            content = json.dumps(payload).encode('utf-8')
+
+        self.send_response(status)
+        if 'Content-Type' not in headers:
+            self.send_header('Content-Type', 'application/json')
+        for (name, value) in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _respond
+
+
+class ThreadingStubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubServer(object):
+    """Minimal threaded HTTP server serving canned responses for tests."""
+
+    def __init__(self):
+        self.server = ThreadingStubServer(('127.0.0.1', 0), StubHandler)
+        self.server.routes = {}
+        self.server.received = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s' % self.server.server_address[1]
+
+    @property
+    def received(self):
+        return self.server.received
+
+    def route(self, method, path, payload=None, status=200, headers=None):
+        self.server.routes[(method, path)] = (status, headers or {}, payload)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()